@@ -0,0 +1,273 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import indicators
+from barstore import get_bars_many
+from kalendarz import period_start
+from przepisy import ZŁOTE_PRZEPISY_TREND, ZŁOTE_PRZEPISY_MEANREV, SYMBOLE
+from signallogic import (add_trend_indicators, add_meanrev_indicators, trend_entry, trend_exit,
+                         trailing_stop, meanrev_entry, meanrev_exit, trade_plan)
+
+# ==================================================
+#  BACKTEST ZDARZENIOWY (świeca po świecy, cały portfel)
+# ==================================================
+# Odtwarza na całej historii dokładnie te reguły, które strony Streamlit pokazują
+# dla ostatniej świecy (signallogic.py: trend_entry, trailing_stop, meanrev_entry...).
+# Świece wszystkich systemów z obu tabel przetwarzane są w jednej kolejności czasowej,
+# a wolumen liczony jest od bieżącego kapitału portfela.
+#
+# Kolejność na świecy: stop (po open, jeśli luka) -> wyjście na zamknięciu
+# (kanał OUT / RSI) -> zaciśnięcie trailing stopu -> nowe wejście (nie na świecy wyjścia).
+#
+# Powody wyjścia jak w dzienniku (journal.py): SL - stop początkowy, TSL - stop przesunięty
+# przez trailing, OUT - kanał wyjścia, RSI - próg RSI, KONIEC - rozliczenie na końcu danych.
+# Krzywa kapitału wyceniana jest na każdej świecy (zrealizowany wynik + otwarte pozycje po
+# zamknięciu), więc max DD obejmuje też obsunięcia otwartych transakcji; wolumen liczony
+# jest od kapitału zrealizowanego.
+#
+# Uruchomienie:
+#   python backtest.py --okres 1y --kapital 10000 --ryzyko 4 --transakcje
+
+
+class Position:
+    __slots__ = ("kierunek", "entry_i", "entry_price", "stop", "stop0", "size", "cash_risk")
+
+    def __init__(self, kierunek, entry_i, entry_price, stop, size, cash_risk):
+        self.kierunek = kierunek
+        self.entry_i = entry_i
+        self.entry_price = entry_price
+        self.stop = stop
+        self.stop0 = stop  # stop początkowy - odróżnia SL od TSL
+        self.size = size
+        self.cash_risk = cash_risk
+
+    def stop_reason(self):
+        return "SL" if self.stop == self.stop0 else "TSL"
+
+
+class Trade:
+    __slots__ = ("strategia", "system", "symbol", "kierunek", "entry_date", "entry_price",
+                 "exit_date", "exit_price", "size", "pnl", "r", "powod")
+
+    def __init__(self, **pola):
+        for k, v in pola.items():
+            setattr(self, k, v)
+
+    def as_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+
+class TrendSystem:
+    __slots__ = ("nazwa", "symbol", "mult", "m_sl", "k_tsl", "dates", "open", "high", "low",
+                 "close", "atr", "ema", "hi_in", "lo_in", "hi_out", "lo_out", "hi_now", "lo_now", "pos", "wycena")
+    strategia = "Trend"
+
+    def __init__(self, nazwa, przepis, df):
+        p = przepis
+        df = add_trend_indicators(df.copy(), p.in_p, p.out_p, p.ema_p, p.atr_p)
+        self.nazwa, self.symbol, self.mult, self.m_sl, self.k_tsl = nazwa, p.symbol, p.mult, p.m_sl, p.k_tsl
+        self.dates = df.index
+        # Listy floatów - dostęp do pojedynczej wartości szybszy niż z tablicy NumPy
+        for pole, kolumna in [("open", "open"), ("high", "high"), ("low", "low"), ("close", "close"),
+                              ("atr", "atr"), ("ema", "ema"), ("hi_in", "highest_in"), ("lo_in", "lowest_in"),
+                              ("hi_out", "highest_out"), ("lo_out", "lowest_out")]:
+            setattr(self, pole, df[kolumna].to_numpy(dtype=float).tolist())
+        self.hi_now = indicators.rolling_max(self.high, p.in_p).tolist()
+        self.lo_now = indicators.rolling_min(self.low, p.in_p).tolist()
+        self.pos = None
+        self.wycena = 0.0
+
+    def on_bar(self, i, bt):
+        c = self.close[i]
+        pos = self.pos
+        if pos is not None:
+            if pos.kierunek == "LONG" and self.low[i] <= pos.stop:
+                bt.close(self, i, min(self.open[i], pos.stop), pos.stop_reason())
+            elif pos.kierunek == "SHORT" and self.high[i] >= pos.stop:
+                bt.close(self, i, max(self.open[i], pos.stop), pos.stop_reason())
+            elif trend_exit(pos.kierunek, c, self.lo_out[i], self.hi_out[i]):
+                bt.close(self, i, c, "OUT")
+            else:
+                tsl = trailing_stop(pos.kierunek, self.hi_now[i], self.lo_now[i], self.atr[i], self.k_tsl)
+                if (pos.kierunek == "LONG" and tsl > pos.stop) or (pos.kierunek == "SHORT" and tsl < pos.stop):
+                    pos.stop = tsl
+            return
+
+        kierunek = trend_entry(c, self.ema[i], self.hi_in[i], self.lo_in[i])
+        if kierunek:
+            bt.open(self, i, kierunek, c, self.atr[i])
+
+
+class MeanRevSystem:
+    __slots__ = ("nazwa", "symbol", "mult", "m_sl", "l_ent", "l_ex", "s_ent", "s_ex",
+                 "dates", "open", "high", "low", "close", "atr", "rsi", "pos", "wycena")
+    strategia = "Mean Reversion"
+
+    def __init__(self, nazwa, przepis, df):
+        p = przepis
+        df = add_meanrev_indicators(df.copy(), p.rsi_p, p.atr_p)
+        self.nazwa, self.symbol, self.mult, self.m_sl = nazwa, p.symbol, p.mult, p.m_sl
+        self.l_ent, self.l_ex, self.s_ent, self.s_ex = p.l_ent, p.l_ex, p.s_ent, p.s_ex
+        self.dates = df.index
+        for pole in ["open", "high", "low", "close", "atr", "rsi"]:
+            setattr(self, pole, df[pole].to_numpy(dtype=float).tolist())
+        self.pos = None
+        self.wycena = 0.0
+
+    def on_bar(self, i, bt):
+        c = self.close[i]
+        pos = self.pos
+        if pos is not None:
+            if pos.kierunek == "LONG" and self.low[i] <= pos.stop:
+                bt.close(self, i, min(self.open[i], pos.stop), "SL")
+            elif pos.kierunek == "SHORT" and self.high[i] >= pos.stop:
+                bt.close(self, i, max(self.open[i], pos.stop), "SL")
+            elif meanrev_exit(pos.kierunek, self.rsi[i], self.l_ex, self.s_ex):
+                bt.close(self, i, c, "RSI")
+            return
+
+        kierunek = meanrev_entry(self.rsi[i], self.l_ent, self.s_ent)
+        if kierunek:
+            bt.open(self, i, kierunek, c, self.atr[i])
+
+
+class Portfolio:
+    __slots__ = ("equity", "otwarte", "ryzyko_proc", "trades")
+
+    def __init__(self, kapital, ryzyko_proc):
+        self.equity = kapital   # kapitał zrealizowany (podstawa wolumenu)
+        self.otwarte = 0.0      # suma wycen otwartych pozycji (system.wycena)
+        self.ryzyko_proc = ryzyko_proc
+        self.trades = []
+
+    def mark(self, system, i):
+        # Wycena pozycji systemu po zamknięciu świecy i (0 bez pozycji)
+        pos = system.pos
+        wycena = 0.0
+        if pos is not None:
+            znak = 1.0 if pos.kierunek == "LONG" else -1.0
+            wycena = znak * (system.close[i] - pos.entry_price) * pos.size * system.mult
+        self.otwarte += wycena - system.wycena
+        system.wycena = wycena
+
+    def open(self, system, i, kierunek, price, atr):
+        sl_price, size, cash_risk = trade_plan(kierunek, price, atr, system.m_sl, system.mult,
+                                               self.equity, self.ryzyko_proc)
+        if size > 0:
+            system.pos = Position(kierunek, i, price, sl_price, size, cash_risk)
+
+    def close(self, system, i, price, powod):
+        pos = system.pos
+        znak = 1.0 if pos.kierunek == "LONG" else -1.0
+        pnl = znak * (price - pos.entry_price) * pos.size * system.mult
+        self.equity += pnl
+        self.trades.append(Trade(
+            strategia=system.strategia, system=system.nazwa, symbol=system.symbol, kierunek=pos.kierunek,
+            entry_date=system.dates[pos.entry_i], entry_price=pos.entry_price,
+            exit_date=system.dates[i], exit_price=price, size=pos.size, pnl=pnl,
+            r=pnl / pos.cash_risk if pos.cash_risk else np.nan, powod=powod))
+        system.pos = None
+        self.otwarte -= system.wycena
+        system.wycena = 0.0
+
+
+def _ns(index):
+    # Znaczniki czasu w ns (UTC dla danych ze strefą) - wspólna oś dla wszystkich symboli
+    if index.tz is not None:
+        index = index.tz_convert("UTC").tz_localize(None)
+    return index.as_unit("ns").asi8
+
+
+def run(systemy, kapital=10000.0, ryzyko_proc=0.04, start=None):
+    bt = Portfolio(kapital, ryzyko_proc)
+
+    # Kolejka zdarzeń: (czas, system, indeks świecy), posortowana po czasie
+    czasy, ktory, indeks = [], [], []
+    for s, system in enumerate(systemy):
+        t = _ns(system.dates)
+        od = 0 if start is None else int(np.searchsorted(t, pd.Timestamp(start).value))
+        czasy.append(t[od:])
+        ktory.append(np.full(len(t) - od, s))
+        indeks.append(np.arange(od, len(t)))
+    czasy, ktory, indeks = np.concatenate(czasy), np.concatenate(ktory), np.concatenate(indeks)
+    kolejnosc = np.argsort(czasy, kind="stable")
+
+    krzywa_t, krzywa_eq = [], []
+    for t, s, i in zip(czasy[kolejnosc].tolist(), ktory[kolejnosc].tolist(), indeks[kolejnosc].tolist()):
+        system = systemy[s]
+        system.on_bar(i, bt)
+        bt.mark(system, i)
+        krzywa_t.append(t)
+        krzywa_eq.append(bt.equity + bt.otwarte)
+
+    # Pozycje otwarte na końcu rozliczamy po ostatnim zamknięciu
+    for system in systemy:
+        if system.pos is not None:
+            bt.close(system, len(system.close) - 1, system.close[-1], "KONIEC")
+
+    transakcje = pd.DataFrame([tr.as_dict() for tr in bt.trades], columns=Trade.__slots__)
+    krzywa = pd.Series(krzywa_eq, index=pd.to_datetime(krzywa_t), name="equity")
+    krzywa = krzywa[~krzywa.index.duplicated(keep="last")]
+    if len(krzywa):
+        krzywa.iloc[-1] = bt.equity  # po rozliczeniu KONIEC - bez otwartych pozycji
+    return transakcje, krzywa
+
+
+def build_systems(dane, trend=None, meanrev=None):
+    trend = ZŁOTE_PRZEPISY_TREND if trend is None else trend
+    meanrev = ZŁOTE_PRZEPISY_MEANREV if meanrev is None else meanrev
+    systemy = []
+    for nazwa, p in trend.items():
+        if dane.get(p.symbol) is not None:
+            systemy.append(TrendSystem(nazwa, p, dane[p.symbol]))
+    for nazwa, p in meanrev.items():
+        if dane.get(p.symbol) is not None:
+            systemy.append(MeanRevSystem(nazwa, p, dane[p.symbol]))
+    return systemy
+
+
+def summarize(transakcje, krzywa, kapital):
+    if transakcje.empty:
+        return pd.DataFrame()
+    g = transakcje.groupby(["strategia", "system"], sort=False)
+    podsumowanie = pd.DataFrame({
+        "Transakcje": g.size(),
+        "Trafność": g["pnl"].apply(lambda x: (x > 0).mean()),
+        "Suma R": g["r"].sum(),
+        "PnL": g["pnl"].sum(),
+    }).reset_index()
+    max_dd = float((1.0 - krzywa / krzywa.cummax()).max()) if len(krzywa) else 0.0
+    print(f"Kapitał: {kapital:.2f} -> {krzywa.iloc[-1]:.2f} "
+          f"({krzywa.iloc[-1] / kapital - 1:+.1%}), max DD {max_dd:.1%}, {len(transakcje)} transakcji")
+    return podsumowanie
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest zdarzeniowy obu tabel ZŁOTYCH PRZEPISÓW")
+    parser.add_argument("--okres", default="1y", help="Zakres backtestu, np. 1y, 6mo")
+    parser.add_argument("--historia", default="3y", help="Pobierana historia (z rozgrzewką wskaźników)")
+    parser.add_argument("--kapital", type=float, default=10000.0)
+    parser.add_argument("--ryzyko", type=float, default=4.0, help="Ryzyko na transakcję (%%)")
+    parser.add_argument("--transakcje", action="store_true", help="Wypisz wszystkie transakcje")
+    args = parser.parse_args(argv)
+
+    dane = get_bars_many(SYMBOLE, period=args.historia, interval="1d")
+
+    start = time.perf_counter()
+    systemy = build_systems(dane)
+    transakcje, krzywa = run(systemy, args.kapital, args.ryzyko / 100.0, period_start(args.okres))
+    czas = time.perf_counter() - start
+
+    print(f"{len(systemy)} systemów, {len(krzywa)} znaczników czasu, {czas * 1000:.0f} ms")
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(summarize(transakcje, krzywa, args.kapital).to_string(index=False))
+        if args.transakcje:
+            print()
+            print(transakcje.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
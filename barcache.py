@@ -0,0 +1,240 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+import barstore
+import profiling
+from signallogic import add_trend_indicators, add_meanrev_indicators, precompute_indicators
+
+# ==================================================
+#  WSPÓLNY CACHE ŚWIEC I WSKAŹNIKÓW (w pamięci procesu)
+# ==================================================
+# Dwa poziomy:
+# 1. surowe świece - klucz (symbol, interwał, okres), wspólne dla obu stron
+#    i skanera (CL=F czy ^NDX z obu tabel pobierane są raz), ograniczone liczbą
+#    wpisów i rozmiarem, wypierane LRU, ważne przez CACHE_TTL sekund;
+# 2. wskaźniki - osobne memo przy każdym wpisie świec, klucz (wskaźnik, okres).
+#    Zmiana okresu RSI w panelu bocznym liczy tylko RSI, bez pobierania danych
+#    i bez kopiowania ramki. Nowe świece = nowy wpis = puste memo.
+#
+# Rozmiar wpisu świec to ramka + tablice w jego memo wskaźników (do MAX_WSKAZNIKOW szeregów
+# pełnej długości) - gdy memo rośnie, wpis dostaje nowy rozmiar i limit MAX_BAJTOW jest
+# sprawdzany od nowa, więc ograniczenie pamięci obejmuje też wskaźniki.
+#
+# Interwały składane lokalnie (barstore.RESAMPLE, np. 4h z 1h) mają własny wpis,
+# ale liczony z wpisu interwału bazowego - 1h i 4h tego samego symbolu to jedno
+# pobranie, a wpis 4h odświeża się razem z bazowym.
+#
+# Świece w cache są już po kontroli jakości (barstore -> validation.py), a raport
+# z kontroli leży przy wpisie (BarEntry.raport) - bez ponownej kontroli do odświeżenia.
+#
+# Z włączonym profilowaniem (profiling.py) liczone są trafienia / chybienia świec
+# i wskaźników, a rozmiar cache widać w profiling.gauges().
+#
+# Zwracane ramki świec są współdzielone - nie wolno ich modyfikować w miejscu;
+# trend_frame / meanrev_frame zwracają płytką kopię z dodanymi kolumnami.
+
+CACHE_TTL = float(os.environ.get("SIGNALS_CACHE_TTL", 900))
+MAX_WPISOW = 64
+MAX_BAJTOW = 256 * 2**20
+MAX_WSKAZNIKOW = 32  # na jeden wpis świec
+
+
+def _nbytes(wartosc):
+    # Rozmiar tablicy NumPy albo krotki tablic (donchian - górna, dolna); inne wartości - 0
+    if isinstance(wartosc, np.ndarray):
+        return wartosc.nbytes
+    if isinstance(wartosc, tuple):
+        return sum(_nbytes(w) for w in wartosc)
+    return 0
+
+
+class LRUCache:
+    __slots__ = ("max_wpisow", "max_bajtow", "bajty", "wpisy", "lock", "nazwa", "po_zmianie")
+
+    def __init__(self, max_wpisow, max_bajtow=None, nazwa=None, po_zmianie=None):
+        self.max_wpisow = max_wpisow
+        self.max_bajtow = max_bajtow
+        self.nazwa = nazwa          # prefiks liczników memo w profiling.py (None - bez liczników)
+        self.po_zmianie = po_zmianie  # wywoływane (poza blokadą) po zmianie rozmiaru cache
+        self.bajty = 0
+        self.wpisy = OrderedDict()  # klucz -> (wartość, rozmiar); od najdawniej używanego
+        self.lock = threading.Lock()
+
+    def get(self, klucz, default=None):
+        with self.lock:
+            wpis = self.wpisy.get(klucz)
+            if wpis is None:
+                return default
+            self.wpisy.move_to_end(klucz)
+            return wpis[0]
+
+    def put(self, klucz, wartosc, rozmiar=None):
+        # rozmiar None - liczony z tablic wartości (_nbytes)
+        rozmiar = _nbytes(wartosc) if rozmiar is None else rozmiar
+        with self.lock:
+            stary = self.wpisy.pop(klucz, None)
+            if stary is not None:
+                self.bajty -= stary[1]
+            self.wpisy[klucz] = (wartosc, rozmiar)
+            self.bajty += rozmiar
+            self._wypieraj()
+        if self.po_zmianie is not None:
+            self.po_zmianie()
+
+    def resize(self, klucz, wartosc, rozmiar):
+        # Nowy rozmiar wpisu (np. urosło jego memo), o ile klucz wciąż wskazuje tę wartość;
+        # kolejność LRU bez zmian
+        with self.lock:
+            wpis = self.wpisy.get(klucz)
+            if wpis is None or wpis[0] is not wartosc:
+                return
+            self.wpisy[klucz] = (wartosc, rozmiar)
+            self.bajty += rozmiar - wpis[1]
+            self._wypieraj()
+
+    def _wypieraj(self):
+        # Pod blokadą: najdawniej używane wpisy ponad limit liczby / rozmiaru (ostatni zostaje)
+        while len(self.wpisy) > self.max_wpisow or (
+                self.max_bajtow is not None and self.bajty > self.max_bajtow and len(self.wpisy) > 1):
+            _, (_, r) = self.wpisy.popitem(last=False)
+            self.bajty -= r
+
+    def memo(self, klucz, funkcja):
+        # Wartość z cache albo policzona i zapamiętana
+        wartosc = self.get(klucz)
+        if self.nazwa is not None:
+            profiling.count(f"{self.nazwa}.{'chybienia' if wartosc is None else 'trafienia'}")
+        if wartosc is None:
+            wartosc = funkcja()
+            self.put(klucz, wartosc)
+        return wartosc
+
+    def clear(self):
+        with self.lock:
+            self.wpisy.clear()
+            self.bajty = 0
+
+    def __len__(self):
+        return len(self.wpisy)
+
+
+class BarEntry:
+    __slots__ = ("klucz", "df", "bajty_df", "pobrano", "wskazniki", "baza", "raport")
+
+    def __init__(self, klucz, df, baza=None, raport=None):
+        self.klucz = klucz
+        self.df = df
+        self.bajty_df = int(df.memory_usage(index=True).sum())
+        self.pobrano = time.monotonic()
+        self.wskazniki = LRUCache(MAX_WSKAZNIKOW, nazwa="wskazniki", po_zmianie=self._zmiana)
+        self.baza = baza      # wpis interwału bazowego, z którego złożono świece
+        self.raport = raport  # validation.Raport (dla złożonych - raport interwału bazowego)
+
+    def size(self):
+        return self.bajty_df + self.wskazniki.bajty
+
+    def _zmiana(self):
+        # Memo wskaźników urosło - nowy rozmiar wpisu w _SWIECE (i ewentualne wypieranie)
+        _SWIECE.resize(self.klucz, self, self.size())
+
+
+_SWIECE = LRUCache(MAX_WPISOW, MAX_BAJTOW)
+profiling.register_gauge("barcache_wpisy", lambda: len(_SWIECE))
+profiling.register_gauge("barcache_mb", lambda: _SWIECE.bajty / 2**20)
+
+
+def _entry(symbol, period, interval, ttl):
+    # Wpis przeterminowany (TTL) liczy się jako chybienie - świece trzeba dociągnąć
+    wpis = _SWIECE.get((symbol, interval, period))
+    if wpis is not None and time.monotonic() - wpis.pobrano < (CACHE_TTL if ttl is None else ttl):
+        profiling.count("swiece.trafienia")
+        return wpis
+    profiling.count("swiece.chybienia")
+    return None
+
+
+def _store(symbol, period, interval, df, baza=None, raport=None):
+    wpis = BarEntry((symbol, interval, period), df, baza, raport)
+    _SWIECE.put(wpis.klucz, wpis, wpis.size())
+    return wpis
+
+
+def _resampled(symbol, period, interval, baza):
+    wpis = _SWIECE.get((symbol, interval, period))
+    if wpis is None or wpis.baza is not baza:
+        wpis = _store(symbol, period, interval, barstore.resample(baza.df, interval), baza, baza.raport)
+    return wpis
+
+
+def get_entry(symbol, period="2y", interval="1d", ttl=None):
+    # Rzuca FetchError (barstore.get_bars), gdy nie ma ani danych, ani zapisanej historii
+    if interval in barstore.RESAMPLE:
+        return _resampled(symbol, period, interval, get_entry(symbol, period, barstore.RESAMPLE[interval], ttl))
+    wpis = _entry(symbol, period, interval, ttl)
+    if wpis is None:
+        raporty = {}
+        df = barstore.get_bars(symbol, period=period, interval=interval, raporty=raporty)
+        wpis = _store(symbol, period, interval, df, raport=raporty.get(symbol))
+    return wpis
+
+
+def get_bars(symbol, period="2y", interval="1d", ttl=None):
+    return get_entry(symbol, period, interval, ttl).df
+
+
+def get_report(symbol, period="2y", interval="1d", ttl=None):
+    # Raport kontroli jakości świec (validation.Raport) z wpisu w cache
+    return get_entry(symbol, period, interval, ttl).raport
+
+
+def get_bars_many(symbols, period="2y", interval="1d", bledy=None, ttl=None):
+    # Brakujące w cache symbole pobierane jednym wywołaniem barstore.get_bars_many
+    symbols = list(dict.fromkeys(s for s in symbols if s))
+    if interval in barstore.RESAMPLE:
+        bazowy = barstore.RESAMPLE[interval]
+        baza = get_bars_many(symbols, period, bazowy, bledy, ttl)
+        # `or get_entry` - na wypadek wyparcia wpisu bazowego w międzyczasie
+        return {s: _resampled(s, period, interval,
+                              _SWIECE.get((s, bazowy, period)) or get_entry(s, period, bazowy)).df
+                if baza[s] is not None else None for s in symbols}
+    wynik = {}
+    for s in symbols:
+        wpis = _entry(s, period, interval, ttl)
+        if wpis is not None:
+            wynik[s] = wpis.df
+    brakujace = [s for s in symbols if s not in wynik]
+    if brakujace:
+        raporty = {}
+        for s, df in barstore.get_bars_many(brakujace, period=period, interval=interval, bledy=bledy,
+                                            raporty=raporty).items():
+            wynik[s] = _store(s, period, interval, df, raport=raporty.get(s)).df if df is not None else None
+    return wynik
+
+
+def trend_frame(symbol, in_p, out_p, ema_p, atr_p, period="2y", interval="1d", ttl=None):
+    wpis = get_entry(symbol, period, interval, ttl)
+    with profiling.stage("wskazniki"):
+        return add_trend_indicators(wpis.df.copy(deep=False), in_p, out_p, ema_p, atr_p, memo=wpis.wskazniki)
+
+
+def meanrev_frame(symbol, rsi_p, atr_p, period="2y", interval="1d", ttl=None):
+    wpis = get_entry(symbol, period, interval, ttl)
+    with profiling.stage("wskazniki"):
+        return add_meanrev_indicators(wpis.df.copy(deep=False), rsi_p, atr_p, memo=wpis.wskazniki)
+
+
+def prime(symbol, wymagania, period="2y", interval="1d", ttl=None):
+    # Wszystkie wskaźniki z listy (wskaźnik, okres) naraz do memo wpisu - skaner przed
+    # systemami symbolu, żeby każdy szereg liczył się raz (przepisy.WYMAGANIA)
+    wpis = get_entry(symbol, period, interval, ttl)
+    with profiling.stage("wskazniki"):
+        precompute_indicators(wpis.df, wymagania, wpis.wskazniki)
+    return wpis
+
+
+def clear():
+    _SWIECE.clear()
@@ -0,0 +1,188 @@
+import os
+import re
+
+import pandas as pd
+
+import profiling
+from fetcher import FetchError, default_fetcher
+from kalendarz import period_start
+from validation import validate, validate_many
+
+# ==================================================
+#  LOKALNY MAGAZYN ŚWIEC OHLCV (Parquet)
+# ==================================================
+# Jeden plik na (symbol, interwał). Przy kolejnym uruchomieniu dociągamy tylko
+# świece od ostatniego zapisanego znacznika czasu zamiast całych 2 lat.
+# Katalog można zmienić zmienną środowiskową SIGNALS_DATA_DIR.
+# Pobieranie idzie przez fetcher.py (timeout, ponawianie, współbieżność); gdy
+# pobranie się nie uda, a mamy zapisaną historię, zwracamy to, co jest w magazynie.
+#
+# Wyższe interwały intraday (RESAMPLE) nie są pobierane osobno - liczone są
+# lokalnie z jednego zapisanego interwału bazowego (np. 4h z 1h).
+#
+# Magazyn trzyma surowe świece; zwracane są świece po kontroli jakości
+# (validation.py), a raporty z kontroli trafiają do słownika `raporty`, jeśli go podano.
+
+STORE_DIR = os.environ.get("SIGNALS_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+
+# Interwały do wyboru na stronach
+INTERWALY = ["1d", "4h", "1h"]
+
+# Interwał -> interwał bazowy, z którego jest składany
+RESAMPLE = {"2h": "1h", "4h": "1h"}
+
+# Najdłuższa historia, jaką Yahoo udostępnia dla interwałów intraday
+MAX_OKRES = {"1h": "720d", "90m": "59d", "30m": "59d", "15m": "59d", "5m": "59d", "2m": "59d", "1m": "7d"}
+
+
+def limit_period(period, interval):
+    # Okres przycięty do historii dostępnej dla interwału ("2y" dla 1h -> "720d")
+    limit = MAX_OKRES.get(interval)
+    if limit is None:
+        return period
+    if period == "max" or period_start(period) < period_start(limit):
+        return limit
+    return period
+
+
+def resample(df, interval):
+    # Świece wyższego interwału z bazowych; przedziały liczone od północy czasu
+    # giełdy, puste (noc, weekend) pomijane. Ostatnia świeca może być niepełna -
+    # tak samo jak bieżąca świeca dzienna.
+    agregacja = {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}
+    agregacja = {k: v for k, v in agregacja.items() if k in df.columns}
+    wynik = df.resample(interval, label="left", closed="left").agg(agregacja)
+    return wynik.dropna(subset=["close"])
+
+
+def _path(symbol, interval):
+    nazwa = re.sub(r"[^A-Za-z0-9._-]", "_", symbol)
+    return os.path.join(STORE_DIR, interval, f"{nazwa}.parquet")
+
+
+def load(symbol, interval="1d"):
+    path = _path(symbol, interval)
+    if not os.path.exists(path):
+        return None
+    with profiling.stage("magazyn.odczyt"):
+        return pd.read_parquet(path)
+
+
+def save(symbol, interval, df):
+    path = _path(symbol, interval)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Zapis przez plik tymczasowy, żeby przerwany zapis nie uszkodził magazynu
+    tmp = path + ".tmp"
+    with profiling.stage("magazyn.zapis"):
+        df.to_parquet(tmp)
+        os.replace(tmp, path)
+
+
+def merge(stored, new):
+    if new is None or new.empty:
+        return stored
+    if stored is None:
+        return new
+    new = new.reindex(columns=stored.columns)
+    # Brak nowych i zmienionych świec - zostaje zapisana ramka (bez ponownego zapisu pliku)
+    if new.index.isin(stored.index).all() and new.equals(stored.loc[new.index]):
+        return stored
+    df = pd.concat([stored, new])
+    # Ostatni zapisany bar mógł być jeszcze niezamknięty - nowsza wersja wygrywa
+    return df[~df.index.duplicated(keep="last")].sort_index()
+
+
+def _trim(df, period):
+    start = period_start(period, df.index[-1].tz_localize(None).normalize())
+    if start is None:
+        return df
+    if df.index.tz is not None:
+        start = start.tz_localize(df.index.tz)
+    return df[df.index >= start]
+
+
+def _covers(stored, period):
+    # Czy zapisana historia sięga początku żądanego okresu
+    if stored is None or stored.empty:
+        return False
+    start = period_start(period)
+    if start is None:
+        return True
+    first = stored.index[0].tz_localize(None) if stored.index.tz is not None else stored.index[0]
+    return first <= start + pd.Timedelta(days=7)
+
+
+def get_bars(symbol, period="2y", interval="1d", fetcher=None, raporty=None):
+    # Rzuca FetchError tylko wtedy, gdy nie ma ani nowych danych, ani zapisanej historii
+    if interval in RESAMPLE:
+        return resample(get_bars(symbol, period, RESAMPLE[interval], fetcher, raporty), interval)
+    period = limit_period(period, interval)
+    fetcher = fetcher or default_fetcher()
+    stored = load(symbol, interval)
+    try:
+        with profiling.stage("pobieranie"):
+            if not _covers(stored, period):
+                df = fetcher.fetch(symbol, period=period, interval=interval)
+            else:
+                df = merge(stored, fetcher.fetch(symbol, interval=interval, start=stored.index[-1]))
+    except FetchError:
+        if stored is None or stored.empty:
+            raise
+        df = stored
+    if df is not stored:
+        save(symbol, interval, df)
+    with profiling.stage("walidacja"):
+        df, raport = validate(_trim(df, period), interval, symbol)
+    if raporty is not None and raport is not None:
+        raporty[symbol] = raport
+    return df
+
+
+def get_bars_many(symbols, period="2y", interval="1d", bledy=None, fetcher=None, raporty=None):
+    # Symbole bez nowych danych i bez zapisanej historii mają wartość None; przyczyny
+    # (FetchError per symbol) trafiają do słownika `bledy`, jeśli go podano - także wtedy,
+    # gdy zwrócona została zapisana historia
+    if interval in RESAMPLE:
+        baza = get_bars_many(symbols, period, RESAMPLE[interval], bledy, fetcher, raporty)
+        return {s: resample(df, interval) if df is not None else None for s, df in baza.items()}
+    period = limit_period(period, interval)
+    fetcher = fetcher or default_fetcher()
+    symbols = list(dict.fromkeys(s for s in symbols if s))
+    stored = {s: load(s, interval) for s in symbols}
+
+    # Symbole bez (wystarczającej) historii - pełne pobranie
+    pelne = [s for s in symbols if not _covers(stored[s], period)]
+    with profiling.stage("pobieranie"):
+        nowe, porazki = fetcher.fetch_many(pelne, period=period, interval=interval)
+
+        # Pozostałe - tylko ogon od ostatniego zapisanego baru danego symbolu
+        przyrost = {s: stored[s].index[-1] for s in symbols if s not in pelne}
+        dociagniete, porazki_ogona = fetcher.fetch_many(list(przyrost), interval=interval, start=przyrost)
+    porazki.update(porazki_ogona)
+    for s in przyrost:
+        nowe[s] = merge(stored[s], dociagniete.get(s))
+    # Nieudane pełne pobranie przy krótszej zapisanej historii - jak w get_bars: to, co jest
+    # w magazynie (błąd zostaje w `bledy`)
+    for s in pelne:
+        if nowe.get(s) is None and stored[s] is not None and not stored[s].empty:
+            nowe[s] = stored[s]
+
+    if bledy is not None:
+        bledy.update(porazki)
+
+    wynik = {}
+    for s in symbols:
+        df = nowe.get(s)
+        if df is None:
+            wynik[s] = None
+            continue
+        if df is not stored[s]:
+            save(s, interval, df)
+        wynik[s] = _trim(df, period)
+
+    # Kontrola jakości wszystkich symboli jednym przebiegiem
+    with profiling.stage("walidacja"):
+        wynik, r = validate_many(wynik, interval)
+    if raporty is not None:
+        raporty.update(r)
+    return wynik
@@ -0,0 +1,345 @@
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+import barcache
+import barstore
+import fetcher
+import indicators
+import przepisy
+import stops
+from przepisy import ZŁOTE_PRZEPISY_TREND, ZŁOTE_PRZEPISY_MEANREV, SYSTEMY, WYMAGANIA
+from signallogic import (add_trend_indicators, add_meanrev_indicators, evaluate_trend, evaluate_meanrev,
+                         precompute_indicators)
+
+# ==================================================
+#  BENCHMARKI (wskaźniki, dane, sygnały, wykresy) - bez sieci
+# ==================================================
+# Dane: syntetyczne OHLCV (losowy spacer, stałe ziarno) albo nagrane wcześniej
+# świece z katalogu (--fixtures, układ jak FileSource: <symbol>.parquet|.csv).
+# Magazyn świec i źródło danych na czas pomiarów podmieniane są na katalogi
+# tymczasowe, więc benchmark nie dotyka data/ ani Yahoo.
+#
+# Dla każdego przypadku: czas (min i mediana z powtórzeń) oraz szczytowa pamięć
+# (tracemalloc, osobny przebieg). Wynik zapisywany do JSON; porównanie z bazą
+# oznacza regresje powyżej progu (kod wyjścia 1).
+#
+# Uruchomienie:
+#   python bench.py --zapisz-baze bench_baza.json     # pomiar odniesienia
+#   python bench.py --baza bench_baza.json            # po zmianie - porównanie
+#   python bench.py --grupa wskazniki --rozmiary 500,2000
+#   python bench.py --nagraj fixtures/                # zapisz świece z magazynu jako fixtures
+
+ROZMIARY = [500, 2000, 10000]
+SYMBOLE = [1, 20]
+GRUPY = ["wskazniki", "dane", "sygnaly", "wykresy"]
+
+
+def synth_ohlcv(n, seed=0, koniec=None):
+    # Losowy spacer geometryczny z sensownymi relacjami open/high/low/close
+    rng = np.random.default_rng(seed)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.02, n)))
+    open_ = close * np.exp(rng.normal(0.0, 0.005, n))
+    zakres = np.abs(rng.normal(0.0, 0.01, n)) * close
+    index = pd.date_range(end=koniec or pd.Timestamp.now().normalize(), periods=n, freq="D", name="Date")
+    return pd.DataFrame({
+        "open": open_, "high": np.maximum(open_, close) + zakres, "low": np.minimum(open_, close) - zakres,
+        "close": close, "volume": rng.integers(1_000, 100_000, n).astype(float),
+    }, index=index)
+
+
+def portfolio_symbols():
+    return list(przepisy.SYMBOLE)
+
+# --------------------------------------------------
+# 1. POMIAR
+# --------------------------------------------------
+
+def measure(fn, min_czas=0.2, min_powt=3, max_powt=50):
+    fn()  # rozgrzewka (importy, cache NumPy/matplotlib)
+    czasy = []
+    start = time.perf_counter()
+    while len(czasy) < min_powt or (time.perf_counter() - start < min_czas and len(czasy) < max_powt):
+        t0 = time.perf_counter()
+        fn()
+        czasy.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    fn()
+    _, szczyt = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "powtorzenia": len(czasy),
+        "min_ms": min(czasy) * 1000.0,
+        "mediana_ms": statistics.median(czasy) * 1000.0,
+        "pamiec_mb": szczyt / 2**20,
+    }
+
+# --------------------------------------------------
+# 2. PRZYPADKI
+# --------------------------------------------------
+# Każda funkcja zwraca listę (nazwa, funkcja bez argumentów).
+
+def indicator_cases(rozmiary, symbole):
+    przypadki = []
+    for n in rozmiary:
+        for k in symbole:
+            dane = [synth_ohlcv(n, seed=i) for i in range(k)]
+            high, low, close = (np.column_stack([d[c].to_numpy() for d in dane]).squeeze()
+                                for c in ("high", "low", "close"))
+            tag = f"n={n} x {k}"
+            przypadki += [
+                (f"ema(50) {tag}", lambda c=close: indicators.ema(c, 50)),
+                (f"ema([20,50,100,200]) {tag}", lambda c=close: indicators.ema(c, [20, 50, 100, 200])),
+                (f"atr_wilder(14) {tag}", lambda h=high, l=low, c=close: indicators.atr_wilder(h, l, c, 14)),
+                (f"donchian(20) {tag}", lambda h=high, l=low: indicators.donchian(h, l, 20)),
+                (f"rsi_sma(14) {tag}", lambda c=close: indicators.rsi_sma(c, 14)),
+                (f"atr_sma(14) {tag}", lambda h=high, l=low, c=close: indicators.atr_sma(h, l, c, 14)),
+            ]
+    return przypadki
+
+
+def data_cases(symbole):
+    import signaltrend
+    import signalmeanrev
+
+    pierwszy = symbole[0]
+    trend = next(iter(ZŁOTE_PRZEPISY_TREND.values()))
+    meanrev = next(iter(ZŁOTE_PRZEPISY_MEANREV.values()))
+
+    def wyczysc_wskazniki():
+        # Świece zostają w cache, wskaźniki liczone od nowa (jak po zmianie okresu w panelu)
+        barcache.get_entry(meanrev.symbol).wskazniki.clear()
+    return [
+        (f"barstore.load x {len(symbole)}", lambda: [barstore.load(s) for s in symbole]),
+        (f"get_bars_many x {len(symbole)} (magazyn + pliki)", lambda: barstore.get_bars_many(symbole)),
+        ("get_bars (magazyn + pliki)", lambda: barstore.get_bars(pierwszy)),
+        ("signaltrend.get_data_and_indicators (pusty cache)",
+         lambda: (barcache.clear(), signaltrend.get_data_and_indicators(trend.symbol, trend.in_p, trend.out_p,
+                                                                        trend.ema_p, trend.atr_p))),
+        ("signaltrend.get_data_and_indicators (cache)",
+         lambda: signaltrend.get_data_and_indicators(trend.symbol, trend.in_p, trend.out_p, trend.ema_p, trend.atr_p)),
+        ("signalmeanrev.get_data_and_indicators (pusty cache)",
+         lambda: (barcache.clear(), signalmeanrev.get_data_and_indicators(meanrev.symbol, meanrev.rsi_p,
+                                                                          meanrev.atr_p))),
+        ("signalmeanrev.get_data_and_indicators (cache świec)",
+         lambda: (wyczysc_wskazniki(), signalmeanrev.get_data_and_indicators(meanrev.symbol, meanrev.rsi_p,
+                                                                             meanrev.atr_p))),
+    ]
+
+
+def signal_cases(symbole):
+    from scanner import scan_portfolio
+
+    t = next(iter(ZŁOTE_PRZEPISY_TREND.values()))
+    df_t = add_trend_indicators(barstore.get_bars(t.symbol), t.in_p, t.out_p, t.ema_p, t.atr_p)
+    m = next(iter(ZŁOTE_PRZEPISY_MEANREV.values()))
+    df_m = add_meanrev_indicators(barstore.get_bars(m.symbol), m.rsi_p, m.atr_p)
+    swiece = barstore.get_bars_many(symbole)
+
+    def osobno():
+        # Każdy przepis liczy swoje wskaźniki sam (dawny skaner bez wspólnego memo)
+        for _, p in SYSTEMY:
+            df = swiece.get(p.symbol)
+            if df is not None:
+                if p.strategia == "Trend":
+                    add_trend_indicators(df.copy(deep=False), p.in_p, p.out_p, p.ema_p, p.atr_p)
+                else:
+                    add_meanrev_indicators(df.copy(deep=False), p.rsi_p, p.atr_p)
+
+    def razem():
+        for s, df in swiece.items():
+            if df is not None:
+                precompute_indicators(df, WYMAGANIA[s], barcache.LRUCache(barcache.MAX_WSKAZNIKOW))
+
+    # Stopy i wyjścia wszystkich systemów trendowych na całej historii (stops.py)
+    ramki = {n: barcache.trend_frame(p.symbol, p.in_p, p.out_p, p.ema_p, p.atr_p)
+             for n, p in ZŁOTE_PRZEPISY_TREND.items() if swiece.get(p.symbol) is not None}
+    sciezki = [(f"stops.portfolio_paths x {len(ramki)} ({b})",
+                lambda b=b: stops.portfolio_paths(ramki, ZŁOTE_PRZEPISY_TREND, b))
+               for b in (["numba", "numpy"] if stops.BACKEND == "numba" else ["numpy"])]
+    return [
+        ("evaluate_trend", lambda: evaluate_trend(df_t, t.in_p, t.m_sl, t.k_tsl, t.mult, 10000.0, 0.04)),
+        ("evaluate_meanrev", lambda: evaluate_meanrev(df_m, m.m_sl, m.l_ent, m.l_ex, m.s_ent, m.s_ex, m.mult,
+                                                      10000.0, 0.04)),
+        ("add_trend_indicators + evaluate_trend",
+         lambda: evaluate_trend(add_trend_indicators(df_t[["open", "high", "low", "close", "volume"]].copy(),
+                                                     t.in_p, t.out_p, t.ema_p, t.atr_p),
+                                t.in_p, t.m_sl, t.k_tsl, t.mult, 10000.0, 0.04)),
+        (f"wskaźniki {len(SYSTEMY)} przepisów osobno", osobno),
+        (f"precompute_indicators x {len(swiece)} (przepisy.WYMAGANIA)", razem),
+        *sciezki,
+        (f"scan_portfolio ({len(symbole)} symboli, cache)", lambda: scan_portfolio()),
+        (f"scan_portfolio ({len(symbole)} symboli, ttl=0)", lambda: scan_portfolio(ttl=0)),
+    ]
+
+
+def chart_cases(symbole):
+    import charts
+
+    t = next(iter(ZŁOTE_PRZEPISY_TREND.values()))
+    symbol, in_p, ema_p = t.symbol, t.in_p, t.ema_p
+    df_t = add_trend_indicators(barstore.get_bars(symbol), t.in_p, t.out_p, t.ema_p, t.atr_p)
+    m = next(iter(ZŁOTE_PRZEPISY_MEANREV.values()))
+    symbol_m, rsi_p, l_ent, l_ex, s_ent, s_ex = m.symbol, m.rsi_p, m.l_ent, m.l_ex, m.s_ent, m.s_ex
+    df_m = add_meanrev_indicators(barstore.get_bars(symbol_m), m.rsi_p, m.atr_p)
+    dane = {s: (s, df) for s, df in barstore.get_bars_many(symbole).items()}
+
+    def png(fig):
+        # Dawna ścieżka stron (st.pyplot): rysunek matplotlib zapisany do PNG
+        bufor = io.BytesIO()
+        fig.savefig(bufor, format="png")
+        plt.close(fig)
+        return bufor
+
+    def matplotlib_trend():
+        fig, ax = plt.subplots(figsize=(12, 6))
+        df_plot = df_t.tail(charts.PUNKTY)
+        for kolumna in ["close", "ema", "highest_in", "lowest_in"]:
+            ax.plot(df_plot.index, df_plot[kolumna])
+        return png(fig)
+
+    def spec(funkcja, *args):
+        # Budowa specyfikacji od zera (pusty cache) + serializacja jak w st.vega_lite_chart
+        charts.clear()
+        return json.dumps(funkcja(*args))
+
+    return [
+        ("matplotlib trend + PNG (odniesienie)", matplotlib_trend),
+        ("charts.trend_chart (nowy)", lambda: spec(charts.trend_chart, df_t, symbol, in_p, ema_p)),
+        ("charts.trend_chart (cache)", lambda: charts.trend_chart(df_t, symbol, in_p, ema_p)),
+        ("charts.meanrev_chart (nowy)",
+         lambda: spec(charts.meanrev_chart, df_m, symbol_m, rsi_p, l_ent, s_ent, l_ex, s_ex)),
+        (f"charts.overview_chart ({len(dane)} symboli, nowy)", lambda: spec(charts.overview_chart, dane)),
+    ]
+
+# --------------------------------------------------
+# 3. ŚRODOWISKO TESTOWE (magazyn i źródło danych w katalogach tymczasowych)
+# --------------------------------------------------
+
+def prepare_environment(fixtures=None, n=800):
+    tmp = tempfile.mkdtemp(prefix="signals-bench-")
+    zrodlo = fixtures
+    if zrodlo is None:
+        zrodlo = os.path.join(tmp, "fixtures")
+        os.makedirs(zrodlo)
+        for i, s in enumerate(portfolio_symbols()):
+            synth_ohlcv(n, seed=i).to_parquet(os.path.join(zrodlo, fetcher.FileSource.file_name(s) + ".parquet"))
+
+    barstore.STORE_DIR = os.path.join(tmp, "magazyn")
+    fetcher._DOMYSLNY = fetcher.Fetcher(fetcher.FileSource(zrodlo))
+    # Pierwsze pobranie wypełnia magazyn - pomiary mierzą ścieżkę przyrostową
+    dane = barstore.get_bars_many(portfolio_symbols())
+    symbole = [s for s, df in dane.items() if df is not None]
+    return tmp, symbole
+
+
+def record_fixtures(katalog):
+    # Świece z lokalnego magazynu (data/) zapisane jako fixtures - bez pobierania
+    os.makedirs(katalog, exist_ok=True)
+    zapisane = 0
+    for s in portfolio_symbols():
+        df = barstore.load(s)
+        if df is not None:
+            df.to_parquet(os.path.join(katalog, fetcher.FileSource.file_name(s) + ".parquet"))
+            zapisane += 1
+    return zapisane
+
+# --------------------------------------------------
+# 4. PORÓWNANIE Z BAZĄ
+# --------------------------------------------------
+
+def compare(wyniki, baza, prog):
+    stare = {w["nazwa"]: w for w in baza["wyniki"]}
+    wiersze = []
+    for w in wyniki:
+        b = stare.get(w["nazwa"])
+        if b is None:
+            continue
+        # Minimum z powtórzeń jest najmniej wrażliwe na szum (inne procesy, GC)
+        zmiana = w["min_ms"] / b["min_ms"] - 1.0 if b["min_ms"] > 0 else 0.0
+        ocena = "REGRESJA" if zmiana > prog else ("szybciej" if zmiana < -prog else "")
+        wiersze.append({"nazwa": w["nazwa"], "baza_ms": b["min_ms"], "teraz_ms": w["min_ms"],
+                        "zmiana": zmiana, "pamiec_baza_mb": b["pamiec_mb"], "pamiec_mb": w["pamiec_mb"],
+                        "ocena": ocena})
+    return pd.DataFrame(wiersze)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarki wskaźników, danych, sygnałów i wykresów (bez sieci)")
+    parser.add_argument("--grupa", action="append", choices=GRUPY, help="Tylko wybrane grupy (można powtórzyć)")
+    parser.add_argument("--rozmiary", default=",".join(map(str, ROZMIARY)), help="Liczby świec dla wskaźników")
+    parser.add_argument("--symbole", default=",".join(map(str, SYMBOLE)), help="Liczby symboli (kolumn) dla wskaźników")
+    parser.add_argument("--fixtures", help="Katalog z nagranymi świecami zamiast danych syntetycznych")
+    parser.add_argument("--nagraj", metavar="KATALOG", help="Zapisz świece z magazynu jako fixtures i zakończ")
+    parser.add_argument("--wynik", default="bench_wynik.json", help="Plik JSON z wynikami")
+    parser.add_argument("--baza", help="Plik JSON z pomiarem odniesienia do porównania")
+    parser.add_argument("--zapisz-baze", metavar="PLIK", help="Zapisz wyniki także jako nową bazę")
+    parser.add_argument("--prog", type=float, default=25.0, help="Próg regresji czasu minimalnego (%%)")
+    args = parser.parse_args(argv)
+
+    if args.nagraj:
+        print(f"Zapisano {record_fixtures(args.nagraj)} symboli do {args.nagraj}")
+        return
+
+    grupy = args.grupa or GRUPY
+    tmp, symbole = prepare_environment(args.fixtures)
+    try:
+        przypadki = []
+        if "wskazniki" in grupy:
+            rozmiary = [int(x) for x in args.rozmiary.split(",")]
+            przypadki += [("wskazniki", *p) for p in indicator_cases(rozmiary, [int(x) for x in args.symbole.split(",")])]
+        if "dane" in grupy:
+            przypadki += [("dane", *p) for p in data_cases(symbole)]
+        if "sygnaly" in grupy:
+            przypadki += [("sygnaly", *p) for p in signal_cases(symbole)]
+        if "wykresy" in grupy:
+            przypadki += [("wykresy", *p) for p in chart_cases(symbole)]
+
+        wyniki = []
+        for grupa, nazwa, fn in przypadki:
+            w = {"grupa": grupa, "nazwa": nazwa, **measure(fn)}
+            wyniki.append(w)
+            print(f"{grupa:<10} {nazwa:<52} {w['mediana_ms']:>10.3f} ms  (min {w['min_ms']:.3f}, "
+                  f"{w['powtorzenia']}x)  {w['pamiec_mb']:>8.2f} MB")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    raport = {
+        "czas": pd.Timestamp.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+        "maszyna": platform.platform(), "dane": args.fixtures or "syntetyczne",
+        "wyniki": wyniki,
+    }
+    with open(args.wynik, "w", encoding="utf-8") as f:
+        json.dump(raport, f, ensure_ascii=False, indent=1)
+    if args.zapisz_baze:
+        with open(args.zapisz_baze, "w", encoding="utf-8") as f:
+            json.dump(raport, f, ensure_ascii=False, indent=1)
+
+    if args.baza:
+        with open(args.baza, encoding="utf-8") as f:
+            porownanie = compare(wyniki, json.load(f), args.prog / 100.0)
+        print()
+        with pd.option_context("display.max_rows", None, "display.width", 200):
+            print(porownanie.to_string(index=False, formatters={"zmiana": "{:+.1%}".format}))
+        regresje = int((porownanie["ocena"] == "REGRESJA").sum()) if not porownanie.empty else 0
+        if regresje:
+            parser.exit(1, f"\n{regresje} regresji powyżej {args.prog:.0f}%\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import numpy as np
+
+from barcache import LRUCache
+
+# ==================================================
+#  WYKRESY (Vega-Lite rysowane w przeglądarce)
+# ==================================================
+# Zamiast rysunku matplotlib renderowanego do PNG przy każdej interakcji - specyfikacja
+# Vega-Lite z ostatnimi PUNKTY świecami (st.vega_lite_chart), rysowana po stronie
+# przeglądarki. Gotowe specyfikacje trzymane są w cache LRU z kluczem
+# (symbol, parametry, ostatnia świeca) - zmiana kapitału czy ryzyka w panelu bocznym
+# nie buduje wykresu od nowa, nowa świeca (albo zmiana ceny tworzącej się świecy) tak.
+#
+# Funkcje zwracają słownik specyfikacji - współdzielony, nie wolno go modyfikować.
+
+PUNKTY = 100            # świece na wykresie strony
+PUNKTY_PRZEGLAD = 60    # świece na małym wykresie w przeglądzie portfela
+MAX_WYKRESOW = 64
+
+_WYKRESY = LRUCache(MAX_WYKRESOW, nazwa="wykresy")
+
+
+def _ostatnia(df):
+    # Ostatnia świeca z ceną - rewizja tworzącej się świecy też zmienia klucz
+    return (df.index[-1], float(df["close"].iloc[-1]), len(df)) if len(df) else None
+
+
+def _czasy(index):
+    # Czas lokalny giełdy bez strefy (jak na osi matplotlib); datetime_as_string zamiast wolnego strftime
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return np.datetime_as_string(index.to_numpy(dtype="datetime64[s]"), unit="s").astype(object)
+
+
+def _serie(df, kolumny, n):
+    # Format długi {t, seria, v} dla ostatnich n świec; NaN (rozbieg wskaźnika) pomijane
+    df = df.tail(n)
+    t = _czasy(df.index)
+    wartosci = []
+    for kolumna, nazwa in kolumny:
+        v = df[kolumna].to_numpy(dtype=float)
+        ok = ~np.isnan(v)
+        wartosci += [{"t": ti, "seria": nazwa, "v": vi} for ti, vi in zip(t[ok], v[ok].tolist())]
+    return wartosci
+
+
+def _linie(wartosci, kolory, kreski=None, tytul_y=None):
+    kodowanie = {
+        "x": {"field": "t", "type": "temporal", "title": None},
+        "y": {"field": "v", "type": "quantitative", "scale": {"zero": False}, "title": tytul_y},
+        "color": {"field": "seria", "type": "nominal", "title": None,
+                  "scale": {"domain": list(kolory), "range": list(kolory.values())},
+                  "legend": {"orient": "top-left"}},
+    }
+    if kreski:
+        kodowanie["strokeDash"] = {"field": "seria", "type": "nominal", "legend": None,
+                                   "scale": {"domain": list(kreski), "range": list(kreski.values())}}
+    return {"data": {"values": wartosci}, "mark": {"type": "line", "strokeWidth": 1.5},
+            "encoding": kodowanie}
+
+
+def trend_chart(df, symbol, in_p, ema_p, n=PUNKTY):
+    # Cena, EMA i kanał IN (df z barcache.trend_frame)
+    klucz = ("trend", symbol, in_p, ema_p, n, _ostatnia(df))
+    return _WYKRESY.memo(klucz, lambda: _trend_spec(df, symbol, in_p, ema_p, n))
+
+
+def _trend_spec(df, symbol, in_p, ema_p, n):
+    nazwy = {"close": "Cena", "ema": f"EMA ({ema_p})",
+             "highest_in": f"Max ({in_p})", "lowest_in": f"Min ({in_p})"}
+    kolory = dict(zip(nazwy.values(), ["black", "blue", "green", "red"]))
+    kreski = {nazwy["ema"]: [6, 3]}
+    kreski.update({s: [1, 0] for s in nazwy.values() if s not in kreski})
+    spec = _linie(_serie(df, nazwy.items(), n), kolory, kreski)
+    spec["title"] = f"{symbol} - Analiza Techniczna"
+    spec["height"] = 400
+    return spec
+
+
+def meanrev_chart(df, symbol, rsi_p, l_ent, s_ent, l_ex, s_ex, n=PUNKTY):
+    # Cena i surowe RSI z progami wejścia/wyjścia (df z barcache.meanrev_frame).
+    # Okres RSI w kluczu - ta sama ostatnia świeca z innym okresem to inna seria RSI
+    klucz = ("meanrev", symbol, rsi_p, l_ent, s_ent, l_ex, s_ex, n, _ostatnia(df))
+    return _WYKRESY.memo(klucz, lambda: _meanrev_spec(df, symbol, rsi_p, l_ent, s_ent, l_ex, s_ex, n))
+
+
+def _meanrev_spec(df, symbol, rsi_p, l_ent, s_ent, l_ex, s_ex, n):
+    cena = _linie(_serie(df, [("close", "Cena")], n), {"Cena": "black"})
+    cena.update({"title": f"Cena {symbol}", "height": 260})
+    cena["encoding"]["color"]["legend"] = None
+
+    nazwa_rsi = f"RSI ({rsi_p})"
+    rsi = _linie(_serie(df, [("rsi", nazwa_rsi)], n), {nazwa_rsi: "purple"})
+    rsi["encoding"]["y"]["scale"] = {"domain": [0, 100]}
+    progi = [("L Ent", l_ent, "green", [6, 3]), ("S Ent", s_ent, "red", [6, 3]),
+             ("L Ex", l_ex, "blue", [2, 2]), ("S Ex", s_ex, "orange", [2, 2])]
+    linie_progow = [{"mark": {"type": "rule", "color": kolor, "strokeDash": kreska},
+                     "encoding": {"y": {"datum": poziom}, "tooltip": {"value": f"{nazwa}: {poziom}"}}}
+                    for nazwa, poziom, kolor, kreska in progi]
+    return {"vconcat": [cena, {"layer": [rsi] + linie_progow, "height": 130}],
+            "resolve": {"scale": {"x": "shared"}}}
+
+
+def overview_chart(dane, n=PUNKTY_PRZEGLAD, kolumny=4):
+    # Małe wykresy ceny dla wielu systemów naraz - jedna specyfikacja z podziałem (facet)
+    # dane - {nazwa systemu: (symbol, df ze świecami)}; systemy bez danych pomijane
+    dane = {nazwa: (s, df) for nazwa, (s, df) in dane.items() if df is not None and len(df)}
+    klucz = ("przeglad", n, kolumny, tuple((nazwa, s, _ostatnia(df)) for nazwa, (s, df) in dane.items()))
+    return _WYKRESY.memo(klucz, lambda: _overview_spec(dane, n, kolumny))
+
+
+def _overview_spec(dane, n, kolumny):
+    wartosci = []
+    for nazwa, (symbol, df) in dane.items():
+        df = df.tail(n)
+        close = df["close"].to_numpy(dtype=float)
+        # Zmiana od początku okna - kierunek widać bez czytania osi
+        zmiana = close[-1] / close[0] - 1.0 if close[0] > 0 else 0.0
+        panel = f"{nazwa} ({symbol}) {zmiana:+.1%}"
+        wartosci += [{"t": t, "panel": panel, "v": v, "kierunek": "wzrost" if zmiana >= 0 else "spadek"}
+                     for t, v in zip(_czasy(df.index), close.tolist()) if v == v]
+    return {
+        "data": {"values": wartosci},
+        "facet": {"field": "panel", "type": "nominal", "title": None, "sort": None,
+                  "header": {"labelFontSize": 11}},
+        "columns": kolumny,
+        "spec": {
+            "width": 180, "height": 80,
+            "mark": {"type": "line", "strokeWidth": 1},
+            "encoding": {
+                "x": {"field": "t", "type": "temporal", "title": None, "axis": {"labels": False}},
+                "y": {"field": "v", "type": "quantitative", "scale": {"zero": False}, "title": None},
+                "color": {"field": "kierunek", "type": "nominal", "legend": None,
+                          "scale": {"domain": ["wzrost", "spadek"], "range": ["green", "red"]}},
+            },
+        },
+        "resolve": {"scale": {"x": "independent", "y": "independent"}},
+    }
+
+
+def clear():
+    _WYKRESY.clear()
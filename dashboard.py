@@ -1,5 +1,45 @@
+import pandas as pd
 import streamlit as st
 
+import signaltrend
+import signalmeanrev
+from scanner import scan_portfolio
+from portfolio import size_portfolio
+from przepisy import SYSTEMY
+import barcache
+import charts
+import profiling
+
+
+def debug_panel(profil):
+    # Gdzie poszedł czas tej interakcji (etapy), trafienia cache i pamięć; niżej sumy procesu
+    wpis = profil.as_dict()
+    with st.expander(f"Debug: {wpis['ms']:.0f} ms, {len(wpis['etapy'])} etapów"):
+        k1, k2, k3 = st.columns(3)
+        k1.metric("Interakcja", f"{wpis['ms']:.1f} ms")
+        pamiec = wpis["pamiec"]
+        if pamiec["rss_mb"] is not None:
+            zmiana = pamiec["rss_zmiana_mb"]
+            k2.metric("Pamięć (RSS)", f"{pamiec['rss_mb']:.0f} MB",
+                      delta=f"{zmiana:+.1f} MB" if zmiana is not None else None, delta_color="inverse")
+        wskazniki = profiling.gauges()
+        k3.metric("Cache świec", f"{wskazniki['barcache_mb']:.1f} MB ({wskazniki['barcache_wpisy']} wpisów)")
+
+        st.markdown("**Etapy tej interakcji**")
+        st.dataframe(pd.DataFrame(profil.summary(), columns=["etap", "liczba", "ms"]),
+                     hide_index=True, use_container_width=True)
+        if wpis["liczniki"]:
+            st.markdown("**Cache (trafienia / chybienia)**")
+            st.dataframe(pd.DataFrame([{"Licznik": k, "Liczba": v} for k, v in sorted(wpis["liczniki"].items())]),
+                         hide_index=True, use_container_width=True)
+
+        st.markdown("**Sumy procesu** (od startu lub ostatniego resetu)")
+        metryki = profiling.metrics(ostatnie=0)
+        st.dataframe(pd.DataFrame.from_dict(metryki["etapy"], orient="index"), use_container_width=True)
+        if st.button("Zeruj sumy", key="debug_reset"):
+            profiling.reset()
+
+
 # Ustawienie strony (Musi być pierwszą komendą Streamlit)
 st.set_page_config(page_title="Dashboard", layout="wide")
 
@@ -7,38 +47,75 @@ st.set_page_config(page_title="Dashboard", layout="wide")
 st.title("Dashboard")
 st.markdown("---")
 
-# Tworzymy zakładki (Tabs)
-tab1, tab2 = st.tabs(["Strategia podążania za trendem", "Mean Reversion"])
-
-# --- ZAKŁADKA 1: TREND FOLLOWING ---
-with tab1:
-    st.header("System Podążania za Trendem")
-    st.caption("Głównie krypto")
-    
-    # Uruchamiamy kod z drugiego pliku
-    # Używamy exec(open(...).read()) aby wczytać i wykonać kod
-    try:
-        with open("signaltrend.py", encoding="utf-8") as f:
-            code = f.read()
-            # Usuwamy linię z set_page_config, bo może być wywołana tylko raz w dashboardzie
-            code = code.replace("st.set_page_config", "# st.set_page_config")
-            exec(code)
-    except FileNotFoundError:
-        st.error("Błąd: Nie znaleziono pliku 'signaltrend.py'. Upewnij się, że jest w tym samym folderze.")
-
-# --- ZAKŁADKA 2: MEAN REVERSION ---
-with tab2:
-    st.header("System Powrotu do Średniej")
-    st.caption("Rynki: towary, indeksy, waluty...")
-    
-    try:
-        with open("signalmeanrev.py", encoding="utf-8") as f:
-            code = f.read()
-            # Usuwamy linię z set_page_config
-            code = code.replace("st.set_page_config", "# st.set_page_config")
-            exec(code)
-    except FileNotFoundError:
-        st.error("Błąd: Nie znaleziono pliku 'signalmeanrev.py'. Upewnij się, że jest w tym samym folderze.")
+# Wybór widoku - w przeciwieństwie do st.tabs liczy się tylko aktywna zakładka,
+# a strategie są importowane raz (bez ponownego exec() plików przy każdej interakcji)
+ZAKLADKI = ["Strategia podążania za trendem", "Mean Reversion", "Skaner portfela", "Przegląd portfela"]
+aktywna = st.radio("Widok", ZAKLADKI, horizontal=True, label_visibility="collapsed")
+
+# Profilowanie (profiling.py): SIGNALS_PROFIL=1 albo ?debug=1 w adresie strony -
+# czasy etapów tej interakcji, trafienia cache i pamięć w panelu na dole strony.
+# ?debug=1 włącza pomiary tylko dla przeliczeń tej sesji, bez zmiany flagi procesu
+DEBUG = profiling.WLACZONE or st.query_params.get("debug") == "1"
+
+with profiling.interaction(f"dashboard: {aktywna}", wlacz=DEBUG) as profil:
+    # --- ZAKŁADKA 1: TREND FOLLOWING ---
+    if aktywna == ZAKLADKI[0]:
+        st.header("System Podążania za Trendem")
+        st.caption("Głównie krypto")
+        signaltrend.render()
+
+    # --- ZAKŁADKA 2: MEAN REVERSION ---
+    elif aktywna == ZAKLADKI[1]:
+        st.header("System Powrotu do Średniej")
+        st.caption("Rynki: towary, indeksy, waluty...")
+        signalmeanrev.render()
+
+    # --- ZAKŁADKA 3: SKANER PORTFELA ---
+    elif aktywna == ZAKLADKI[2]:
+        st.header("Skaner portfela")
+        st.caption("Wszystkie systemy z obu tabel ZŁOTYCH PRZEPISÓW w jednym przebiegu")
+
+        skan_kapital = st.number_input("Kapitał (Equity)", value=10000.0, step=100.0, key="skan_kapital")
+        skan_ryzyko = st.number_input("Ryzyko (%)", value=4.0, step=0.5, key="skan_ryzyko") / 100.0
+        skan_portfel = st.checkbox("Limity ryzyka portfela (korelacje, klastry, dźwignia)", key="skan_portfel")
+
+        if st.button("Skanuj portfel"):
+            with profiling.stage("skaner"):
+                st.session_state["skan_wynik"] = scan_portfolio(skan_kapital, skan_ryzyko)
+
+        if "skan_wynik" in st.session_state:
+            skan = st.session_state["skan_wynik"]
+            sygnaly = skan[skan["Sygnał"].isin(["LONG", "SHORT"])]
+            if skan_portfel:
+                # Przeliczenie całej księgi to milisekundy - świece są już w barcache po skanie
+                with profiling.stage("portfel"):
+                    skan, portfel = size_portfolio(skan, skan_kapital)
+                k1, k2, k3, k4 = st.columns(4)
+                k1.metric("Aktywne sygnały wejścia", len(sygnaly))
+                k2.metric("Ryzyko (suma / skorelowane)",
+                          f"{portfel['ryzyko_suma']:.0f} / {portfel['ryzyko_skorelowane']:.0f}")
+                k3.metric("Ryzyko po limitach", f"{portfel['ryzyko_po']:.0f}")
+                k4.metric("Dźwignia brutto", f"{portfel['dzwignia']:.2f}x")
+            else:
+                st.metric("Aktywne sygnały wejścia", len(sygnaly))
+            st.dataframe(skan, use_container_width=True, hide_index=True)
+
+    # --- ZAKŁADKA 4: PRZEGLĄD PORTFELA ---
+    else:
+        st.header("Przegląd portfela")
+        st.caption(f"Cena z ostatnich {charts.PUNKTY_PRZEGLAD} świec dla każdego ZŁOTEGO PRZEPISU - jeden wykres")
+
+        # Jedna specyfikacja Vega-Lite z małymi wykresami zamiast osobnego rysunku na system
+        systemy = {n: p.symbol for n, p in SYSTEMY}
+        swiece = barcache.get_bars_many(list(systemy.values()))
+        with profiling.stage("wykres"):
+            st.vega_lite_chart(charts.overview_chart({n: (s, swiece.get(s)) for n, s in systemy.items()}))
+        brak = [n for n, s in systemy.items() if swiece.get(s) is None]
+        if brak:
+            st.warning(f"Brak danych: {', '.join(brak)}")
+
+if DEBUG and profil is not None:
+    debug_panel(profil)
 
 # Stopka
 st.markdown("---")
@@ -0,0 +1,193 @@
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import marketdata
+from kalendarz import period_start
+
+# ==================================================
+#  WARSTWA POBIERANIA DANYCH (współbieżnie, z limitem i ponawianiem)
+# ==================================================
+# * pula wątków z limitem równoległych zapytań,
+# * limit zapytań na sekundę (wspólny dla wszystkich wątków),
+# * timeout na pojedyncze zapytanie przekazywany do źródła (gniazdo / HTTP) - zawieszony
+#   symbol nie blokuje pozostałych, bez dodatkowych wątków na każde zapytanie,
+# * ponawianie z wykładniczym odstępem (tylko błędy i timeouty, nie pusty wynik),
+# * błędy zwracane per symbol jako FetchError zamiast cichego None.
+#
+# Źródło danych jest wymienne: YahooSource (domyślne) albo FileSource - pliki
+# CSV/Parquet z katalogu, do testów i pracy offline. Wybór przez zmienną
+# środowiskową SIGNALS_SOURCE, np. SIGNALS_SOURCE=pliki:/sciezka/do/katalogu
+
+
+class FetchError(Exception):
+    # rodzaj: "timeout", "blad" (wyjątek źródła) albo "brak_danych" (pusty wynik)
+    def __init__(self, symbol, rodzaj, komunikat, proby=1):
+        super().__init__(f"{symbol}: {komunikat}")
+        self.symbol = symbol
+        self.rodzaj = rodzaj
+        self.komunikat = komunikat
+        self.proby = proby
+
+
+# --------------------------------------------------
+# 1. ŹRÓDŁA DANYCH
+# --------------------------------------------------
+# Interfejs: fetch(symbol, period, interval, start=None, timeout=None)
+# zwraca DataFrame (kolumny open/high/low/close/volume, małe litery) albo None.
+# Źródło sieciowe musi samo przestrzegać `timeout` (sekundy na zapytanie) i zgłaszać
+# błędy wyjątkiem - None / pusta ramka znaczy "brak notowań" i nie jest ponawiana.
+# na_sekunde - domyślny limit zapytań na sekundę dla źródła (None = bez limitu).
+
+class YahooSource:
+    nazwa = "yahoo"
+    na_sekunde = 5.0
+
+    def fetch(self, symbol, period="2y", interval="1d", start=None, timeout=None):
+        return marketdata.download(symbol, period=period, interval=interval, start=start, timeout=timeout)
+
+
+class FileSource:
+    # Plik na symbol: <katalog>/<symbol>.parquet albo <katalog>/<symbol>.csv
+    # (znaki spoza [A-Za-z0-9._-] zamienione na "_", np. ^NDX -> _NDX.csv)
+    nazwa = "pliki"
+    na_sekunde = None
+
+    def __init__(self, katalog):
+        self.katalog = katalog
+
+    @staticmethod
+    def file_name(symbol):
+        return re.sub(r"[^A-Za-z0-9._-]", "_", symbol)
+
+    def _path(self, symbol):
+        nazwa = self.file_name(symbol)
+        for rozszerzenie in (".parquet", ".csv"):
+            path = os.path.join(self.katalog, nazwa + rozszerzenie)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def fetch(self, symbol, period="2y", interval="1d", start=None, timeout=None):
+        # timeout bez znaczenia - odczyt lokalnego pliku
+        path = self._path(symbol)
+        if path is None:
+            return None
+        if path.endswith(".parquet"):
+            df = pd.read_parquet(path)
+        else:
+            df = pd.read_csv(path, index_col=0, parse_dates=True)
+        df = marketdata.normalize_columns(df).sort_index()
+        if start is not None:
+            od = pd.Timestamp(start)
+        elif period != "max":
+            od = period_start(period, df.index[-1].tz_localize(None).normalize())
+        else:
+            od = None
+        if od is not None:
+            # Znaczniki ze strefą (intraday) porównujemy w strefie pliku
+            if df.index.tz is not None and od.tz is None:
+                od = od.tz_localize(df.index.tz)
+            elif df.index.tz is None and od.tz is not None:
+                od = od.tz_convert(None)
+            df = df[df.index >= od]
+        return df if not df.empty else None
+
+
+def source_from_env():
+    ustawienie = os.environ.get("SIGNALS_SOURCE", "yahoo")
+    if ustawienie.startswith("pliki:"):
+        return FileSource(ustawienie.split(":", 1)[1])
+    return YahooSource()
+
+# --------------------------------------------------
+# 2. POBIERANIE
+# --------------------------------------------------
+
+class _RateLimiter:
+    # Minimalny odstęp między startami zapytań (wspólny dla wątków)
+    def __init__(self, na_sekunde):
+        self.odstep = 1.0 / na_sekunde if na_sekunde else 0.0
+        self.lock = threading.Lock()
+        self.nastepny = 0.0
+
+    def wait(self):
+        if not self.odstep:
+            return
+        with self.lock:
+            teraz = time.monotonic()
+            start = max(teraz, self.nastepny)
+            self.nastepny = start + self.odstep
+        if start > teraz:
+            time.sleep(start - teraz)
+
+
+class Fetcher:
+    def __init__(self, source=None, max_workers=8, timeout=20.0, retries=3, backoff=1.0, na_sekunde=None):
+        self.source = source if source is not None else source_from_env()
+        # None - limit domyślny źródła, 0 - bez limitu
+        if na_sekunde is None:
+            na_sekunde = getattr(self.source, "na_sekunde", None)
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.limiter = _RateLimiter(na_sekunde)
+
+    def fetch(self, symbol, period="2y", interval="1d", start=None):
+        for proba in range(1, self.retries + 1):
+            self.limiter.wait()
+            try:
+                # Timeout egzekwuje źródło (yfinance / requests) - przerwane zapytanie zamyka gniazdo
+                df = self.source.fetch(symbol, period=period, interval=interval, start=start, timeout=self.timeout)
+            except Exception as e:
+                if _timeout(e):
+                    blad = FetchError(symbol, "timeout", f"brak odpowiedzi po {self.timeout:g} s ({e})", proba)
+                else:
+                    blad = FetchError(symbol, "blad", f"{type(e).__name__}: {e}", proba)
+            else:
+                if df is None or df.empty:
+                    raise FetchError(symbol, "brak_danych", "brak danych (zły symbol?)", proba)
+                return df
+            if proba < self.retries:
+                # Wykładniczy odstęp z losowym rozrzutem
+                time.sleep(self.backoff * 2 ** (proba - 1) * (0.5 + random.random()))
+        raise blad
+
+    def fetch_many(self, symbols, period="2y", interval="1d", start=None):
+        # Zwraca (dane, bledy): {symbol: DataFrame} i {symbol: FetchError}
+        symbols = list(dict.fromkeys(s for s in symbols if s))
+        dane, bledy = {}, {}
+        if not symbols:
+            return dane, bledy
+        starty = start if isinstance(start, dict) else {s: start for s in symbols}
+
+        def jeden(symbol):
+            try:
+                dane[symbol] = self.fetch(symbol, period, interval, starty.get(symbol))
+            except FetchError as e:
+                bledy[symbol] = e
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(symbols))) as pool:
+            list(pool.map(jeden, symbols))
+        return dane, bledy
+
+
+def _timeout(e):
+    # socket.timeout to TimeoutError; requests / urllib3 mają własne klasy (ReadTimeout, ConnectTimeout...)
+    return isinstance(e, TimeoutError) or "Timeout" in type(e).__name__
+
+
+_DOMYSLNY = None
+
+
+def default_fetcher():
+    global _DOMYSLNY
+    if _DOMYSLNY is None:
+        _DOMYSLNY = Fetcher()
+    return _DOMYSLNY
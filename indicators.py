@@ -0,0 +1,175 @@
+import numpy as np
+
+# ==================================================
+#  SILNIK WSKAŹNIKÓW (czysty NumPy)
+# ==================================================
+# Wejście: tablica 1-D (świece) albo 2-D (świece x symbole), oś 0 = czas.
+# Okres może być liczbą albo listą okresów - wtedy wynik ma dodatkową
+# pierwszą oś (okresy x świece [x symbole]) i jest liczony w jednym przebiegu.
+# Semantyka jak w pandas: rolling(window) daje NaN dla pierwszych window-1 świec,
+# ewm(adjust=False) startuje od pierwszej wartości.
+
+
+def _as_float(x):
+    return np.asarray(x, dtype=np.float64)
+
+
+def _periods(period):
+    if np.ndim(period) == 0:
+        return [int(period)], True
+    return [int(p) for p in period], False
+
+
+def shift(x, n=1):
+    # Odpowiednik Series.shift(n) wzdłuż osi czasu
+    x = _as_float(x)
+    out = np.full_like(x, np.nan)
+    if n > 0:
+        out[n:] = x[:-n]
+    elif n < 0:
+        out[:n] = x[-n:]
+    else:
+        out[:] = x
+    return out
+
+
+def ewma(x, alpha):
+    # Rekurencyjna średnia wykładnicza (pandas ewm(alpha=..., adjust=False)).
+    # alpha może być wektorem - wszystkie okresy liczone w jednej pętli po czasie.
+    x = _as_float(x)
+    alpha = _as_float(alpha).reshape((-1,) + (1,) * (x.ndim - 1))
+    out = np.empty((alpha.shape[0],) + x.shape)
+    n = x.shape[0]
+    if n == 0:
+        return out
+
+    if not np.isnan(x).any():
+        if out.shape[0] == 1 and x.ndim == 1:
+            # Jeden szereg i jeden okres - pętla na floatach Pythona jest tu najszybsza
+            a = float(alpha[0])
+            b = 1.0 - a
+            vals = x.tolist()
+            res = [0.0] * n
+            prev = res[0] = vals[0]
+            for t in range(1, n):
+                prev = a * vals[t] + b * prev
+                res[t] = prev
+            out[0] = res
+            return out
+        beta = 1.0 - alpha
+        prev = out[:, 0] = x[0]
+        for t in range(1, n):
+            prev = out[:, t] = alpha * x[t] + beta * prev
+        return out
+
+    # Luki (NaN) jak w pandas (ignore_na=False): za każdą brakującą świecę waga starej
+    # wartości maleje o (1-alpha), a wynik przez lukę trzyma poprzednią wartość
+    beta = 1.0 - alpha
+    prev = np.broadcast_to(x[0], out[:, 0].shape).copy()
+    old_wt = np.ones_like(prev)  # (1-alpha)^(liczba świec od ostatniej obserwacji)
+    out[:, 0] = prev
+    for t in range(1, n):
+        xt = x[t]
+        obs = ~np.isnan(xt)
+        started = ~np.isnan(prev)
+        old_wt = np.where(started, old_wt * beta, old_wt)
+        cur = (old_wt * prev + alpha * xt) / (old_wt + alpha)
+        cur = np.where(started, cur, xt)
+        cur = np.where(obs, cur, prev)
+        old_wt = np.where(obs, 1.0, old_wt)
+        out[:, t] = cur
+        prev = cur
+    return out
+
+
+def ema(x, span):
+    spans, single = _periods(span)
+    out = ewma(x, [2.0 / (s + 1.0) for s in spans])
+    return out[0] if single else out
+
+
+def wilder(x, period):
+    # Wygładzanie Wildera: ewm(alpha=1/period, adjust=False)
+    periods, single = _periods(period)
+    out = ewma(x, [1.0 / p for p in periods])
+    return out[0] if single else out
+
+
+def _rolling_extreme(x, window, fn):
+    x = _as_float(x)
+    windows, single = _periods(window)
+    n = x.shape[0]
+    out = np.full((len(windows),) + x.shape, np.nan)
+    wanted = {}
+    for i, w in enumerate(windows):
+        wanted.setdefault(w, []).append(i)
+    # Ekstremum z okna w liczymy z okna w-1: M_w[t] = fn(M_{w-1}[t], x[t-w+1]),
+    # więc wszystkie żądane okna kosztują jeden przebieg do największego z nich
+    acc = x.copy()
+    for w in range(1, min(max(windows), n) + 1):
+        if w > 1:
+            acc[w - 1:] = fn(acc[w - 1:], x[:n - w + 1])
+        for i in wanted.get(w, ()):
+            out[i, w - 1:] = acc[w - 1:]
+    return out[0] if single else out
+
+
+def rolling_max(x, window):
+    return _rolling_extreme(x, window, np.maximum)
+
+
+def rolling_min(x, window):
+    return _rolling_extreme(x, window, np.minimum)
+
+
+def rolling_mean(x, window):
+    # Średnia krocząca przez sumy skumulowane; NaN w oknie -> NaN (jak pandas)
+    x = _as_float(x)
+    windows, single = _periods(window)
+    nan = np.isnan(x)
+    zero = np.zeros((1,) + x.shape[1:])
+    csum = np.concatenate([zero, np.cumsum(np.where(nan, 0.0, x), axis=0)])
+    cnan = np.concatenate([zero, np.cumsum(nan, axis=0)])
+    out = np.full((len(windows),) + x.shape, np.nan)
+    for i, w in enumerate(windows):
+        s = csum[w:] - csum[:-w]
+        bad = (cnan[w:] - cnan[:-w]) > 0
+        out[i, w - 1:] = np.where(bad, np.nan, s / w)
+    return out[0] if single else out
+
+
+def true_range(high, low, close):
+    high, low, close = _as_float(high), _as_float(low), _as_float(close)
+    prev_close = shift(close, 1)
+    # fmax pomija NaN - pierwsza świeca ma TR = high - low
+    return np.fmax(np.abs(high - low), np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+
+def atr_wilder(high, low, close, period):
+    return wilder(true_range(high, low, close), period)
+
+
+def atr_sma(high, low, close, period):
+    return rolling_mean(true_range(high, low, close), period)
+
+
+def rsi_sma(close, period):
+    # Surowe RSI (klasyczne SMA, bez wygładzania Wildera)
+    close = _as_float(close)
+    delta = close - shift(close, 1)
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    avg_gain = rolling_mean(gain, period)
+    avg_loss = rolling_mean(loss, period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100.0 - (100.0 / (1.0 + avg_gain / avg_loss))
+    # Okno bez strat: 100 wprost (a nie przez rs = inf), okno bez ruchu: NaN - jak streaming.StreamRSI
+    return np.where(avg_loss > 0, rsi, np.where(avg_gain > 0, 100.0, np.nan))
+
+
+def donchian(high, low, period):
+    # Kanał Donchiana z poprzednich `period` świec (bez bieżącej) - (górna, dolna)
+    periods, single = _periods(period)
+    upper = np.stack([shift(u) for u in rolling_max(high, periods)])
+    lower = np.stack([shift(l) for l in rolling_min(low, periods)])
+    return (upper[0], lower[0]) if single else (upper, lower)
@@ -0,0 +1,360 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+import warnings
+from contextlib import closing
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+import barcache
+import barstore
+import indicators
+import kalendarz
+import profiling
+import stops
+from fetcher import FetchError
+from przepisy import SYSTEMY
+
+# ==================================================
+#  DZIENNIK SYGNAŁÓW (SQLite, tylko dopisywanie)
+# ==================================================
+# Każdy sygnał wejścia (LONG / SHORT) ze skanera, serwisu i stron zapisywany jest
+# z ceną, stopem, wolumenem i ryzykiem, które wtedy zaproponowano. Jeden sygnał to
+# jeden wiersz na (system, interwał, świeca, kierunek) - kolejne odświeżenia tej
+# samej świecy nic nie dopisują (INSERT OR IGNORE), a zapisanych wierszy nie da się
+# zmienić ani usunąć (wyzwalacze w bazie). Dlatego zapisywane są tylko świece zamknięte
+# (kalendarz.py) - sygnał z tworzącej się świecy może jeszcze zniknąć, a raz zapisany
+# zostałby w dzienniku na zawsze. Strony oceniają do dziennika ostatnią zamkniętą świecę.
+#
+# Wynik sygnału liczony jest przy zapytaniu z późniejszych świec (barcache):
+# stop początkowy / trailing stop albo wyjście systemu (kanał OUT, próg RSI), w R
+# (wielokrotność ryzyka do stopu). Zamknięte wyniki trafiają do tabeli `wyniki`
+# i nie są liczone ponownie; otwarte pozycje dostają wycenę bieżącą (bez zapisu).
+#
+# Plik: dziennik.sqlite w katalogu magazynu świec (SIGNALS_DATA_DIR).
+#
+# Uruchomienie:
+#   python journal.py --dni 90 --wyniki
+#   python journal.py --dni 365 --statystyki --grupuj miesiac
+
+PLIK = "dziennik.sqlite"
+
+KOLUMNY = ["id", "zapisano", "zrodlo", "strategia", "system", "symbol", "interwal", "data", "sygnal",
+           "cena", "stop", "wolumen", "ryzyko", "czas_ms"]
+KOLUMNY_WYNIKU = ["status", "zamknieto", "cena_wyjscia", "powod", "r", "swiece"]
+
+_SCHEMAT = """
+CREATE TABLE IF NOT EXISTS sygnaly (
+    id        INTEGER PRIMARY KEY,
+    zapisano  TEXT NOT NULL,   -- czas zapisu (UTC)
+    zrodlo    TEXT NOT NULL,   -- skaner / serwis / strona
+    strategia TEXT NOT NULL,
+    system    TEXT NOT NULL,
+    symbol    TEXT NOT NULL,
+    interwal  TEXT NOT NULL,
+    data      TEXT NOT NULL,   -- początek świecy sygnału (UTC)
+    sygnal    TEXT NOT NULL,
+    cena      REAL,
+    stop      REAL,
+    wolumen   REAL,
+    ryzyko    REAL,
+    czas_ms   REAL,            -- czas oceny, która dała sygnał
+    UNIQUE (system, interwal, data, sygnal)
+);
+CREATE INDEX IF NOT EXISTS sygnaly_symbol_data ON sygnaly (symbol, data);
+CREATE INDEX IF NOT EXISTS sygnaly_data ON sygnaly (data);
+
+CREATE TABLE IF NOT EXISTS wyniki (
+    sygnal_id    INTEGER PRIMARY KEY REFERENCES sygnaly (id),
+    zamknieto    TEXT NOT NULL,
+    cena_wyjscia REAL NOT NULL,
+    powod        TEXT NOT NULL,  -- SL / TSL / OUT / RSI
+    r            REAL NOT NULL,
+    swiece       INTEGER NOT NULL
+);
+
+CREATE TRIGGER IF NOT EXISTS sygnaly_bez_zmian BEFORE UPDATE ON sygnaly
+BEGIN SELECT RAISE(ABORT, 'dziennik sygnałów tylko do dopisywania'); END;
+CREATE TRIGGER IF NOT EXISTS sygnaly_bez_usuwania BEFORE DELETE ON sygnaly
+BEGIN SELECT RAISE(ABORT, 'dziennik sygnałów tylko do dopisywania'); END;
+CREATE TRIGGER IF NOT EXISTS wyniki_bez_zmian BEFORE UPDATE ON wyniki
+BEGIN SELECT RAISE(ABORT, 'dziennik sygnałów tylko do dopisywania'); END;
+CREATE TRIGGER IF NOT EXISTS wyniki_bez_usuwania BEFORE DELETE ON wyniki
+BEGIN SELECT RAISE(ABORT, 'dziennik sygnałów tylko do dopisywania'); END;
+"""
+
+_PRZEPISY = {(p.strategia, n): p for n, p in SYSTEMY}
+
+_lock = threading.Lock()
+_GOTOWE = set()      # pliki ze schematem utworzonym w tym procesie
+_ZAPISANE = set()    # klucze sygnałów już zapisanych w tym procesie (strony przy każdym odświeżeniu)
+
+
+def path():
+    # Odczytywane przy każdym wywołaniu - bench i testy podmieniają barstore.STORE_DIR
+    return os.path.join(barstore.STORE_DIR, PLIK)
+
+
+def _connect(plik=None):
+    plik = plik or path()
+    con = sqlite3.connect(plik, timeout=10.0)
+    con.execute("PRAGMA synchronous=NORMAL")
+    if plik not in _GOTOWE:
+        with _lock:
+            if plik not in _GOTOWE:
+                os.makedirs(os.path.dirname(os.path.abspath(plik)), exist_ok=True)
+                con.execute("PRAGMA journal_mode=WAL")  # czytanie nie czeka na zapis skanera
+                con.executescript(_SCHEMAT)
+                _GOTOWE.add(plik)
+    return con
+
+
+def _utc(t):
+    # Znacznik czasu świecy jako tekst UTC bez strefy - porównywalny w SQL jako tekst
+    t = pd.Timestamp(t)
+    if t.tz is not None:
+        t = t.tz_convert("UTC").tz_localize(None)
+    return t.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _liczba(x):
+    return float(x) if x is not None and x == x else None
+
+# --------------------------------------------------
+# 1. ZAPIS
+# --------------------------------------------------
+
+def record(wiersze, interval="1d", zrodlo="skaner", czas_ms=None, plik=None):
+    # wiersze - wiersze skanera (lista słowników albo DataFrame z kolumnami scanner.KOLUMNY);
+    # zapisywane są tylko sygnały LONG / SHORT z zamkniętych świec, wszystkie w jednej transakcji.
+    # Zwraca liczbę nowych wierszy; błąd bazy nie przerywa skanu ani strony (ostrzeżenie).
+    if isinstance(wiersze, pd.DataFrame):
+        wiersze = wiersze.to_dict("records")
+    plik = plik or path()
+    zapisano = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    nowe = []
+    teraz = datetime.now(timezone.utc)
+    for w in wiersze:
+        if w.get("Sygnał") not in ("LONG", "SHORT"):
+            continue
+        if not kalendarz.bar_closed(w["Symbol"], w["Data"], interval, teraz):
+            continue
+        klucz = (plik, w["System"], interval, _utc(w["Data"]), w["Sygnał"])
+        if klucz in _ZAPISANE:
+            continue
+        nowe.append((klucz, (zapisano, zrodlo, w["Strategia"], w["System"], w["Symbol"], interval, klucz[3],
+                             w["Sygnał"], _liczba(w.get("Cena")), _liczba(w.get("Stop Loss")),
+                             _liczba(w.get("Wolumen")), _liczba(w.get("Ryzyko")), czas_ms)))
+    if not nowe:
+        return 0
+    try:
+        with profiling.stage("dziennik"), closing(_connect(plik)) as con, con:
+            przed = con.total_changes
+            con.executemany("INSERT OR IGNORE INTO sygnaly (zapisano, zrodlo, strategia, system, symbol, interwal, "
+                            "data, sygnal, cena, stop, wolumen, ryzyko, czas_ms) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", [w for _, w in nowe])
+            dopisane = con.total_changes - przed
+    except (sqlite3.Error, OSError) as e:
+        warnings.warn(f"Dziennik sygnałów niedostępny ({plik}): {e}")
+        return 0
+    _ZAPISANE.update(k for k, _ in nowe)
+    return dopisane
+
+# --------------------------------------------------
+# 2. WYNIKI SYGNAŁÓW
+# --------------------------------------------------
+
+def _swiece(sygnal, period):
+    # Świece sygnału z wskaźnikami wyjścia (jeśli przepis jest znany) -> (przepis, df)
+    p = _PRZEPISY.get((sygnal["strategia"], sygnal["system"]))
+    if p is not None and p.symbol != sygnal["symbol"]:
+        p = None  # symbol zmieniony ręcznie na stronie - tylko stop
+    if p is None:
+        df = barcache.get_bars(sygnal["symbol"], period, sygnal["interwal"])
+    elif p.strategia == "Trend":
+        df = barcache.trend_frame(p.symbol, p.in_p, p.out_p, p.ema_p, p.atr_p, period, sygnal["interwal"])
+    else:
+        df = barcache.meanrev_frame(p.symbol, p.rsi_p, p.atr_p, period, sygnal["interwal"])
+    return p, df
+
+
+def _start(df, sygnal):
+    # Pozycja pierwszej świecy po świecy sygnału
+    czasy = df.index.tz_convert("UTC").tz_localize(None) if df.index.tz is not None else df.index
+    return int(czasy.searchsorted(pd.Timestamp(sygnal["data"]), side="right"))
+
+
+def _szczyty(df, przepis):
+    return indicators.rolling_max(df["high"], przepis.in_p), indicators.rolling_min(df["low"], przepis.in_p)
+
+
+def outcome(sygnal, df, start, przepis=None, szczyty=None):
+    # Wynik jednego sygnału na świecach df[start:] - reguły jak w backtest.py: najpierw
+    # stop (początkowy, dla trendu podciągany trailing stopem), potem wyjście systemu
+    # na zamknięciu. -> (zamknięta?, czas, cena wyjścia, powód, R, świece) albo None
+    # szczyty - opcjonalnie (rolling max high, rolling min low) z IN świec dla całego df
+    d = 1.0 if sygnal["sygnal"] == "LONG" else -1.0
+    cena, stop0 = sygnal["cena"], sygnal["stop"]
+    ryzyko = abs(cena - stop0) if cena is not None and stop0 is not None else 0.0
+    po = df.iloc[start:]
+    if not ryzyko or len(po) == 0:
+        return None
+    o, h, l, c = (po[k].to_numpy(dtype=float) for k in ("open", "high", "low", "close"))
+
+    stop = np.full(len(po), stop0)
+    wyjscie = np.zeros(len(po), dtype=bool)
+    powod_wyjscia = None
+    if przepis is not None and przepis.strategia == "Trend":
+        # Trailing stop z szczytu/dołka IN świec (okno sięga przed sygnał); stop na świecy
+        # to maksimum z poprzednich - po świecy stop jest dopiero przesuwany
+        if szczyty is None:
+            szczyty = _szczyty(df, przepis)
+        if d > 0:
+            tsl = szczyty[0][start:] - przepis.k_tsl * po["atr"].to_numpy()
+        else:
+            tsl = szczyty[1][start:] + przepis.k_tsl * po["atr"].to_numpy()
+        stop = stops.ratchet(stop0, tsl, sygnal["sygnal"])
+        wyjscie = c < po["lowest_out"].to_numpy() if d > 0 else c > po["highest_out"].to_numpy()
+        powod_wyjscia = "OUT"
+    elif przepis is not None:
+        rsi = po["rsi"].to_numpy(dtype=float)
+        wyjscie = rsi > przepis.l_ex if d > 0 else rsi < przepis.s_ex
+        powod_wyjscia = "RSI"
+
+    trafiony = l <= stop if d > 0 else h >= stop
+    # Ostatnia świeca może się jeszcze tworzyć - wyjście na zamknięciu dopiero po jej końcu
+    wyjscie[-1] = False
+    koniec = np.flatnonzero(trafiony | wyjscie)
+    if len(koniec) == 0:
+        return False, po.index[-1], c[-1], "", d * (c[-1] - cena) / ryzyko, len(po)
+    j = koniec[0]
+    if trafiony[j]:
+        wyjscie_cena = min(o[j], stop[j]) if d > 0 else max(o[j], stop[j])
+        powod = "SL" if stop[j] == stop0 else "TSL"
+    else:
+        wyjscie_cena, powod = c[j], powod_wyjscia
+    return True, po.index[j], wyjscie_cena, powod, d * (wyjscie_cena - cena) / ryzyko, j + 1
+
+
+def _resolve(con, sygnaly, period):
+    # Wyniki sygnałów bez zapisanego wyniku - {id: (status, zamknieto, cena, powód, R, świece)};
+    # zamknięte dopisywane do `wyniki`, otwarte tylko wyceniane
+    wyniki, ramki = {}, {}
+    for s in sygnaly:
+        # Świece i szczyty raz na system - sygnały jednego systemu różnią się tylko świecą startu
+        klucz = (s["strategia"], s["system"], s["symbol"], s["interwal"])
+        if klucz not in ramki:
+            try:
+                przepis, df = _swiece(s, period)
+            except FetchError:
+                przepis = df = None  # brak świec - sygnały zostają bez wyniku
+            trend = przepis is not None and przepis.strategia == "Trend"
+            ramki[klucz] = (przepis, df, _szczyty(df, przepis) if trend else None)
+        przepis, df, szczyty = ramki[klucz]
+        if df is None:
+            continue
+        w = outcome(s, df, _start(df, s), przepis, szczyty)
+        if w is not None:
+            zamknieta, czas, cena, powod, r, swiece = w
+            wyniki[s["id"]] = ("zamknięta" if zamknieta else "otwarta", _utc(czas), float(cena), powod,
+                               float(r), int(swiece))
+    con.executemany("INSERT OR IGNORE INTO wyniki VALUES (?, ?, ?, ?, ?, ?)",
+                    [(i,) + w[1:] for i, w in wyniki.items() if w[0] == "zamknięta"])
+    return wyniki
+
+# --------------------------------------------------
+# 3. ZAPYTANIA
+# --------------------------------------------------
+
+def query(dni=None, od=None, do=None, symbol=None, system=None, interval=None, wyniki=False,
+          period="2y", plik=None):
+    # Sygnały z zakresu dat świecy (dni - ostatnie N dni; od / do - daty), najnowsze na górze.
+    # wyniki=True - z wynikiem (zamknięte z bazy, brakujące liczone teraz, otwarte wycenione).
+    warunki, parametry = [], []
+    if dni is not None:
+        od = pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=dni)
+    for pole, op, wartosc in [("s.data", ">=", od), ("s.data", "<", do)]:
+        if wartosc is not None:
+            warunki.append(f"{pole} {op} ?")
+            parametry.append(_utc(wartosc))
+    for pole, wartosc in [("s.symbol", symbol), ("s.system", system), ("s.interwal", interval)]:
+        if wartosc is not None:
+            warunki.append(f"{pole} = ?")
+            parametry.append(wartosc)
+    sql = ("SELECT s.*, w.zamknieto, w.cena_wyjscia, w.powod, w.r, w.swiece "
+           "FROM sygnaly s LEFT JOIN wyniki w ON w.sygnal_id = s.id"
+           + (" WHERE " + " AND ".join(warunki) if warunki else "") + " ORDER BY s.data DESC, s.id DESC")
+
+    with closing(_connect(plik)) as con, con:
+        con.row_factory = sqlite3.Row
+        wiersze = [dict(w) for w in con.execute(sql, parametry)]
+        nowe = _resolve(con, [w for w in wiersze if w["zamknieto"] is None], period) if wyniki else {}
+
+    for w in wiersze:
+        if w["id"] in nowe:
+            w.update(zip(KOLUMNY_WYNIKU, nowe[w["id"]]))
+        else:
+            w["status"] = "zamknięta" if w["zamknieto"] is not None else ""
+    df = pd.DataFrame(wiersze, columns=KOLUMNY + KOLUMNY_WYNIKU)
+    for kolumna in ["zapisano", "data", "zamknieto"]:
+        df[kolumna] = pd.to_datetime(df[kolumna])
+    for kolumna in ["cena_wyjscia", "r", "swiece"]:
+        df[kolumna] = pd.to_numeric(df[kolumna])
+    return df
+
+
+def stats(df, grupuj="system"):
+    # Trafność i R z wyniku query(..., wyniki=True); grupuj: system / symbol / strategia / miesiac
+    if df.empty:
+        return pd.DataFrame()
+    klucz = df["data"].dt.strftime("%Y-%m") if grupuj == "miesiac" else df[grupuj]
+    zamkniete = df["status"] == "zamknięta"
+    # Opóźnienie zapisu od początku świecy sygnału (skaner po zamknięciu rynku, strona w trakcie świecy)
+    opoznienie = (df["zapisano"] - df["data"]).dt.total_seconds() / 3600.0
+    g = df.assign(_zamk=zamkniete, _traf=zamkniete & (df["r"] > 0), _r=df["r"].where(zamkniete),
+                  _opozn=opoznienie).groupby(klucz, sort=True)
+    wynik = pd.DataFrame({
+        "Sygnały": g.size(),
+        "Zamknięte": g["_zamk"].sum(),
+        "Trafność": g["_traf"].sum() / g["_zamk"].sum().replace(0, np.nan),
+        "Średnie R": g["_r"].mean(),
+        "Suma R": g["_r"].sum(min_count=1),
+        "Opóźnienie [h]": g["_opozn"].median(),
+        "Czas oceny [ms]": g["czas_ms"].median(),
+    })
+    wynik.index.name = "Miesiąc" if grupuj == "miesiac" else grupuj.capitalize()
+    return wynik.reset_index()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dziennik sygnałów: historia, wyniki i trafność")
+    parser.add_argument("--dni", type=float, default=90, help="Sygnały z ostatnich N dni")
+    parser.add_argument("--symbol")
+    parser.add_argument("--system")
+    parser.add_argument("--interwal")
+    parser.add_argument("--wyniki", action="store_true", help="Z wynikiem każdego sygnału (R)")
+    parser.add_argument("--statystyki", action="store_true", help="Trafność i R zamiast listy sygnałów")
+    parser.add_argument("--grupuj", default="system", choices=["system", "symbol", "strategia", "miesiac"])
+    parser.add_argument("--csv", help="Zapisz wynik do pliku CSV")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    df = query(dni=args.dni, symbol=args.symbol, system=args.system, interval=args.interwal,
+               wyniki=args.wyniki or args.statystyki)
+    czas = (time.perf_counter() - start) * 1000
+    if args.statystyki:
+        df = stats(df, args.grupuj)
+    if args.csv:
+        df.to_csv(args.csv, index=False)
+
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(df.to_string(index=False))
+    print(f"\n{path()}: zapytanie {czas:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import re
+from datetime import datetime, timedelta, timezone
+from datetime import time as godzina
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+
+# ==================================================
+#  KALENDARZ RYNKÓW (okresy historii, zamknięcia sesji, koniec świecy)
+# ==================================================
+# Bez zależności od innych modułów projektu - importują go fetcher, barstore, serwis i dziennik.
+#
+# period_start: okres w zapisie Yahoo ("2y", "60d", "6mo") -> początek historii.
+#
+# Kiedy kończy się świeca danego symbolu - wspólne dla serwisu (harmonogram odświeżeń
+# po zamknięciu rynku) i dziennika sygnałów (zapisywane są tylko świece zamknięte;
+# sygnał z tworzącej się świecy może jeszcze zniknąć).
+#
+# Świeca dzienna kończy się z pierwszym zamknięciem sesji po jej początku, świeca
+# intraday po długości interwału. Bez świąt - dzień bez sesji to po prostu brak świecy.
+
+NY = ZoneInfo("America/New_York")
+
+# (przyrostek/przedrostek symbolu, strefa, godzina zamknięcia, tylko dni robocze)
+ZAMKNIECIA = [
+    ("-USD", timezone.utc, godzina(0, 0), False),  # krypto - świeca dzienna kończy się o północy UTC
+    ("=X", NY, godzina(17, 0), True),              # forex
+    ("=F", NY, godzina(17, 0), True),              # futures CME/ICE
+    ("^", NY, godzina(16, 0), True),               # indeksy USA
+]
+ZAMKNIECIE_DOMYSLNE = (NY, godzina(16, 0), True)   # akcje USA
+
+_DLUGOSCI = {"1wk": pd.DateOffset(weeks=1), "1mo": pd.DateOffset(months=1), "3mo": pd.DateOffset(months=3)}
+
+_OKRESY = {"d": "days", "wk": "weeks", "mo": "months", "y": "years"}
+
+
+def period_start(period, koniec=None):
+    # "2y" -> znacznik czasu 2 lata przed `koniec` (None dla "max")
+    if period == "max":
+        return None
+    m = re.fullmatch(r"(\d+)(d|wk|mo|y)", period)
+    if m is None:
+        raise ValueError(f"Nieobsługiwany okres: {period}")
+    koniec = pd.Timestamp.now().normalize() if koniec is None else koniec
+    return koniec - pd.DateOffset(**{_OKRESY[m.group(2)]: int(m.group(1))})
+
+
+def market_close(symbol):
+    for wzorzec, strefa, kiedy, robocze in ZAMKNIECIA:
+        if symbol.endswith(wzorzec) or symbol.startswith(wzorzec):
+            return strefa, kiedy, robocze
+    return ZAMKNIECIE_DOMYSLNE
+
+
+def next_close(symbol, teraz=None):
+    # Najbliższe (po `teraz`) zamknięcie sesji rynku symbolu - datetime w UTC
+    strefa, kiedy, robocze = market_close(symbol)
+    teraz = teraz or datetime.now(timezone.utc)
+    dzien = teraz.astimezone(strefa).date()
+    while True:
+        termin = datetime.combine(dzien, kiedy, tzinfo=strefa)
+        if termin > teraz and not (robocze and dzien.weekday() >= 5):
+            return termin.astimezone(timezone.utc)
+        dzien += timedelta(days=1)
+
+
+def bar_end(symbol, start, interval="1d"):
+    # Koniec świecy zaczynającej się o `start`; start bez strefy - dzienna w strefie rynku, intraday w UTC
+    start = pd.Timestamp(start)
+    if interval == "1d":
+        if start.tz is None:
+            start = start.tz_localize(market_close(symbol)[0])
+        return next_close(symbol, start.to_pydatetime())
+    if start.tz is None:
+        start = start.tz_localize("UTC")
+    dlugosc = _DLUGOSCI[interval] if interval in _DLUGOSCI else pd.Timedelta(interval)
+    return (start + dlugosc).to_pydatetime()
+
+
+def bar_closed(symbol, start, interval="1d", teraz=None):
+    return bar_end(symbol, start, interval) <= (teraz or datetime.now(timezone.utc))
+
+
+def closed_bars(df, symbol, interval="1d", teraz=None):
+    # Świece bez ostatniej, jeśli jej interwał jeszcze trwa (ramka nie jest kopiowana)
+    if len(df) and not bar_closed(symbol, df.index[-1], interval, teraz):
+        return df.iloc[:-1]
+    return df
@@ -0,0 +1,48 @@
+import pandas as pd
+import yfinance as yf
+from yfinance.exceptions import YFTickerMissingError
+
+# ==================================================
+#  POBIERANIE DANYCH OHLCV (Yahoo Finance)
+# ==================================================
+# yf.download łapie każdy wyjątek zapytania (także timeout) i oddaje pustą ramkę - fetcher
+# nie odróżniłby wtedy awarii sieci od złego symbolu i nie ponowiłby zapytania. Dlatego
+# Ticker.history z błędami zgłaszanymi jako wyjątki: brak notowań (zły symbol, brak świec
+# w zakresie) -> None, każdy inny błąd (timeout, limit zapytań, HTTP) leci do fetcher.py.
+
+KOLUMNY = ["open", "high", "low", "close", "volume"]
+
+try:
+    yf.config.debug.hide_exceptions = False  # yfinance >= 1.0 (raise_errors wycofane)
+    _WYJATKI = {}
+except AttributeError:
+    _WYJATKI = {"raise_errors": True}
+
+def normalize_columns(df):
+    # yfinance potrafi zwrócić MultiIndex (Price, Ticker) nawet dla jednego symbolu
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = [col[0].lower() for col in df.columns]
+    else:
+        df.columns = [col.lower() for col in df.columns]
+    return df
+
+
+def _zakres(period, start):
+    # Podanie start (np. ostatni zapisany bar) pobiera tylko brakujący ogon historii
+    return {"start": start} if start is not None else {"period": period}
+
+
+def download(symbol, period="2y", interval="1d", start=None, timeout=10):
+    # Pojedynczy symbol - współbieżność, ponawianie i limity są w fetcher.py
+    try:
+        df = yf.Ticker(symbol).history(interval=interval, timeout=timeout, actions=False,
+                                       **_zakres(period, start), **_WYJATKI)
+    except YFTickerMissingError:
+        return None
+    if df is None or df.empty:
+        return None
+    df = normalize_columns(df)[KOLUMNY]
+    # Świece dzienne i dłuższe bez strefy czasowej - jak yf.download (ignore_tz)
+    if interval[-1] not in ("m", "h") and df.index.tz is not None:
+        df.index = df.index.tz_localize(None)
+    return df
@@ -0,0 +1,236 @@
+import argparse
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+
+import indicators
+from barstore import get_bars
+from fetcher import FetchError
+from przepisy import ZŁOTE_PRZEPISY_TREND, ATR_PERIOD, TrendRecipe, toml_line
+
+# ==================================================
+#  OPTYMALIZATOR SIATKI PARAMETRÓW - WYBICIE Z KANAŁU DONCHIANA
+# ==================================================
+# Przeszukuje siatkę IN / OUT / EMA / M / K dla jednego symbolu.
+# Wskaźniki liczone są raz na okres (indicators.py, wiele okresów w jednym przebiegu),
+# a wszystkie kombinacje symulowane są jednocześnie - jedna pętla po świecach,
+# operacje NumPy na wektorze kombinacji.
+#
+# Zasady (jak w signaltrend.py, decyzje na zamknięciu świecy):
+# * wejście LONG: close > max(high, IN) z poprzednich świec i close > EMA (SHORT symetrycznie),
+# * stop początkowy: wejście -/+ M x ATR,
+# * trailing stop: max(high, IN) - K x ATR (dla SHORT min(low, IN) + K x ATR), tylko zaciskany,
+# * wyjście z kanału OUT: close < min(low, OUT) z poprzednich świec (SHORT: close > max(high, OUT)).
+# Wynik transakcji liczony w R (wielokrotność ryzyka M x ATR), kapitał składany przy stałym % ryzyka.
+#
+# Uruchomienie:
+#   python optimizer.py --system Bitcoin --okres 5y
+#   python optimizer.py --symbol ETH-USD --in 10,20,40,60 --m 2,3,4,5
+
+SIATKA_DOMYSLNA = {
+    "in": [5, 10, 20, 40, 60],
+    "out": [10, 20, 30, 50],
+    "ema": [30, 50, 100, 200],
+    "m": [2.0, 2.5, 3.0, 4.0, 5.0],
+    "k": [3.0, 3.5, 4.0, 4.5, 5.0],
+}
+
+KOLUMNY_WYNIKU = ["IN", "OUT", "EMA", "M", "K", "Transakcje", "Trafność", "Suma R",
+                  "Profit Factor", "Zwrot", "Max DD", "Zwrot / DD"]
+
+
+def precompute(df, in_grid, out_grid, ema_grid, atr_p=ATR_PERIOD):
+    high = df['high'].to_numpy(dtype=float)
+    low = df['low'].to_numpy(dtype=float)
+    close = df['close'].to_numpy(dtype=float)
+    open_ = df['open'].to_numpy(dtype=float) if 'open' in df else close
+
+    hi_in, lo_in = indicators.donchian(high, low, in_grid)
+    hi_out, lo_out = indicators.donchian(high, low, out_grid)
+    # Osie zamienione na (świece x okresy) - w pętli po czasie czytamy jeden wiersz
+    return {
+        'open': open_, 'high': high, 'low': low, 'close': close,
+        'atr': indicators.atr_wilder(high, low, close, atr_p),
+        'ema': indicators.ema(close, ema_grid).T,
+        'hi_in': hi_in.T, 'lo_in': lo_in.T,
+        # Szczyt/dołek z IN świec łącznie z bieżącą (podstawa trailing stopu)
+        'hi_in_now': indicators.rolling_max(high, in_grid).T,
+        'lo_in_now': indicators.rolling_min(low, in_grid).T,
+        'hi_out': hi_out.T, 'lo_out': lo_out.T,
+    }
+
+
+class GridStats:
+    # Statystyki zamkniętych transakcji dla wektora kombinacji parametrów (wynik w R)
+    __slots__ = ("ryzyko_proc", "equity", "peak", "max_dd", "trades", "wins", "gross_win", "gross_loss")
+
+    def __init__(self, c, ryzyko_proc):
+        self.ryzyko_proc = ryzyko_proc
+        self.equity = np.ones(c)
+        self.peak = np.ones(c)
+        self.max_dd = np.zeros(c)
+        self.trades = np.zeros(c, dtype=np.int64)
+        self.wins = np.zeros(c, dtype=np.int64)
+        self.gross_win = np.zeros(c)
+        self.gross_loss = np.zeros(c)
+
+    def record(self, maska, r):
+        r = np.where(maska, r, 0.0)
+        self.trades += maska
+        self.wins += maska & (r > 0)
+        self.gross_win += np.where(r > 0, r, 0.0)
+        self.gross_loss -= np.where(r < 0, r, 0.0)
+        self.equity *= np.maximum(1.0 + self.ryzyko_proc * r, 0.0)
+        np.maximum(self.peak, self.equity, out=self.peak)
+        np.maximum(self.max_dd, 1.0 - self.equity / self.peak, out=self.max_dd)
+
+    def summary(self):
+        zwrot = self.equity - 1.0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return {
+                "Transakcje": self.trades,
+                "Trafność": np.where(self.trades > 0, self.wins / np.maximum(self.trades, 1), np.nan),
+                "Suma R": self.gross_win - self.gross_loss,
+                "Profit Factor": np.where(self.gross_loss > 0, self.gross_win / self.gross_loss, np.inf),
+                "Zwrot": zwrot,
+                "Max DD": self.max_dd,
+                "Zwrot / DD": np.where(self.max_dd > 0, zwrot / self.max_dd, np.inf),
+            }
+
+
+def simulate_grid(pre, in_idx, out_idx, ema_idx, m, k, ryzyko_proc=0.04):
+    close, high, low, open_, atr = pre['close'], pre['high'], pre['low'], pre['open'], pre['atr']
+    n, c = len(close), len(m)
+
+    pos = np.zeros(c, dtype=np.int8)
+    entry = np.zeros(c)
+    risk = np.ones(c)
+    stop = np.full(c, np.nan)
+    stats = GridStats(c, ryzyko_proc)
+
+    def zamknij(maska, cena):
+        stats.record(maska, np.where(pos == 1, cena - entry, entry - cena) / risk)
+        pos[maska] = 0
+
+    with np.errstate(invalid="ignore"):
+        for t in range(1, n):
+            # 1. Stop (początkowy lub trailing z poprzedniej świecy) - luka otwarcia wypełniana po open
+            hit_l = (pos == 1) & (low[t] <= stop)
+            hit_s = (pos == -1) & (high[t] >= stop)
+            if hit_l.any() or hit_s.any():
+                cena = np.where(hit_l, np.minimum(open_[t], stop), np.maximum(open_[t], stop))
+                zamknij(hit_l | hit_s, cena)
+
+            # 2. Wyjście z kanału OUT na zamknięciu
+            ex_l = (pos == 1) & (close[t] < pre['lo_out'][t][out_idx])
+            ex_s = (pos == -1) & (close[t] > pre['hi_out'][t][out_idx])
+            wyszlo = hit_l | hit_s | ex_l | ex_s
+            if ex_l.any() or ex_s.any():
+                zamknij(ex_l | ex_s, close[t])
+
+            # 3. Zaciskanie trailing stopu dla otwartych pozycji
+            tsl_l = pre['hi_in_now'][t][in_idx] - k * atr[t]
+            tsl_s = pre['lo_in_now'][t][in_idx] + k * atr[t]
+            stop = np.where(pos == 1, np.fmax(stop, tsl_l), stop)
+            stop = np.where(pos == -1, np.fmin(stop, tsl_s), stop)
+
+            # 4. Nowe wejścia (nie na świecy, na której zamknęliśmy pozycję; wymagany ATR)
+            wolne = (pos == 0) & ~wyszlo & (atr[t] > 0)
+            ema_t = pre['ema'][t][ema_idx]
+            long_sig = wolne & (close[t] > pre['hi_in'][t][in_idx]) & (close[t] > ema_t)
+            short_sig = wolne & (close[t] < pre['lo_in'][t][in_idx]) & (close[t] < ema_t)
+            if long_sig.any() or short_sig.any():
+                nowe = long_sig | short_sig
+                pos[long_sig] = 1
+                pos[short_sig] = -1
+                entry[nowe] = close[t]
+                risk[nowe] = m[nowe] * atr[t]
+                stop[long_sig] = close[t] - risk[long_sig]
+                stop[short_sig] = close[t] + risk[short_sig]
+
+        # Otwarte pozycje rozliczamy po ostatnim zamknięciu
+        otwarte = pos != 0
+        if otwarte.any():
+            zamknij(otwarte, close[-1])
+
+    return stats.summary()
+
+
+def optimize(df, siatka=None, ryzyko_proc=0.04, min_transakcji=5):
+    siatka = {**SIATKA_DOMYSLNA, **(siatka or {})}
+    in_grid, out_grid, ema_grid = siatka["in"], siatka["out"], siatka["ema"]
+    pre = precompute(df, in_grid, out_grid, ema_grid)
+
+    combos = np.array(list(itertools.product(
+        range(len(in_grid)), range(len(out_grid)), range(len(ema_grid)), siatka["m"], siatka["k"])))
+    in_idx = combos[:, 0].astype(int)
+    out_idx = combos[:, 1].astype(int)
+    ema_idx = combos[:, 2].astype(int)
+    m, k = combos[:, 3], combos[:, 4]
+
+    stats = simulate_grid(pre, in_idx, out_idx, ema_idx, m, k, ryzyko_proc)
+    wynik = pd.DataFrame({
+        "IN": np.asarray(in_grid)[in_idx], "OUT": np.asarray(out_grid)[out_idx],
+        "EMA": np.asarray(ema_grid)[ema_idx], "M": m, "K": k, **stats,
+    }, columns=KOLUMNY_WYNIKU)
+    wynik = wynik[wynik["Transakcje"] >= min_transakcji]
+    return wynik.sort_values("Zwrot / DD", ascending=False).reset_index(drop=True)
+
+
+def jako_przepis(nazwa, symbol, mult, leverage, wiersz):
+    # Gotowa linia do wklejenia w tabelę [trend] pliku przepisy.toml
+    return toml_line(nazwa, TrendRecipe(symbol, float(mult), float(leverage), int(wiersz["IN"]), int(wiersz["OUT"]),
+                                        int(wiersz["EMA"]), float(wiersz["M"]), float(wiersz["K"]), ATR_PERIOD))
+
+
+def _lista(tekst, typ):
+    return [typ(x) for x in tekst.split(",")] if tekst else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Optymalizacja siatki parametrów systemu wybicia z kanału Donchiana")
+    parser.add_argument("--system", help="Nazwa systemu z ZŁOTE_PRZEPISY_TREND (symbol, mult, dźwignia)")
+    parser.add_argument("--symbol", help="Dowolny symbol (zamiast --system)")
+    parser.add_argument("--okres", default="5y", help="Zakres historii, np. 2y, 5y, max")
+    parser.add_argument("--ryzyko", type=float, default=4.0, help="Ryzyko na transakcję (%%)")
+    parser.add_argument("--min-transakcji", type=int, default=5)
+    parser.add_argument("--top", type=int, default=20)
+    for nazwa in ["in", "out", "ema"]:
+        parser.add_argument(f"--{nazwa}", help=f"Lista wartości {nazwa.upper()}, np. 10,20,40")
+    for nazwa in ["m", "k"]:
+        parser.add_argument(f"--{nazwa}", help=f"Lista mnożników {nazwa.upper()}, np. 2,3,4.5")
+    args = parser.parse_args(argv)
+
+    if args.system:
+        p = ZŁOTE_PRZEPISY_TREND[args.system]
+        nazwa, symbol, mult, leverage = args.system, p.symbol, p.mult, p.dzwignia
+    elif args.symbol:
+        nazwa, symbol, mult, leverage = args.symbol, args.symbol, 1.0, 1.0
+    else:
+        parser.error("Podaj --system albo --symbol")
+
+    siatka = {"in": _lista(args.__dict__["in"], int), "out": _lista(args.out, int),
+              "ema": _lista(args.ema, int), "m": _lista(args.m, float), "k": _lista(args.k, float)}
+    siatka = {k: v for k, v in siatka.items() if v}
+
+    try:
+        df = get_bars(symbol, period=args.okres, interval="1d")
+    except FetchError as e:
+        parser.exit(1, f"Nie udało się pobrać danych dla {symbol}: {e.komunikat}\n")
+
+    start = time.perf_counter()
+    wynik = optimize(df, siatka, args.ryzyko / 100.0, args.min_transakcji)
+    czas = time.perf_counter() - start
+
+    print(f"{symbol}: {len(df)} świec, {len(wynik)} kombinacji z >= {args.min_transakcji} transakcjami, {czas:.2f} s")
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(wynik.head(args.top).to_string())
+    if not wynik.empty:
+        print("\nNajlepszy przepis:")
+        print(jako_przepis(nazwa, symbol, mult, leverage, wynik.iloc[0]))
+
+
+if __name__ == "__main__":
+    main()
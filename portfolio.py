@@ -0,0 +1,200 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import barcache
+from przepisy import SYSTEMY
+
+# ==================================================
+#  RYZYKO I WIELKOŚĆ POZYCJI NA POZIOMIE PORTFELA
+# ==================================================
+# Skaner liczy wolumen każdego systemu osobno (KAPITAŁ x RYZYKO / odległość SL),
+# więc trzy sygnały na BTC/ETH/SOL albo CL=F/BZ=F/RB=F to w praktyce trzy razy
+# to samo ryzyko. Tutaj wszystkie aktywne sygnały skalowane są razem:
+#
+# 1. kowariancja dziennych zwrotów wszystkich symboli (ostatnie OKNO świec),
+#    z niej macierz korelacji;
+# 2. klastry - symbole połączone korelacją |rho| >= PROG_KLASTRA;
+# 3. ryzyko do stopów liczone z korelacją: sqrt(z' rho z), z = ryzyko x kierunek
+#    (dwa LONG-i na skorelowanych rynkach sumują się, LONG + SHORT się znoszą);
+# 4. limity: ryzyko klastra, ryzyko całego portfela, depozyt (nominał / DŹWIGNIA
+#    z przepisu) i dźwignia brutto (nominał / kapitał). Pozycje są tylko zmniejszane.
+#
+# Uruchomienie:
+#   python portfolio.py --kapital 10000 --ryzyko 4
+#   python scanner.py --portfel
+
+OKNO = 60                 # liczba zwrotów do kowariancji
+PROG_KLASTRA = 0.6        # |korelacja|, od której symbole trafiają do jednego klastra
+MAX_RYZYKO = 0.12         # skorelowane ryzyko całego portfela (ułamek kapitału)
+MAX_RYZYKO_KLASTRA = 0.06
+MAX_DEPOZYT = 1.0         # suma depozytów (nominał / dźwignia przepisu) jako ułamek kapitału
+MAX_DZWIGNIA = 3.0        # nominał brutto / kapitał
+
+KOLUMNY = ["Klaster", "Skala", "Wolumen portf.", "Ryzyko portf.", "Nominał"]
+
+_PRZEPISY = {(p.strategia, n): p for n, p in SYSTEMY}
+
+
+def _daty(index, interval):
+    # Wspólna oś czasu dla różnych giełd: dzienne świece po dacie lokalnej, intraday w UTC
+    if interval == "1d":
+        return (index.tz_localize(None) if index.tz is not None else index).normalize()
+    return index.tz_convert("UTC").tz_localize(None) if index.tz is not None else index
+
+
+def returns_matrix(dane, symbole, okno=OKNO, interval="1d"):
+    # Macierz log-zwrotów (okno x symbole); brak notowania (weekend, święto) = zwrot 0
+    # Z każdej serii tylko ogon - 2 x okno wystarcza z zapasem na dni bez sesji.
+    # Symbol bez świec (None) - same zera, czyli nieskorelowany z resztą
+    ogon = 2 * (okno + 1)
+    serie = {s: pd.Series(dane[s]["close"].to_numpy(dtype=float)[-ogon:], index=_daty(dane[s].index[-ogon:], interval))
+             for s in symbole if dane.get(s) is not None}
+    if not serie:
+        return np.zeros((okno, len(symbole)))
+    ceny = pd.concat(serie, axis=1).reindex(columns=symbole)
+    ceny = ceny[~ceny.index.duplicated(keep="last")].sort_index().ffill().iloc[-(okno + 1):]
+    # Cena <= 0 (np. CL=F 2020-04-20) nie ma log-zwrotu - liczony jak brak notowania
+    with np.errstate(invalid="ignore", divide="ignore"):
+        zwroty = np.diff(np.log(np.where(ceny.to_numpy() > 0, ceny.to_numpy(), np.nan)), axis=0)
+    return np.nan_to_num(zwroty, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def correlation(zwroty):
+    cov = np.cov(zwroty, rowvar=False).reshape(zwroty.shape[1], zwroty.shape[1])
+    odch = np.sqrt(np.diag(cov))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rho = cov / np.outer(odch, odch)
+    # Symbol bez zmienności w oknie - nieskorelowany z resztą
+    rho = np.nan_to_num(rho, nan=0.0)
+    np.fill_diagonal(rho, 1.0)
+    return rho
+
+
+def clusters(rho, prog=PROG_KLASTRA):
+    # Składowe spójne grafu |rho| >= prog - etykieta to indeks pierwszego symbolu klastra
+    sasiedzi = np.abs(rho) >= prog
+    etykiety = np.arange(len(rho))
+    while True:
+        # Każdy wierzchołek przejmuje najmniejszą etykietę wśród sąsiadów, aż do ustalenia
+        nowe = np.where(sasiedzi, etykiety[None, :], len(rho)).min(axis=1)
+        if np.array_equal(nowe, etykiety):
+            return etykiety
+        etykiety = nowe
+
+
+def correlated_risk(z, rho):
+    return float(np.sqrt(max(z @ rho @ z, 0.0)))
+
+
+def size_portfolio(skan, kapital, period="2y", interval="1d", dane=None, okno=OKNO,
+                   max_ryzyko=MAX_RYZYKO, max_klaster=MAX_RYZYKO_KLASTRA,
+                   max_depozyt=MAX_DEPOZYT, max_dzwignia=MAX_DZWIGNIA):
+    # skan - wynik scanner.scan_portfolio; zwraca (skan z kolumnami KOLUMNY, podsumowanie)
+    # dane - opcjonalnie świece {symbol: df}; domyślnie z barcache (po skanie już w pamięci)
+    kolumny = {k: np.full(len(skan), np.nan, dtype=object if k == "Klaster" else float) for k in KOLUMNY}
+    kolumny["Klaster"][:] = ""
+    aktywne = np.flatnonzero(skan["Sygnał"].isin(["LONG", "SHORT"]).to_numpy()
+                             & (pd.to_numeric(skan["Wolumen"], errors="coerce").fillna(0) > 0).to_numpy())
+    podsumowanie = {"pozycje": len(aktywne), "ryzyko_suma": 0.0, "ryzyko_skorelowane": 0.0,
+                    "ryzyko_po": 0.0, "depozyt": 0.0, "dzwignia": 0.0, "klastry": {}}
+    if len(aktywne) == 0:
+        return skan.assign(**kolumny), podsumowanie
+
+    wiersze = skan.iloc[aktywne]
+    symbole = list(dict.fromkeys(wiersze["Symbol"]))
+    if dane is None:
+        dane = barcache.get_bars_many(symbole, period=period, interval=interval)
+    rho_sym = correlation(returns_matrix(dane, symbole, okno, interval))
+    etykiety_sym = clusters(rho_sym)
+
+    # Z poziomu symboli na poziom pozycji (ten sam symbol w dwóch systemach: rho = 1)
+    idx = np.array([symbole.index(s) for s in wiersze["Symbol"]])
+    rho = rho_sym[np.ix_(idx, idx)]
+    klaster = etykiety_sym[idx]
+    znak = np.where(wiersze["Sygnał"].to_numpy() == "LONG", 1.0, -1.0)
+    ryzyko = wiersze["Ryzyko"].to_numpy(dtype=float)
+    wolumen = wiersze["Wolumen"].to_numpy(dtype=float)
+    cena = wiersze["Cena"].to_numpy(dtype=float)
+    przepisy = [_PRZEPISY[s, n] for s, n in zip(wiersze["Strategia"], wiersze["System"])]
+    mult = np.array([p.mult for p in przepisy], dtype=float)
+    dzwignia = np.array([p.dzwignia for p in przepisy], dtype=float)
+    z = znak * ryzyko
+
+    # 1. Limit ryzyka każdego klastra
+    skala = np.ones(len(z))
+    for k in np.unique(klaster):
+        w = klaster == k
+        r = correlated_risk(z[w], rho[np.ix_(w, w)])
+        if r > max_klaster * kapital:
+            skala[w] = max_klaster * kapital / r
+        podsumowanie["klastry"][symbole[k]] = {"symbole": list(dict.fromkeys(wiersze["Symbol"].to_numpy()[w])),
+                                               "ryzyko": r}
+
+    # 2. Limit skorelowanego ryzyka całego portfela
+    r = correlated_risk(z * skala, rho)
+    if r > max_ryzyko * kapital:
+        skala *= max_ryzyko * kapital / r
+
+    # 3. Depozyt i dźwignia brutto
+    nominal = np.abs(wolumen * mult * cena)
+    with np.errstate(divide="ignore"):
+        depozyt = np.where(dzwignia > 0, nominal / dzwignia, nominal)
+    for uzyte, limit in [((depozyt * skala).sum(), max_depozyt * kapital),
+                         ((nominal * skala).sum(), max_dzwignia * kapital)]:
+        if uzyte > limit:
+            skala *= limit / uzyte
+
+    kolumny["Klaster"][aktywne] = [symbole[k] for k in klaster]
+    kolumny["Skala"][aktywne] = skala
+    kolumny["Wolumen portf."][aktywne] = wolumen * skala
+    kolumny["Ryzyko portf."][aktywne] = ryzyko * skala
+    kolumny["Nominał"][aktywne] = nominal * skala
+
+    podsumowanie.update({
+        "ryzyko_suma": float(ryzyko.sum()),
+        "ryzyko_skorelowane": correlated_risk(z, rho),
+        "ryzyko_po": correlated_risk(z * skala, rho),
+        "depozyt": float((depozyt * skala).sum()),
+        "dzwignia": float((nominal * skala).sum() / kapital),
+    })
+    return skan.assign(**kolumny), podsumowanie
+
+
+def main(argv=None):
+    from scanner import scan_portfolio  # scanner importuje ten moduł
+
+    parser = argparse.ArgumentParser(description="Wielkość pozycji dla wszystkich sygnałów naraz (ryzyko portfela)")
+    parser.add_argument("--kapital", type=float, default=10000.0)
+    parser.add_argument("--ryzyko", type=float, default=4.0, help="Ryzyko na transakcję (%%)")
+    parser.add_argument("--interwal", default="1d", help="Interwał świec, np. 1d, 4h, 1h")
+    parser.add_argument("--okno", type=int, default=OKNO, help="Liczba zwrotów do kowariancji")
+    parser.add_argument("--max-ryzyko", type=float, default=MAX_RYZYKO * 100, help="Ryzyko portfela (%%)")
+    parser.add_argument("--max-klaster", type=float, default=MAX_RYZYKO_KLASTRA * 100, help="Ryzyko klastra (%%)")
+    parser.add_argument("--max-dzwignia", type=float, default=MAX_DZWIGNIA, help="Nominał brutto / kapitał")
+    args = parser.parse_args(argv)
+
+    skan = scan_portfolio(args.kapital, args.ryzyko / 100.0, interval=args.interwal)
+    start = time.perf_counter()
+    wynik, p = size_portfolio(skan, args.kapital, interval=args.interwal, okno=args.okno,
+                              max_ryzyko=args.max_ryzyko / 100.0, max_klaster=args.max_klaster / 100.0,
+                              max_dzwignia=args.max_dzwignia)
+    czas = (time.perf_counter() - start) * 1000
+
+    wynik = wynik[wynik["Sygnał"].isin(["LONG", "SHORT"])]
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(wynik[["Strategia", "System", "Symbol", "Sygnał", "Cena", "Wolumen", "Ryzyko"] + KOLUMNY]
+              .to_string(index=False))
+    print()
+    print(f"Pozycje: {p['pozycje']}  (przeliczone w {czas:.1f} ms)")
+    print(f"Ryzyko: suma {p['ryzyko_suma']:.2f}, skorelowane {p['ryzyko_skorelowane']:.2f}, "
+          f"po limitach {p['ryzyko_po']:.2f}")
+    print(f"Depozyt: {p['depozyt']:.2f}, dźwignia brutto: {p['dzwignia']:.2f}x")
+    for nazwa, k in p["klastry"].items():
+        print(f"  klaster {nazwa}: {', '.join(k['symbole'])} - ryzyko {k['ryzyko']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
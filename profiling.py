@@ -0,0 +1,207 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# ==================================================
+#  PROFILOWANIE (czasy etapów, liczniki cache, pamięć) - opcjonalne
+# ==================================================
+# Wyłączone domyślnie: stage() i count() sprawdzają tylko flagę i bieżącą interakcję. Włączenie:
+#   SIGNALS_PROFIL=1                     pomiary w procesie (panel debug, /metrics)
+#   SIGNALS_PROFIL_LOG=profil.jsonl      dodatkowo jedna linia JSON na interakcję
+# Pojedynczą interakcję można mierzyć bez flagi procesu: interaction(nazwa, wlacz=True)
+# (np. sesja dashboardu z ?debug=1) - pomiary tylko w jej wątku, inne sesje nie płacą za nie.
+#
+# Interakcja to jedno przeliczenie strony dashboardu, jedno zapytanie do serwisu albo
+# jedno odświeżenie. W jej trakcie etapy (pobieranie, magazyn, walidacja, wskaźniki,
+# wykres, dziennik...) i liczniki (trafienia / chybienia cache) zapisywane są przy
+# bieżącym wątku, a po zakończeniu dopisywane do sum procesu (metrics()).
+# Etapy w innych wątkach (np. pula pobierania) trafiają tylko do sum procesu.
+#
+# Pamięć: RSS procesu na początku i końcu interakcji oraz "wskaźniki" zgłaszane przez
+# moduły (register_gauge - np. rozmiar barcache), bez tracemalloc (za drogi na co dzień).
+
+WLACZONE = os.environ.get("SIGNALS_PROFIL", "0") not in ("", "0")
+LOG = os.environ.get("SIGNALS_PROFIL_LOG")
+HISTORIA = 50  # ostatnie interakcje trzymane w pamięci
+
+_lokalne = threading.local()
+_lock = threading.Lock()
+_etapy = {}        # nazwa -> [liczba, suma ms, max ms]
+_liczniki = {}     # nazwa -> liczba
+_interakcje = {}   # nazwa -> [liczba, suma ms, max ms]
+_ostatnie = deque(maxlen=HISTORIA)
+_wskazniki = {}    # nazwa -> funkcja bez argumentów (wartość w chwili odczytu)
+_start = time.time()
+
+
+def enable(wlacz=True):
+    global WLACZONE
+    WLACZONE = wlacz
+
+
+def register_gauge(nazwa, funkcja):
+    _wskazniki[nazwa] = funkcja
+
+
+def rss_mb():
+    # Bieżący RSS procesu (Linux: /proc), inaczej szczyt z getrusage, inaczej None
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+        szczyt = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return szczyt / 2**20 if os.uname().sysname == "Darwin" else szczyt / 2**10
+    except (ImportError, AttributeError):
+        return None
+
+
+class Interaction:
+    __slots__ = ("nazwa", "czas", "start", "rss_start", "etapy", "liczniki", "glebokosc", "ms", "rss")
+
+    def __init__(self, nazwa):
+        self.nazwa = nazwa
+        self.czas = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+        self.start = time.perf_counter()
+        self.rss_start = rss_mb()
+        self.etapy = []      # [nazwa, głębokość, ms] w kolejności rozpoczęcia
+        self.liczniki = {}
+        self.glebokosc = 0
+        self.ms = None
+        self.rss = None
+
+    def summary(self):
+        # Etapy zsumowane po ścieżce ("skaner / sygnaly / wskazniki"), w kolejności pierwszego wystąpienia
+        sumy, sciezka = {}, []
+        for nazwa, poziom, ms in self.etapy:
+            del sciezka[poziom:]
+            sciezka.append(nazwa)
+            s = sumy.setdefault(" / ".join(sciezka), [0, 0.0])
+            s[0] += 1
+            s[1] += ms or 0.0
+        return [{"etap": k, "liczba": l, "ms": round(ms, 3)} for k, (l, ms) in sumy.items()]
+
+    def as_dict(self):
+        return {
+            "interakcja": self.nazwa, "czas": self.czas, "ms": self.ms,
+            "etapy": [{"etap": n, "poziom": g, "ms": None if ms is None else round(ms, 3)}
+                      for n, g, ms in self.etapy],
+            "liczniki": dict(self.liczniki),
+            "pamiec": {"rss_mb": self.rss, "rss_zmiana_mb": None if self.rss is None or self.rss_start is None
+                       else self.rss - self.rss_start},
+        }
+
+
+def _dodaj(slownik, nazwa, ms):
+    s = slownik.get(nazwa)
+    if s is None:
+        slownik[nazwa] = [1, ms, ms]
+    else:
+        s[0] += 1
+        s[1] += ms
+        s[2] = max(s[2], ms)
+
+
+def current():
+    return getattr(_lokalne, "interakcja", None)
+
+
+@contextmanager
+def interaction(nazwa, wlacz=False):
+    # Zagnieżdżona interakcja (np. skaner wywołany ze strony) liczy się jako etap zewnętrznej
+    if not (WLACZONE or wlacz) or current() is not None:
+        with stage(nazwa):
+            yield current()
+        return
+    biezaca = _lokalne.interakcja = Interaction(nazwa)
+    try:
+        yield biezaca
+    finally:
+        _lokalne.interakcja = None
+        biezaca.ms = (time.perf_counter() - biezaca.start) * 1000
+        biezaca.rss = rss_mb()
+        with _lock:
+            _dodaj(_interakcje, nazwa, biezaca.ms)
+            _ostatnie.append(biezaca)
+        if LOG:
+            _log(biezaca.as_dict())
+
+
+@contextmanager
+def stage(nazwa):
+    biezaca = current()
+    if not WLACZONE and biezaca is None:
+        yield
+        return
+    if biezaca is not None:
+        wpis = [nazwa, biezaca.glebokosc, None]
+        biezaca.etapy.append(wpis)
+        biezaca.glebokosc += 1
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - t0) * 1000
+        if biezaca is not None:
+            biezaca.glebokosc -= 1
+            wpis[2] = ms
+        with _lock:
+            _dodaj(_etapy, nazwa, ms)
+
+
+def count(nazwa, n=1):
+    biezaca = current()
+    if not WLACZONE and biezaca is None:
+        return
+    if biezaca is not None:
+        biezaca.liczniki[nazwa] = biezaca.liczniki.get(nazwa, 0) + n
+    with _lock:
+        _liczniki[nazwa] = _liczniki.get(nazwa, 0) + n
+
+
+def gauges():
+    wynik = {"rss_mb": rss_mb()}
+    for nazwa, funkcja in list(_wskazniki.items()):
+        try:
+            wynik[nazwa] = funkcja()
+        except Exception as e:
+            wynik[nazwa] = f"{type(e).__name__}: {e}"
+    return wynik
+
+
+def metrics(ostatnie=10):
+    # Migawka do /metrics i panelu debug: sumy etapów i interakcji, liczniki, pamięć
+    def tabela(slownik):
+        return {n: {"liczba": l, "suma_ms": round(s, 3), "srednia_ms": round(s / l, 3), "max_ms": round(m, 3)}
+                for n, (l, s, m) in sorted(slownik.items(), key=lambda x: -x[1][1])}
+    with _lock:
+        wynik = {
+            "wlaczone": WLACZONE, "od": datetime.fromtimestamp(_start, timezone.utc).isoformat(timespec="seconds"),
+            "interakcje": tabela(_interakcje), "etapy": tabela(_etapy), "liczniki": dict(sorted(_liczniki.items())),
+            "ostatnie": [i.as_dict() for i in list(_ostatnie)[-ostatnie:]] if ostatnie else [],
+        }
+    wynik["wskazniki"] = gauges()
+    return wynik
+
+
+def reset():
+    with _lock:
+        _etapy.clear()
+        _liczniki.clear()
+        _interakcje.clear()
+        _ostatnie.clear()
+
+
+def _log(wpis):
+    # Jedna linia JSON na interakcję; błąd zapisu nie może zatrzymać strony ani serwisu
+    try:
+        with _lock, open(LOG, "a", encoding="utf-8") as f:
+            f.write(json.dumps(wpis, ensure_ascii=False) + "\n")
+    except OSError:
+        pass
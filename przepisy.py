@@ -0,0 +1,133 @@
+import json
+import os
+import tomllib
+from dataclasses import dataclass, fields
+from typing import ClassVar
+
+# ==================================================
+#  Baza Danych "ZŁOTYCH PRZEPISÓW"
+# ==================================================
+# Wspólne źródło przepisów dla stron Streamlit, skanera portfela, backtestu itd.
+# Dane w przepisy.toml (albo plik z SIGNALS_PRZEPISY, .toml lub .json), tutaj
+# typowane przepisy (TrendRecipe, MeanRevRecipe) z polami po nazwie zamiast pozycji.
+#
+# WYMAGANIA - różne (wskaźnik, okres) potrzebne na każdym symbolu, zebrane ze
+# wszystkich przepisów raz przy wczytaniu. Skaner liczy z nich każdy szereg
+# wskaźnika dokładnie raz (barcache.prime), bez względu na to, ile przepisów go używa.
+
+PLIK = os.environ.get("SIGNALS_PRZEPISY", os.path.join(os.path.dirname(os.path.abspath(__file__)), "przepisy.toml"))
+
+# --------------------------------------------------
+#  SYSTEM PODĄŻANIA ZA TRENDEM (signaltrend.py)
+# --------------------------------------------------
+
+@dataclass(frozen=True, slots=True)
+class TrendRecipe:
+    strategia: ClassVar[str] = "Trend"
+
+    symbol: str
+    mult: float
+    dzwignia: float
+    in_p: int
+    out_p: int
+    ema_p: int
+    m_sl: float
+    k_tsl: float
+    atr_p: int = 14
+
+    def requirements(self):
+        # Klucze memo wskaźników jak w signallogic.add_trend_indicators
+        return [("ema", self.ema_p), ("donchian", self.in_p), ("donchian", self.out_p),
+                ("atr_wilder", self.atr_p)]
+
+# --------------------------------------------------
+#  SYSTEM POWROTU DO ŚREDNIEJ (signalmeanrev.py)
+# --------------------------------------------------
+# Wartości domyślne = przepis "wpisz ręcznie" w panelu bocznym.
+
+@dataclass(frozen=True, slots=True)
+class MeanRevRecipe:
+    strategia: ClassVar[str] = "Mean Reversion"
+
+    symbol: str = ""
+    mult: float = 1.0
+    dzwignia: float = 1.0
+    rsi_p: int = 14
+    atr_p: int = 14
+    m_sl: float = 2.0
+    l_ent: int = 30
+    l_ex: int = 70
+    s_ent: int = 70
+    s_ex: int = 30
+
+    def requirements(self):
+        # Klucze memo wskaźników jak w signallogic.add_meanrev_indicators
+        return [("rsi_sma", self.rsi_p), ("atr_sma", self.atr_p)]
+
+# --------------------------------------------------
+#  WCZYTYWANIE
+# --------------------------------------------------
+
+def _recipe(klasa, nazwa, pola):
+    typy = {f.name: f.type for f in fields(klasa)}
+    nieznane = sorted(set(pola) - set(typy))
+    if nieznane:
+        raise ValueError(f"Przepis {nazwa!r}: nieznane pola {', '.join(nieznane)}")
+    wartosci = {}
+    for k, v in pola.items():
+        typ = typy[k]
+        # int -> float (mult = 1 w pliku) tak, ułamkowy okres (in_p = 20.5) nie
+        if typ is int and not (isinstance(v, int) or (isinstance(v, float) and v.is_integer())):
+            raise ValueError(f"Przepis {nazwa!r}: {k} = {v!r} - oczekiwana liczba całkowita")
+        try:
+            wartosci[k] = typ(v)
+        except (TypeError, ValueError):
+            raise ValueError(f"Przepis {nazwa!r}: {k} = {v!r} - oczekiwany typ {typ.__name__}") from None
+    try:
+        return klasa(**wartosci)
+    except TypeError as e:
+        # brakujące pole
+        raise ValueError(f"Przepis {nazwa!r}: {e}") from None
+
+
+def load(plik=PLIK):
+    # -> (przepisy trendowe, przepisy mean reversion, okres ATR), słowniki nazwa -> przepis
+    if plik.endswith(".json"):
+        with open(plik, encoding="utf-8") as f:
+            dane = json.load(f)
+    else:
+        with open(plik, "rb") as f:
+            dane = tomllib.load(f)
+    atr_period = int(dane.get("atr_period", 14))
+    trend = {n: _recipe(TrendRecipe, n, {"atr_p": atr_period, **p}) for n, p in dane.get("trend", {}).items()}
+    meanrev = {n: _recipe(MeanRevRecipe, n, p) for n, p in dane.get("meanrev", {}).items()}
+    return trend, meanrev, atr_period
+
+
+def toml_line(nazwa, przepis):
+    # Linia do wklejenia w przepisy.toml (tabela [trend] albo [meanrev]); atr_p przepisu
+    # trendowego pomijane, gdy równe wspólnemu atr_period
+    pola = []
+    for f in fields(przepis):
+        v = getattr(przepis, f.name)
+        if f.name == "atr_p" and isinstance(przepis, TrendRecipe) and v == ATR_PERIOD:
+            continue
+        tekst = json.dumps(v) if f.type is str else str(int(v)) if f.type is int else repr(float(v))
+        pola.append(f"{f.name} = {tekst}")
+    return f"{json.dumps(nazwa, ensure_ascii=False)} = {{ {', '.join(pola)} }}"
+
+
+def requirements(przepisy):
+    # symbol -> różne (wskaźnik, okres) ze wszystkich przepisów na tym symbolu
+    wynik = {}
+    for p in przepisy:
+        wynik.setdefault(p.symbol, set()).update(p.requirements())
+    return {s: sorted(w) for s, w in wynik.items()}
+
+
+ZŁOTE_PRZEPISY_TREND, ZŁOTE_PRZEPISY_MEANREV, ATR_PERIOD = load()
+
+# (nazwa, przepis) obu tabel w kolejności z pliku - trend, potem mean reversion
+SYSTEMY = list(ZŁOTE_PRZEPISY_TREND.items()) + list(ZŁOTE_PRZEPISY_MEANREV.items())
+SYMBOLE = list(dict.fromkeys(p.symbol for _, p in SYSTEMY))
+WYMAGANIA = requirements(p for _, p in SYSTEMY)
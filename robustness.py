@@ -0,0 +1,325 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+import indicators
+import stops
+from barstore import get_bars_many
+from optimizer import GridStats
+from przepisy import SYSTEMY
+
+# ==================================================
+#  ODPORNOŚĆ PRZEPISÓW - BOOTSTRAP ŚWIEC I ROZRZUT PARAMETRÓW (Monte Carlo)
+# ==================================================
+# Każdy przepis puszczany jest tysiące razy na scenariuszach, które różnią się od historii:
+# * ceny      - blokowy bootstrap świec: losowe bloki kolejnych świec (zmiany open/high/low/close
+#               względem poprzedniego zamknięcia) sklejane w nową ścieżkę cen tej samej długości;
+#               bloki zachowują krótkoterminową zależność (trendy, skupiska zmienności),
+# * parametry - okresy x U(1 - R, 1 + R) (zaokrąglone), M i K x U(1 - R/2, 1 + R/2),
+#               progi RSI +/- PROGI_RSI punktów (wyjście zawsze po właściwej stronie wejścia).
+# Wynik przepisu to rozkład zwrotu i maksymalnego obsunięcia (kapitał składany przy stałym
+# % ryzyka, jak w optimizer.py) zamiast jednej liczby z historii, do której go dopasowano.
+#
+# Zasady jak w backtest.py: trend - stops.trend_paths (stop M x ATR, trailing K x ATR, kanał OUT),
+# mean reversion - stop M x ATR i wyjście po RSI.
+#
+# Wykonanie: scenariusze przepisu dzielone na paczki (PACZKA) w puli procesów. Świece wszystkich
+# symboli leżą raz w pamięci współdzielonej (multiprocessing.shared_memory) - procesy robocze
+# czytają je bez kopiowania i bez przesyłania DataFrame przy każdym zadaniu.
+#
+# Uruchomienie:
+#   python robustness.py                                   (cały portfel, 1000 scenariuszy)
+#   python robustness.py --system "Kakao (CC=F)" --scenariusze 5000 --tryb parametry
+#   python robustness.py --okres 10y --blok 40 --rozrzut 0.3 --csv scenariusze.csv
+
+SCENARIUSZE = 1000
+PACZKA = 250          # scenariusze w jednym zadaniu puli
+BLOK = 20             # długość bloku bootstrapu (świece)
+ROZRZUT = 0.2         # względny rozrzut okresów (M i K - połowa)
+PROGI_RSI = 5.0       # rozrzut progów RSI (punkty)
+TRYBY = {"oba": (True, True), "ceny": (True, False), "parametry": (False, True)}
+
+POLA_CEN = ("open", "high", "low", "close")
+KOLUMNY_WYNIKU = ["Transakcje", "Trafność", "Suma R", "Zwrot", "Max DD"]
+
+# --------------------------------------------------
+# 1. SCENARIUSZE
+# --------------------------------------------------
+
+def resample(ceny, s, blok, rng):
+    # ceny (świece x 4: open, high, low, close) -> 4 tablice (świece x s) ze ścieżkami z bootstrapu.
+    # Pierwsza świeca bez zmian, kolejne z losowych bloków zmian względem poprzedniego zamknięcia.
+    # Zmiany względne tylko między dodatnimi cenami (ujemne notowania, np. CL=F 2020-04-20, pomijane)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        zmiany = ceny[1:] / ceny[:-1, 3:4]
+    zmiany = zmiany[np.isfinite(zmiany).all(axis=1) & (ceny[:-1, 3] > 0) & (ceny[1:] > 0).all(axis=1)]
+    n = len(zmiany)
+    blok = max(1, min(blok, n))
+    bloki = -(-n // blok)
+    starty = rng.integers(0, n - blok + 1, size=(bloki, s))
+    indeks = (starty[:, None, :] + np.arange(blok)[None, :, None]).reshape(-1, s)[:n]
+    wybrane = zmiany[indeks]                                    # (świece - 1) x s x 4
+    close = ceny[0, 3] * np.cumprod(wybrane[:, :, 3], axis=0)
+    poprzednie = np.vstack([np.full((1, s), ceny[0, 3]), close[:-1]])
+    wynik = [np.vstack([np.full((1, s), ceny[0, i]), poprzednie * wybrane[:, :, i]]) for i in range(3)]
+    return (*wynik, np.vstack([np.full((1, s), ceny[0, 3]), close]))
+
+
+def perturb(przepis, s, rozrzut, rng):
+    # Parametry przepisu dla s scenariuszy: {pole: wektor}
+    def okres(p):
+        return np.maximum(2, np.rint(p * rng.uniform(1.0 - rozrzut, 1.0 + rozrzut, s))).astype(int)
+
+    def mnoznik(x):
+        return x * rng.uniform(1.0 - rozrzut / 2, 1.0 + rozrzut / 2, s)
+
+    def prog(x):
+        return np.clip(x + rng.uniform(-PROGI_RSI, PROGI_RSI, s), 1.0, 99.0)
+
+    p = przepis
+    if p.strategia == "Trend":
+        return {"in_p": okres(p.in_p), "out_p": okres(p.out_p), "ema_p": okres(p.ema_p), "atr_p": okres(p.atr_p),
+                "m_sl": mnoznik(p.m_sl), "k_tsl": mnoznik(p.k_tsl)}
+    l_ent, s_ent = prog(p.l_ent), prog(p.s_ent)
+    return {"rsi_p": okres(p.rsi_p), "atr_p": okres(p.atr_p), "m_sl": mnoznik(p.m_sl),
+            "l_ent": l_ent, "l_ex": np.maximum(prog(p.l_ex), l_ent + 1.0),
+            "s_ent": s_ent, "s_ex": np.minimum(prog(p.s_ex), s_ent - 1.0)}
+
+
+def unchanged(przepis, s):
+    pola = ("in_p", "out_p", "ema_p", "atr_p", "m_sl", "k_tsl") if przepis.strategia == "Trend" else \
+        ("rsi_p", "atr_p", "m_sl", "l_ent", "l_ex", "s_ent", "s_ex")
+    return {pole: np.full(s, getattr(przepis, pole)) for pole in pola}
+
+
+def _per_column(fn, okresy, *serie):
+    # Wskaźnik z innym okresem w każdej kolumnie - jedno wywołanie na każdy występujący okres
+    wynik = None
+    for okres in np.unique(okresy):
+        kolumny = okresy == okres
+        czesci = fn(*(x[:, kolumny] for x in serie), int(okres))
+        czesci = czesci if isinstance(czesci, tuple) else (czesci,)
+        if wynik is None:
+            wynik = tuple(np.empty(serie[0].shape) for _ in czesci)
+        for w, x in zip(wynik, czesci):
+            w[:, kolumny] = x
+    return wynik if len(wynik) > 1 else wynik[0]
+
+# --------------------------------------------------
+# 2. SYMULACJA (kolumny = scenariusze)
+# --------------------------------------------------
+
+def simulate_trend(open_, high, low, close, par, ryzyko_proc=0.04):
+    hi_in, lo_in = _per_column(indicators.donchian, par["in_p"], high, low)
+    hi_out, lo_out = _per_column(indicators.donchian, par["out_p"], high, low)
+    sciezki = stops.trend_paths({
+        "open": open_, "high": high, "low": low, "close": close,
+        "atr": _per_column(indicators.atr_wilder, par["atr_p"], high, low, close),
+        "ema": _per_column(indicators.ema, par["ema_p"], close),
+        "hi_in": hi_in, "lo_in": lo_in, "hi_out": hi_out, "lo_out": lo_out,
+        "hi_now": _per_column(indicators.rolling_max, par["in_p"], high),
+        "lo_now": _per_column(indicators.rolling_min, par["in_p"], low),
+    }, par["m_sl"], par["k_tsl"])
+
+    # Transakcje z przebiegu pozycji: ryzyko (M x ATR) ze świecy wejścia, wynik w R na świecy wyjścia
+    poz, we, st, wyjscie = sciezki["pozycja"], sciezki["wejscie"], sciezki["stop"], sciezki["wyjscie"]
+    poprzednia = np.vstack([np.zeros((1, poz.shape[1]), dtype=poz.dtype), poz[:-1]])
+    wejscia = (poz != 0) & (poprzednia == 0)
+    ryzyko = pd.DataFrame(np.where(wejscia, np.abs(we - st), np.nan)).ffill().to_numpy()
+    stats = GridStats(poz.shape[1], ryzyko_proc)
+    with np.errstate(invalid="ignore"):
+        for t in np.flatnonzero((wyjscie > 0).any(axis=1)):
+            d = poprzednia[t]
+            stats.record(wyjscie[t] > 0, d * (sciezki["cena_wyjscia"][t] - we[t - 1]) / ryzyko[t - 1])
+        # Otwarte pozycje rozliczamy po ostatnim zamknięciu
+        stats.record(poz[-1] != 0, poz[-1] * (close[-1] - we[-1]) / ryzyko[-1])
+    return stats.summary()
+
+
+def simulate_meanrev(open_, high, low, close, par, ryzyko_proc=0.04):
+    # Jak walkforward.simulate_meanrev_grid, ale każda kolumna ma własną ścieżkę cen
+    rsi = _per_column(indicators.rsi_sma, par["rsi_p"], close)
+    atr = _per_column(indicators.atr_sma, par["atr_p"], high, low, close)
+    m, l_ent, l_ex, s_ent, s_ex = (par[p] for p in ("m_sl", "l_ent", "l_ex", "s_ent", "s_ex"))
+    c = close.shape[1]
+
+    pos = np.zeros(c, dtype=np.int8)
+    entry = np.zeros(c)
+    risk = np.ones(c)
+    stop = np.full(c, np.nan)
+    stats = GridStats(c, ryzyko_proc)
+
+    def zamknij(maska, cena):
+        stats.record(maska, np.where(pos == 1, cena - entry, entry - cena) / risk)
+        pos[maska] = 0
+
+    with np.errstate(invalid="ignore"):
+        for t in range(close.shape[0]):
+            # 1. Stop M x ATR - luka otwarcia wypełniana po open
+            hit_l = (pos == 1) & (low[t] <= stop)
+            hit_s = (pos == -1) & (high[t] >= stop)
+            if hit_l.any() or hit_s.any():
+                zamknij(hit_l | hit_s, np.where(hit_l, np.minimum(open_[t], stop), np.maximum(open_[t], stop)))
+
+            # 2. Wyjście po RSI na zamknięciu
+            ex_l = (pos == 1) & (rsi[t] > l_ex)
+            ex_s = (pos == -1) & (rsi[t] < s_ex)
+            wyszlo = hit_l | hit_s | ex_l | ex_s
+            if ex_l.any() or ex_s.any():
+                zamknij(ex_l | ex_s, close[t])
+
+            # 3. Nowe wejścia (bez ATR nie da się policzyć stopu ani wolumenu)
+            wolne = (pos == 0) & ~wyszlo & (atr[t] > 0)
+            long_sig = wolne & (rsi[t] < l_ent)
+            short_sig = wolne & ~long_sig & (rsi[t] > s_ent)
+            if long_sig.any() or short_sig.any():
+                nowe = long_sig | short_sig
+                pos[long_sig] = 1
+                pos[short_sig] = -1
+                entry[nowe] = close[t][nowe]
+                risk[nowe] = (m * atr[t])[nowe]
+                stop[long_sig] = (close[t] - risk)[long_sig]
+                stop[short_sig] = (close[t] + risk)[short_sig]
+
+        otwarte = pos != 0
+        if otwarte.any():
+            zamknij(otwarte, close[-1])
+
+    return stats.summary()
+
+# --------------------------------------------------
+# 3. PULA PROCESÓW I PAMIĘĆ WSPÓŁDZIELONA
+# --------------------------------------------------
+# Świece wszystkich symboli w jednym bloku (suma świec x 4); symbol -> (przesunięcie, długość).
+
+_CENY = None
+_BLOK_PAMIECI = None
+
+
+def _attach(nazwa, ksztalt):
+    # Inicjalizacja procesu roboczego - widok NumPy na blok pamięci współdzielonej (bez kopii)
+    global _CENY, _BLOK_PAMIECI
+    _BLOK_PAMIECI = shared_memory.SharedMemory(name=nazwa)
+    _CENY = np.ndarray(ksztalt, dtype=np.float64, buffer=_BLOK_PAMIECI.buf)
+
+
+def _task(nazwa, przepis, polozenie, s, ziarno, tryb, blok, rozrzut, ryzyko_proc):
+    # Jedna paczka scenariuszy jednego przepisu; tryb=None - ścieżka historyczna (wynik bazowy)
+    od, n = polozenie
+    ceny = _CENY[od:od + n]
+    rng = np.random.default_rng(ziarno)
+    losuj_ceny, losuj_parametry = TRYBY[tryb] if tryb else (False, False)
+    if losuj_ceny:
+        open_, high, low, close = resample(ceny, s, blok, rng)
+    else:
+        open_, high, low, close = (np.repeat(ceny[:, i:i + 1], s, axis=1) for i in range(4))
+    par = perturb(przepis, s, rozrzut, rng) if losuj_parametry else unchanged(przepis, s)
+    symuluj = simulate_trend if przepis.strategia == "Trend" else simulate_meanrev
+    wynik = symuluj(open_, high, low, close, par, ryzyko_proc)
+    return nazwa, tryb is None, {**{k: wynik[k] for k in KOLUMNY_WYNIKU}, **par}
+
+
+def run(dane, systemy=None, scenariusze=SCENARIUSZE, tryb="oba", blok=BLOK, rozrzut=ROZRZUT,
+        ryzyko_proc=0.04, procesy=None, ziarno=0):
+    # dane - {symbol: DataFrame świec}; -> (podsumowanie przepisów, wszystkie scenariusze)
+    systemy = SYSTEMY if systemy is None else systemy
+    systemy = [(n, p) for n, p in systemy if dane.get(p.symbol) is not None and len(dane[p.symbol]) > 1]
+    if not systemy:
+        return pd.DataFrame(), pd.DataFrame()
+
+    symbole = list(dict.fromkeys(p.symbol for _, p in systemy))
+    tablice = [dane[s][list(POLA_CEN)].to_numpy(dtype=np.float64) for s in symbole]
+    polozenie, od = {}, 0
+    for s, x in zip(symbole, tablice):
+        polozenie[s] = (od, len(x))
+        od += len(x)
+
+    pamiec = shared_memory.SharedMemory(create=True, size=max(od * 4 * 8, 1))
+    try:
+        ceny = np.ndarray((od, 4), dtype=np.float64, buffer=pamiec.buf)
+        for s, x in zip(symbole, tablice):
+            ceny[polozenie[s][0]:polozenie[s][0] + len(x)] = x
+
+        zadania = []
+        for i, (nazwa, p) in enumerate(systemy):
+            zadania.append((nazwa, p, polozenie[p.symbol], 1, 0, None, blok, rozrzut, ryzyko_proc))
+            for j, start in enumerate(range(0, scenariusze, PACZKA)):
+                zadania.append((nazwa, p, polozenie[p.symbol], min(PACZKA, scenariusze - start),
+                                [ziarno, i, j], tryb, blok, rozrzut, ryzyko_proc))
+
+        bazowe, czesci = {}, {}
+        with ProcessPoolExecutor(max_workers=procesy, initializer=_attach,
+                                 initargs=(pamiec.name, ceny.shape)) as pool:
+            futures = [pool.submit(_task, *z) for z in zadania]
+            for f in as_completed(futures):
+                nazwa, bazowy, wynik = f.result()
+                if bazowy:
+                    bazowe[nazwa] = wynik
+                else:
+                    czesci.setdefault(nazwa, []).append(pd.DataFrame(wynik))
+        del ceny
+    finally:
+        pamiec.close()
+        pamiec.unlink()
+
+    wiersze, wszystkie = [], []
+    for nazwa, p in systemy:
+        sc = pd.concat(czesci[nazwa], ignore_index=True)
+        wszystkie.append(sc.assign(System=nazwa, Symbol=p.symbol, Strategia=p.strategia))
+        zwrot, dd = sc["Zwrot"], sc["Max DD"]
+        wiersze.append({
+            "Strategia": p.strategia, "System": nazwa, "Symbol": p.symbol, "Scenariusze": len(sc),
+            "Zwrot bazowy": float(bazowe[nazwa]["Zwrot"][0]), "Max DD bazowy": float(bazowe[nazwa]["Max DD"][0]),
+            "Zwrot p5": zwrot.quantile(0.05), "Zwrot p50": zwrot.median(), "Zwrot p95": zwrot.quantile(0.95),
+            "P(strata)": float((zwrot < 0).mean()),
+            "Max DD p50": dd.median(), "Max DD p95": dd.quantile(0.95),
+            "Transakcje p50": sc["Transakcje"].median(),
+        })
+    return pd.DataFrame(wiersze), pd.concat(wszystkie, ignore_index=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Odporność przepisów: bootstrap świec i rozrzut parametrów")
+    parser.add_argument("--system", action="append", help="Nazwa systemu (można powtórzyć)")
+    parser.add_argument("--strategia", choices=["Trend", "Mean Reversion"])
+    parser.add_argument("--okres", default="10y", help="Zakres historii, np. 5y, 10y, max")
+    parser.add_argument("--scenariusze", type=int, default=SCENARIUSZE, help="Scenariusze na przepis")
+    parser.add_argument("--tryb", choices=list(TRYBY), default="oba",
+                        help="Co losować: ceny (bootstrap), parametry, oba")
+    parser.add_argument("--blok", type=int, default=BLOK, help="Długość bloku bootstrapu (świece)")
+    parser.add_argument("--rozrzut", type=float, default=ROZRZUT, help="Względny rozrzut okresów")
+    parser.add_argument("--ryzyko", type=float, default=4.0, help="Ryzyko na transakcję (%%)")
+    parser.add_argument("--procesy", type=int, default=os.cpu_count())
+    parser.add_argument("--ziarno", type=int, default=0)
+    parser.add_argument("--csv", help="Zapisz wszystkie scenariusze do pliku CSV")
+    args = parser.parse_args(argv)
+
+    systemy = [(n, p) for n, p in SYSTEMY if (not args.system or n in args.system)
+               and (not args.strategia or p.strategia == args.strategia)]
+    if not systemy:
+        parser.exit(1, "Brak systemów do sprawdzenia.\n")
+
+    start = time.perf_counter()
+    dane = get_bars_many(list(dict.fromkeys(p.symbol for _, p in systemy)), period=args.okres, interval="1d")
+    podsumowanie, scenariusze = run(dane, systemy, args.scenariusze, args.tryb, args.blok, args.rozrzut,
+                                    args.ryzyko / 100.0, args.procesy, args.ziarno)
+    czas = time.perf_counter() - start
+
+    if podsumowanie.empty:
+        parser.exit(1, "Brak danych dla wybranych systemów.\n")
+    if args.csv:
+        scenariusze.to_csv(args.csv, index=False)
+
+    print(f"{len(scenariusze)} scenariuszy dla {len(podsumowanie)} przepisów w {czas:.1f} s "
+          f"(tryb: {args.tryb}, blok {args.blok}, rozrzut {args.rozrzut:.0%})\n")
+    with pd.option_context("display.max_rows", None, "display.width", 250, "display.float_format", "{:.3f}".format):
+        print(podsumowanie.drop(columns="Scenariusze").to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
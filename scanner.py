@@ -0,0 +1,123 @@
+import argparse
+import time
+
+import pandas as pd
+
+from przepisy import SYSTEMY, WYMAGANIA
+import barcache
+import journal
+import profiling
+from portfolio import size_portfolio
+from signallogic import evaluate_trend, evaluate_meanrev
+
+# ==================================================
+#  SKANER PORTFELA (wszystkie ZŁOTE PRZEPISY naraz)
+# ==================================================
+# Uruchomienie z konsoli:
+#   python scanner.py --kapital 10000 --ryzyko 4
+# albo z dashboardu (zakładka "Skaner portfela").
+
+KOLUMNY = ["Strategia", "System", "Symbol", "Data", "Cena", "Sygnał", "Stop Loss",
+           "Wolumen", "Ryzyko", "Trailing SL Long", "Trailing SL Short",
+           "Wyjście Long", "Wyjście Short", "Błąd", "Dane"]
+
+
+def _trend_row(nazwa, p, period, interval, kapital, ryzyko_proc):
+    df = barcache.trend_frame(p.symbol, p.in_p, p.out_p, p.ema_p, p.atr_p, period, interval)
+    w = evaluate_trend(df, p.in_p, p.m_sl, p.k_tsl, p.mult, kapital, ryzyko_proc)
+    return {
+        "Strategia": p.strategia, "System": nazwa, "Symbol": p.symbol,
+        "Data": w['date'], "Cena": w['current_price'], "Sygnał": w['signal'] or "",
+        "Stop Loss": w['sl_price'], "Wolumen": w['position_size'],
+        "Ryzyko": w['cash_risk'] if w['signal'] else 0.0,
+        "Trailing SL Long": w['tsl_long'], "Trailing SL Short": w['tsl_short'],
+        "Wyjście Long": bool(w['exit_long']), "Wyjście Short": bool(w['exit_short']),
+    }
+
+
+def _meanrev_row(nazwa, p, period, interval, kapital, ryzyko_proc):
+    df = barcache.meanrev_frame(p.symbol, p.rsi_p, p.atr_p, period, interval)
+    w = evaluate_meanrev(df, p.m_sl, p.l_ent, p.l_ex, p.s_ent, p.s_ex, p.mult, kapital, ryzyko_proc)
+    return {
+        "Strategia": p.strategia, "System": nazwa, "Symbol": p.symbol,
+        "Data": w['date'], "Cena": w['current_price'], "Sygnał": w['signal'] or "",
+        "Stop Loss": w['sl_price'], "Wolumen": w['vol'],
+        "Ryzyko": w['risk_cash'] if w['signal'] else 0.0,
+        "Wyjście Long": bool(w['exit_long']), "Wyjście Short": bool(w['exit_short']),
+    }
+
+
+def scan_portfolio(kapital=10000.0, ryzyko_proc=0.04, period="2y", interval="1d", symbole=None, ttl=None,
+                   zrodlo="skaner", swiece=None):
+    # symbole - opcjonalnie tylko systemy na tych symbolach (odświeżanie części portfela)
+    # ttl - maksymalny wiek świec z barcache (0 wymusza dociągnięcie nowych)
+    # zrodlo - opis w dzienniku sygnałów (journal.py); None - bez zapisu
+    # swiece - opcjonalny słownik, do którego trafiają świece skanu {symbol: df} (serwis liczy z nich portfel)
+    start = time.perf_counter()
+    systemy = SYSTEMY
+    if symbole is not None:
+        systemy = [(n, p) for n, p in systemy if p.symbol in symbole]
+
+    # Jedno pobranie dla wszystkich symboli z obu tabel (CL=F, ^NDX tylko raz),
+    # przez wspólny cache i lokalny magazyn - po pierwszym uruchomieniu tylko nowe świece
+    bledy = {}
+    dane = barcache.get_bars_many([p.symbol for _, p in systemy], period=period, interval=interval,
+                                  bledy=bledy, ttl=ttl)
+    if swiece is not None:
+        swiece.update(dane)
+
+    # Wskaźniki wszystkich przepisów symbolu naraz (jeden przebieg na wskaźnik, nie na system)
+    for s, df in dane.items():
+        if df is not None and len(df) >= 2:
+            barcache.prime(s, WYMAGANIA[s], period, interval)
+
+    wiersze = []
+    with profiling.stage("sygnaly"):
+        for nazwa, przepis in systemy:
+            df = dane.get(przepis.symbol)
+            if df is None or len(df) < 2:
+                wiersze.append({"Strategia": przepis.strategia, "System": nazwa, "Symbol": przepis.symbol,
+                                "Sygnał": "BRAK DANYCH",
+                                "Błąd": bledy[przepis.symbol].komunikat if przepis.symbol in bledy else ""})
+                continue
+            if przepis.strategia == "Trend":
+                wiersz = _trend_row(nazwa, przepis, period, interval, kapital, ryzyko_proc)
+            else:
+                wiersz = _meanrev_row(nazwa, przepis, period, interval, kapital, ryzyko_proc)
+            # Co poprawiła / zgłosiła kontrola jakości świec (validation.py)
+            raport = barcache.get_report(przepis.symbol, period, interval)
+            wiersz["Dane"] = raport.opis() if raport is not None else ""
+            wiersze.append(wiersz)
+
+    wynik = pd.DataFrame(wiersze, columns=KOLUMNY)
+    if zrodlo:
+        # Sygnały wejścia jednym zapisem do dziennika (powtórny skan tej samej świecy nic nie dopisuje)
+        journal.record(wiersze, interval, zrodlo, czas_ms=(time.perf_counter() - start) * 1000)
+    return wynik
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Skaner sygnałów dla całego portfela ZŁOTYCH PRZEPISÓW")
+    parser.add_argument("--kapital", type=float, default=10000.0, help="Kapitał (wartość konta)")
+    parser.add_argument("--ryzyko", type=float, default=4.0, help="Ryzyko na transakcję (%%)")
+    parser.add_argument("--interwal", default="1d", help="Interwał świec, np. 1d, 4h, 1h")
+    parser.add_argument("--tylko-sygnaly", action="store_true", help="Pokaż tylko systemy z sygnałem wejścia")
+    parser.add_argument("--portfel", action="store_true",
+                        help="Wolumen z limitami ryzyka całego portfela (korelacje, klastry, dźwignia)")
+    parser.add_argument("--csv", help="Zapisz wynik do pliku CSV")
+    args = parser.parse_args(argv)
+
+    wynik = scan_portfolio(args.kapital, args.ryzyko / 100.0, interval=args.interwal)
+    if args.portfel:
+        wynik, _ = size_portfolio(wynik, args.kapital, interval=args.interwal)
+    if args.tylko_sygnaly:
+        wynik = wynik[wynik["Sygnał"].isin(["LONG", "SHORT"])]
+    if args.csv:
+        wynik.to_csv(args.csv, index=False)
+
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(wynik.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
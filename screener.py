@@ -0,0 +1,167 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import barstore
+import indicators
+import przepisy
+from przepisy import ATR_PERIOD, MeanRevRecipe
+
+# ==================================================
+#  SKANER RYNKÓW (dowolna lista symboli, poza ZŁOTYMI PRZEPISAMI)
+# ==================================================
+# Warunki obu strategii dla setek / tysięcy symboli z lokalnej listy - szukanie nowych
+# rynków do przepisy.toml bez sprawdzania każdego osobno na stronie:
+# * wybicie z kanału Donchiana (signaltrend.py): close poza kanałem IN z poprzednich świec
+#   i po właściwej stronie EMA,
+# * surowe RSI (signalmeanrev.py): RSI < L_ENT (LONG) albo RSI > S_ENT (SHORT).
+#
+# Symbole przetwarzane są paczkami (PACZKA): pobranie paczki (barstore - magazyn + fetcher,
+# z pominięciem barcache, żeby nie wypychać świec portfela), świece ułożone w jedną tablicę
+# (świece x symbole) wyrównaną do ostatniej świecy (krótsze historie dopełnione z przodu NaN),
+# wskaźniki jednym przebiegiem NumPy dla całej paczki, wynik paczki oddawany od razu
+# (screen() to generator). Pamięć zależy od wielkości paczki, nie od długości listy.
+#
+# Lista symboli: plik tekstowy, jeden symbol w linii (# - komentarz), albo CSV z kolumną "symbol".
+#
+# Uruchomienie:
+#   python screener.py lista.txt
+#   python screener.py lista.txt --tylko-sygnaly --rsi 5 --l-ent 10 --s-ent 90 --csv kandydaci.csv
+#   python screener.py lista.csv --interwal 4h --in 40 --ema 100
+
+PACZKA = 200
+ROK = {"1d": 252, "4h": 1512, "1h": 6048}  # świece w roku (do liczby sygnałów w ostatnim roku)
+
+TREND = {"in_p": 20, "ema_p": 50, "atr_p": ATR_PERIOD}
+MEANREV = MeanRevRecipe()  # okresy i progi domyślne jak na stronie Mean Reversion
+
+KOLUMNY = ["Symbol", "Data", "Cena", "ATR %", "Trend", "Do wybicia [ATR]", "RSI", "Mean Reversion",
+           "Wybicia (rok)", "Skrajne RSI (rok)", "Świece", "W portfelu", "Błąd"]
+
+
+def read_universe(plik):
+    # Symbole z pliku listy, bez powtórzeń, w kolejności z pliku
+    if plik.lower().endswith(".csv"):
+        df = pd.read_csv(plik)
+        kolumna = next((k for k in df.columns if k.lower() == "symbol"), df.columns[0])
+        symbole = df[kolumna].dropna().astype(str).tolist()
+    else:
+        with open(plik, encoding="utf-8") as f:
+            symbole = [linia.split("#", 1)[0] for linia in f]
+    return list(dict.fromkeys(s.strip() for s in symbole if s.strip()))
+
+
+def stack(dane, pola=("high", "low", "close")):
+    # {symbol: df} -> (symbole z danymi, {pole: tablica (świece x symbole)}) wyrównane do ostatniej świecy
+    symbole = [s for s, df in dane.items() if df is not None and len(df)]
+    n = max((len(dane[s]) for s in symbole), default=0)
+    tablice = {p: np.full((n, len(symbole)), np.nan) for p in pola}
+    for j, s in enumerate(symbole):
+        df = dane[s]
+        for p in pola:
+            tablice[p][n - len(df):, j] = df[p].to_numpy(dtype=float)
+    return symbole, tablice
+
+
+def conditions(high, low, close, in_p, ema_p, atr_p, rsi_p, l_ent, s_ent, rok=252):
+    # Warunki wejścia obu strategii na ostatniej świecy + ile razy wystąpiły w ostatnim roku.
+    # Wejście: tablice (świece x symbole); wynik: słownik wektorów (symbole)
+    ema = indicators.ema(close, ema_p)
+    hi_in, lo_in = indicators.donchian(high, low, in_p)
+    atr = indicators.atr_wilder(high, low, close, atr_p)
+    rsi = indicators.rsi_sma(close, rsi_p)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Te same reguły co signallogic.trend_entry / meanrev_entry (NaN - brak sygnału)
+        trend_long = (close > hi_in) & (close > ema)
+        trend_short = (close < lo_in) & (close < ema)
+        mr_long = rsi < l_ent
+        mr_short = rsi > s_ent
+
+        c, a = close[-1], atr[-1]
+        # Odległość do wybicia w kierunku trendu (EMA), w ATR; <= 0 - wybicie jest
+        do_wybicia = np.where(c > ema[-1], hi_in[-1] - c, np.where(c < ema[-1], c - lo_in[-1], np.nan)) / a
+        ostatnie = slice(max(0, close.shape[0] - rok), None)
+        return {
+            "Cena": c, "ATR %": np.where(c > 0, a / c * 100.0, np.nan),
+            "Trend": np.where(trend_long[-1], "LONG", np.where(trend_short[-1], "SHORT", "")),
+            "Do wybicia [ATR]": do_wybicia,
+            "RSI": rsi[-1],
+            "Mean Reversion": np.where(mr_long[-1], "LONG", np.where(mr_short[-1], "SHORT", "")),
+            "Wybicia (rok)": (trend_long | trend_short)[ostatnie].sum(axis=0),
+            "Skrajne RSI (rok)": (mr_long | mr_short)[ostatnie].sum(axis=0),
+        }
+
+
+def screen(symbole, period="2y", interval="1d", trend=None, meanrev=None, paczka=PACZKA):
+    # Generator: DataFrame (KOLUMNY) dla każdej paczki symboli, zaraz po jej policzeniu
+    trend = {**TREND, **(trend or {})}
+    meanrev = {"rsi_p": MEANREV.rsi_p, "l_ent": MEANREV.l_ent, "s_ent": MEANREV.s_ent, **(meanrev or {})}
+    portfel = set(przepisy.SYMBOLE)
+    for start in range(0, len(symbole), paczka):
+        czesc = symbole[start:start + paczka]
+        bledy = {}
+        dane = barstore.get_bars_many(czesc, period=period, interval=interval, bledy=bledy)
+        kolumny, tablice = stack(dane)
+        wynik = conditions(tablice["high"], tablice["low"], tablice["close"], rok=ROK.get(interval, 252),
+                           **trend, **meanrev) if kolumny else {}
+        df = pd.DataFrame(wynik, index=kolumny)
+        df["Data"] = [dane[s].index[-1] for s in kolumny]
+        df["Świece"] = [len(dane[s]) for s in kolumny]
+        df = df.reindex(index=czesc, columns=KOLUMNY)
+        for k in ("Wybicia (rok)", "Skrajne RSI (rok)", "Świece"):
+            df[k] = df[k].astype("Int64")
+        df["Symbol"] = czesc
+        df["W portfelu"] = [s in portfel for s in czesc]
+        df["Błąd"] = [bledy[s].komunikat if s in bledy else ("" if s in kolumny else "brak danych")
+                      for s in czesc]
+        yield df[KOLUMNY].reset_index(drop=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Skaner warunków obu strategii dla dowolnej listy symboli")
+    parser.add_argument("lista", help="Plik z symbolami (jeden w linii) albo CSV z kolumną symbol")
+    parser.add_argument("--interwal", default="1d", help="Interwał świec, np. 1d, 4h, 1h")
+    parser.add_argument("--okres", default="2y", help="Historia do wskaźników")
+    parser.add_argument("--in", dest="in_p", type=int, default=TREND["in_p"], help="Kanał IN (świece)")
+    parser.add_argument("--ema", dest="ema_p", type=int, default=TREND["ema_p"])
+    parser.add_argument("--atr", dest="atr_p", type=int, default=TREND["atr_p"])
+    parser.add_argument("--rsi", dest="rsi_p", type=int, default=MEANREV.rsi_p)
+    parser.add_argument("--l-ent", type=float, default=MEANREV.l_ent, help="Wejście Long (RSI < X)")
+    parser.add_argument("--s-ent", type=float, default=MEANREV.s_ent, help="Wejście Short (RSI > X)")
+    parser.add_argument("--paczka", type=int, default=PACZKA, help="Symboli w jednej paczce")
+    parser.add_argument("--tylko-sygnaly", action="store_true", help="Tylko symbole z sygnałem wejścia")
+    parser.add_argument("--nowe", action="store_true", help="Pomiń symbole, które są już w portfelu")
+    parser.add_argument("--csv", help="Dopisuj wynik do pliku CSV (paczka po paczce)")
+    args = parser.parse_args(argv)
+
+    symbole = read_universe(args.lista)
+    if not symbole:
+        parser.exit(1, f"Brak symboli w {args.lista}.\n")
+    if args.csv and os.path.exists(args.csv):
+        os.remove(args.csv)
+
+    start = time.perf_counter()
+    razem = wiersze = 0
+    for df in screen(symbole, args.okres, args.interwal, {"in_p": args.in_p, "ema_p": args.ema_p, "atr_p": args.atr_p},
+                     {"rsi_p": args.rsi_p, "l_ent": args.l_ent, "s_ent": args.s_ent}, args.paczka):
+        razem += len(df)
+        if args.nowe:
+            df = df[~df["W portfelu"]]
+        if args.tylko_sygnaly:
+            df = df[(df["Trend"].fillna("") != "") | (df["Mean Reversion"].fillna("") != "")]
+        wiersze += len(df)
+        if args.csv:
+            df.to_csv(args.csv, mode="a", header=not os.path.exists(args.csv), index=False)
+        if len(df):
+            with pd.option_context("display.max_rows", None, "display.width", 250):
+                print(df.to_string(index=False, float_format="{:.2f}".format), flush=True)
+        print(f"# {razem}/{len(symbole)} symboli, {time.perf_counter() - start:.1f} s", flush=True)
+    print(f"\n{wiersze} wierszy z {len(symbole)} symboli w {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+import argparse
+import json
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+import journal
+import profiling
+from fetcher import FetchError
+from kalendarz import next_close
+from portfolio import size_portfolio
+from przepisy import SYMBOLE
+from scanner import scan_portfolio
+
+# ==================================================
+#  SERWIS SYGNAŁÓW (HTTP/JSON bez Streamlit)
+# ==================================================
+# Sygnały obu strategii (te same wiersze co skaner portfela) liczone w tle
+# i serwowane z gotowej migawki - zapytanie nie pobiera danych ani nie liczy
+# wskaźników, tylko zwraca przygotowany wcześniej JSON.
+#
+# Harmonogram: każdy symbol odświeżany raz po zamknięciu swojego rynku
+# (kalendarz.ZAMKNIECIA), plus pełne odświeżenie przy starcie i na żądanie (POST /refresh -
+# zlecenie dla wątku harmonogramu, odpowiedź 202 od razu, bez czekania na skan).
+#
+# Limity portfela (portfolio.py) liczone są ze świec ostatniego skanu trzymanych
+# przy migawce - także przy innym kapitale w zapytaniu nic nie jest pobierane.
+#
+# Błędy: 400 - złe parametry zapytania, 503 - brak danych rynkowych, 500 - inny błąd;
+# zawsze z JSON {"blad": ...}.
+#
+# Uruchomienie:
+#   python service.py --port 8765 --kapital 10000 --ryzyko 4
+#   python service.py --raz            (jedna migawka JSON na stdout)
+#
+# Endpointy:
+#   GET  /signals                        wszystkie systemy
+#   GET  /signals?tylko=sygnaly          tylko systemy z sygnałem wejścia
+#   GET  /signals?symbol=BTC-USD&strategia=Trend&system=Bitcoin
+#   GET  /signals?kapital=25000&ryzyko=2 wolumen i ryzyko przeliczone na inny kapitał
+#                                        (kolumny portfela - portfolio.py - liczone od nowa
+#                                        ze świec ostatniego skanu)
+#   GET  /status                         czasy odświeżeń, najbliższe zamknięcia, błędy
+#   GET  /journal?dni=90&wyniki=1        dziennik sygnałów (journal.py), z wynikiem w R
+#   GET  /journal?dni=365&statystyki=system   trafność i R (system / symbol / strategia / miesiac)
+#   GET  /metrics                        czasy etapów, liczniki cache, pamięć (profiling.py;
+#                                        pomiary tylko z SIGNALS_PROFIL=1)
+#   POST /refresh[?symbol=...]           zlecenie odświeżenia (202; postęp w /status)
+
+# Kilka minut po zamknięciu, żeby dzienna świeca zdążyła się ustalić.
+ZWLOKA = timedelta(minutes=10)
+
+
+def next_refresh(symbol, teraz=None):
+    # Najbliższe (po `teraz`) odświeżenie po zamknięciu rynku symbolu - datetime w UTC
+    teraz = teraz or datetime.now(timezone.utc)
+    return next_close(symbol, teraz - ZWLOKA) + ZWLOKA
+
+
+class SignalService:
+    def __init__(self, kapital=10000.0, ryzyko_proc=0.04, period="2y", interval="1d"):
+        self.kapital = kapital
+        self.ryzyko_proc = ryzyko_proc
+        self.period = period
+        self.interval = interval
+        self.symbole = list(SYMBOLE)
+        self.lock = threading.Lock()  # jedno odświeżanie naraz
+        self.wiersze = {}             # System -> wiersz skanera (dict gotowy do JSON)
+        self.swiece = {}              # symbol -> świece z ostatniego skanu (do limitów portfela)
+        self.odswiezone = {}          # symbol -> czas ostatniego odświeżenia (ISO)
+        self.migawka = b"[]"          # gotowy JSON wszystkich wierszy
+        self.blad = None              # ostatni błąd odświeżania w tle
+        self.zlecone = set()          # symbole z POST /refresh czekające na wątek harmonogramu
+        self.lock_zlecen = threading.Lock()
+        self.budzik = threading.Event()  # zlecenie albo zatrzymanie - harmonogram nie czeka do terminu
+        self.stop = threading.Event()
+
+    # --- odświeżanie ---
+
+    def refresh(self, symbole=None):
+        symbole = self.symbole if symbole is None else symbole
+        with self.lock, profiling.interaction("serwis: odswiezenie"):
+            # ttl=0 - po zamknięciu rynku zawsze dociągamy świece, z pominięciem barcache
+            swiece = dict(self.swiece)
+            wynik = scan_portfolio(self.kapital, self.ryzyko_proc, self.period, self.interval,
+                                   symbole=symbole, ttl=0, zrodlo="serwis", swiece=swiece)
+            # to_json zamienia NaN na null i daty na ISO
+            nowe = json.loads(wynik.to_json(orient="records", date_format="iso", force_ascii=False))
+            wiersze = dict(self.wiersze)
+            for w in nowe:
+                wiersze[w["System"]] = w
+            # Limity portfela zależą od wszystkich sygnałów naraz - przeliczane dla całej księgi
+            wiersze = {w["System"]: w for w in _portfel(list(wiersze.values()), self.kapital, swiece,
+                                                         self.period, self.interval)}
+            teraz = datetime.now(timezone.utc).isoformat(timespec="seconds")
+            for s in symbole:
+                self.odswiezone[s] = teraz
+            # Podmiana referencji - czytające wątki widzą starą albo nową migawkę, nigdy połowę
+            self.swiece = swiece
+            self.migawka = json.dumps(list(wiersze.values()), ensure_ascii=False).encode("utf-8")
+            self.wiersze = wiersze
+            self.blad = None
+
+    def request_refresh(self, symbole=None):
+        # POST /refresh - zlecenie dla wątku harmonogramu (None - cały portfel)
+        symbole = self.symbole if symbole is None else symbole
+        nieznane = [s for s in symbole if s not in self.symbole]
+        if nieznane:
+            raise ValueError(f"nieznane symbole: {', '.join(nieznane)}")
+        with self.lock_zlecen:
+            self.zlecone.update(symbole)
+        self.budzik.set()
+
+    def _scheduler(self):
+        while not self.stop.is_set():
+            terminy = {s: next_refresh(s) for s in self.symbole}
+            najblizszy = min(terminy.values())
+            czekaj = (najblizszy - datetime.now(timezone.utc)).total_seconds()
+            self.budzik.wait(max(czekaj, 0.0))
+            self.budzik.clear()
+            if self.stop.is_set():
+                break
+            with self.lock_zlecen:
+                symbole, self.zlecone = self.zlecone, set()
+            if datetime.now(timezone.utc) >= najblizszy:
+                symbole.update(s for s, t in terminy.items() if t == najblizszy)
+            if not symbole:
+                continue
+            try:
+                self.refresh([s for s in self.symbole if s in symbole])
+            except Exception as e:
+                # Serwis działa dalej na poprzedniej migawce; błąd widać w /status
+                self.blad = f"{type(e).__name__}: {e}"
+                print(f"Błąd odświeżania: {self.blad}")
+
+    def start(self):
+        watek = threading.Thread(target=self._scheduler, daemon=True)
+        watek.start()
+        return watek
+
+    def close(self):
+        self.stop.set()
+        self.budzik.set()
+
+    # --- odpowiedzi ---
+
+    def signals(self, zapytanie):
+        if not zapytanie:
+            return self.migawka
+        wiersze = list(self.wiersze.values())
+        if "kapital" in zapytanie or "ryzyko" in zapytanie:
+            # Wolumen i ryzykowana kwota są proporcjonalne do kapitał x ryzyko
+            kapital = _dodatnia(zapytanie, "kapital", self.kapital)
+            ryzyko = _dodatnia(zapytanie, "ryzyko", self.ryzyko_proc * 100.0) / 100.0
+            skala = (kapital * ryzyko) / (self.kapital * self.ryzyko_proc)
+            wiersze = [{**w, "Wolumen": w["Wolumen"] * skala if w.get("Wolumen") is not None else None,
+                        "Ryzyko": w["Ryzyko"] * skala if w.get("Ryzyko") is not None else None}
+                       for w in wiersze]
+            # Przed filtrami - limity portfela liczone są z całej księgi, na świecach ostatniego skanu
+            wiersze = _portfel(wiersze, kapital, self.swiece, self.period, self.interval)
+        if zapytanie.get("tylko") == "sygnaly":
+            wiersze = [w for w in wiersze if w["Sygnał"] in ("LONG", "SHORT")]
+        for pole, kolumna in [("symbol", "Symbol"), ("strategia", "Strategia"), ("system", "System")]:
+            if pole in zapytanie:
+                wiersze = [w for w in wiersze if w[kolumna] == zapytanie[pole]]
+        return json.dumps(wiersze, ensure_ascii=False).encode("utf-8")
+
+    def journal(self, zapytanie):
+        # Historia sygnałów z dziennika - czytana z SQLite przy każdym zapytaniu (nie z migawki)
+        statystyki = zapytanie.get("statystyki")
+        if statystyki not in (None, "system", "symbol", "strategia", "miesiac"):
+            raise ValueError(f"statystyki: {statystyki}")
+        df = journal.query(dni=float(zapytanie.get("dni", 90)), symbol=zapytanie.get("symbol"),
+                           system=zapytanie.get("system"), interval=zapytanie.get("interwal"),
+                           wyniki=bool(statystyki) or zapytanie.get("wyniki") == "1", period=self.period)
+        if statystyki:
+            df = journal.stats(df, statystyki)
+        return df.to_json(orient="records", date_format="iso", force_ascii=False).encode("utf-8")
+
+    def metrics(self, zapytanie):
+        return json.dumps(profiling.metrics(int(zapytanie.get("ostatnie", 10))), ensure_ascii=False).encode("utf-8")
+
+    def status(self):
+        return json.dumps({
+            "kapital": self.kapital, "ryzyko": self.ryzyko_proc * 100.0, "interwal": self.interval,
+            "systemy": len(self.wiersze),
+            "odswiezone": self.odswiezone,
+            "nastepne": {s: next_refresh(s).isoformat(timespec="seconds") for s in self.symbole},
+            "zlecone": sorted(self.zlecone),
+            "blad_odswiezania": self.blad,
+            "bledy": {w["System"]: w["Błąd"] for w in self.wiersze.values() if w.get("Błąd")},
+        }, ensure_ascii=False).encode("utf-8")
+
+
+def _dodatnia(zapytanie, pole, domyslna):
+    # Parametr liczbowy zapytania > 0 (zero dzieliłoby w przeliczeniu wolumenu i limitów)
+    wartosc = float(zapytanie.get(pole, domyslna))
+    if not math.isfinite(wartosc) or wartosc <= 0:
+        raise ValueError(f"{pole} musi być dodatni: {zapytanie.get(pole)}")
+    return wartosc
+
+
+def _portfel(wiersze, kapital, swiece, period, interval):
+    # Wiersze JSON uzupełnione o kolumny portfolio.size_portfolio - świece podane
+    # (z ostatniego skanu), bez pobierania danych w trakcie zapytania
+    if not wiersze:
+        return wiersze
+    wynik, _ = size_portfolio(pd.DataFrame(wiersze), kapital, period, interval, dane=swiece)
+    return json.loads(wynik.to_json(orient="records", date_format="iso", force_ascii=False))
+
+
+def make_handler(serwis):
+    class Handler(BaseHTTPRequestHandler):
+        def _wyslij(self, kod, tresc):
+            self.send_response(kod)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(tresc)))
+            self.end_headers()
+            self.wfile.write(tresc)
+
+        def _blad(self, kod, komunikat):
+            self._wyslij(kod, json.dumps({"blad": komunikat}).encode("utf-8"))
+
+        def _zapytanie(self):
+            url = urlsplit(self.path)
+            return url.path.rstrip("/"), {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+        def _obsluz(self, funkcja):
+            # Każdy błąd kończy się odpowiedzią JSON - wątek obsługi nie ginie bez odpowiedzi
+            try:
+                funkcja()
+            except ValueError as e:
+                self._blad(400, str(e))
+            except FetchError as e:
+                self._blad(503, f"brak danych {e.symbol}: {e.komunikat}")
+            except Exception as e:
+                self._blad(500, f"{type(e).__name__}: {e}")
+
+        def do_GET(self):
+            self._obsluz(self._get)
+
+        def do_POST(self):
+            self._obsluz(self._post)
+
+        def _get(self):
+            sciezka, zapytanie = self._zapytanie()
+            if sciezka == "/metrics":
+                # Poza profilowaniem - odczyt metryk nie zmienia metryk
+                self._wyslij(200, serwis.metrics(zapytanie))
+                return
+            with profiling.interaction(f"GET {sciezka}"):
+                if sciezka == "/signals":
+                    tresc = serwis.signals(zapytanie)
+                elif sciezka == "/status":
+                    tresc = serwis.status()
+                elif sciezka == "/journal":
+                    tresc = serwis.journal(zapytanie)
+                else:
+                    self._blad(404, "nieznana sciezka")
+                    return
+            self._wyslij(200, tresc)
+
+        def _post(self):
+            sciezka, zapytanie = self._zapytanie()
+            if sciezka != "/refresh":
+                self._blad(404, "nieznana sciezka")
+                return
+            symbole = zapytanie["symbol"].split(",") if "symbol" in zapytanie else None
+            serwis.request_refresh(symbole)
+            self._wyslij(202, serwis.status())
+
+        def log_message(self, format, *args):
+            pass  # bez logu na każde zapytanie
+
+    return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serwis HTTP/JSON z sygnałami ZŁOTYCH PRZEPISÓW")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--kapital", type=float, default=10000.0)
+    parser.add_argument("--ryzyko", type=float, default=4.0, help="Ryzyko na transakcję (%%)")
+    parser.add_argument("--raz", action="store_true", help="Jedna migawka JSON na stdout, bez serwera")
+    args = parser.parse_args(argv)
+
+    serwis = SignalService(args.kapital, args.ryzyko / 100.0)
+    start = time.perf_counter()
+    serwis.refresh()
+    if args.raz:
+        print(serwis.migawka.decode("utf-8"))
+        return
+    print(f"{len(serwis.wiersze)} systemów odświeżonych w {time.perf_counter() - start:.1f} s")
+
+    serwis.start()
+    serwer = ThreadingHTTPServer((args.host, args.port), make_handler(serwis))
+    print(f"Serwis sygnałów: http://{args.host}:{args.port}/signals")
+    try:
+        serwer.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        serwis.close()
+        serwer.server_close()
+
+
+if __name__ == "__main__":
+    main()
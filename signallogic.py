@@ -0,0 +1,225 @@
+import numpy as np
+
+import indicators
+import profiling
+from stops import recent_extremes
+
+# ==================================================
+#  WSPÓLNA LOGIKA SYGNAŁÓW
+# ==================================================
+# Te same obliczenia używają strony Streamlit (signaltrend.py, signalmeanrev.py)
+# oraz skaner portfela (scanner.py), żeby wyniki nie mogły się rozjechać.
+
+# --------------------------------------------------
+# 1. WSKAŹNIKI (obliczenia w indicators.py)
+# --------------------------------------------------
+
+# memo (opcjonalnie) - obiekt z metodą memo(klucz, funkcja), np. cache wskaźników
+# przypięty do danych świec (barcache.py); klucz to (wskaźnik, okres).
+
+def _licz(klucz, funkcja):
+    return funkcja()
+
+
+def add_trend_indicators(df, in_p, out_p, ema_p, atr_p, memo=None):
+    high = df['high'].to_numpy(dtype=float)
+    low = df['low'].to_numpy(dtype=float)
+    close = df['close'].to_numpy(dtype=float)
+    licz = memo.memo if memo is not None else _licz
+
+    df['ema'] = licz(("ema", ema_p), lambda: indicators.ema(close, ema_p))
+    df['highest_in'], df['lowest_in'] = licz(("donchian", in_p), lambda: indicators.donchian(high, low, in_p))
+    df['highest_out'], df['lowest_out'] = licz(("donchian", out_p), lambda: indicators.donchian(high, low, out_p))
+    df['atr'] = licz(("atr_wilder", atr_p), lambda: indicators.atr_wilder(high, low, close, atr_p))
+    return df
+
+
+def add_meanrev_indicators(df, rsi_p, atr_p, memo=None):
+    high = df['high'].to_numpy(dtype=float)
+    low = df['low'].to_numpy(dtype=float)
+    close = df['close'].to_numpy(dtype=float)
+    licz = memo.memo if memo is not None else _licz
+
+    # RSI i ATR w wersji surowej (klasyczne SMA, bez wygładzania Wildera)
+    df['rsi'] = licz(("rsi_sma", rsi_p), lambda: indicators.rsi_sma(close, rsi_p))
+    df['atr'] = licz(("atr_sma", atr_p), lambda: indicators.atr_sma(high, low, close, atr_p))
+    return df
+
+
+_WIELOOKRESOWE = {
+    "ema": lambda h, l, c, p: indicators.ema(c, p),
+    "donchian": lambda h, l, c, p: zip(*indicators.donchian(h, l, p)),
+    "atr_wilder": indicators.atr_wilder,
+    "rsi_sma": lambda h, l, c, p: indicators.rsi_sma(c, p),
+    "atr_sma": indicators.atr_sma,
+}
+
+
+def precompute_indicators(df, wymagania, memo):
+    # wymagania - lista (wskaźnik, okres), np. przepisy.WYMAGANIA[symbol]; wszystkie
+    # brakujące w memo okresy jednego wskaźnika liczone jednym wywołaniem z listą okresów.
+    # Wpisy memo te same co z add_*_indicators (donchian jako para górna, dolna).
+    brakujace = {}
+    for wskaznik, okres in wymagania:
+        if memo.get((wskaznik, okres)) is None:
+            brakujace.setdefault(wskaznik, []).append(okres)
+    if memo.nazwa is not None:
+        profiling.count(f"{memo.nazwa}.chybienia", sum(map(len, brakujace.values())))
+    if not brakujace:
+        return
+    high = df['high'].to_numpy(dtype=float)
+    low = df['low'].to_numpy(dtype=float)
+    close = df['close'].to_numpy(dtype=float)
+    for wskaznik, okresy in brakujace.items():
+        for okres, wartosc in zip(okresy, _WIELOOKRESOWE[wskaznik](high, low, close, okresy)):
+            memo.put((wskaznik, okres), tuple(wartosc) if wskaznik == "donchian" else wartosc)
+
+# --------------------------------------------------
+# 2. WIELKOŚĆ POZYCJI
+# --------------------------------------------------
+
+def position_size(risk_per_point, kapital, ryzyko_proc):
+    cash_risk = kapital * ryzyko_proc
+    if risk_per_point > 0:
+        return cash_risk / risk_per_point, cash_risk
+    return 0, cash_risk
+
+# --------------------------------------------------
+# 3. REGUŁY NA JEDNEJ ŚWIECY
+# --------------------------------------------------
+# Wspólne dla sygnału na ostatniej świecy (evaluate_*) i backtestu (backtest.py).
+
+def trend_entry(close, ema, highest_in, lowest_in):
+    # Wybicie z kanału IN zgodne z filtrem EMA
+    if close > highest_in and close > ema:
+        return "LONG"
+    if close < lowest_in and close < ema:
+        return "SHORT"
+    return None
+
+
+def trend_exit(kierunek, close, lowest_out, highest_out):
+    # Wyjście z kanału OUT
+    if kierunek == "LONG":
+        return close < lowest_out
+    return close > highest_out
+
+
+def trailing_stop(kierunek, highest_recent, lowest_recent, atr, k_tsl):
+    if kierunek == "LONG":
+        return highest_recent - (k_tsl * atr)
+    return lowest_recent + (k_tsl * atr)
+
+
+def meanrev_entry(rsi, rsi_l_ent, rsi_s_ent):
+    if rsi < rsi_l_ent:
+        return "LONG"
+    if rsi > rsi_s_ent:
+        return "SHORT"
+    return None
+
+
+def meanrev_exit(kierunek, rsi, rsi_l_ex, rsi_s_ex):
+    if kierunek == "LONG":
+        return rsi > rsi_l_ex
+    return rsi < rsi_s_ex
+
+
+def initial_stop(kierunek, entry_price, atr, m_sl):
+    if kierunek == "LONG":
+        return entry_price - (m_sl * atr)
+    return entry_price + (m_sl * atr)
+
+
+def trade_plan(kierunek, entry_price, atr, m_sl, mult, kapital, ryzyko_proc):
+    # Stop M x ATR i wolumen dla zadanego ryzyka - (sl_price, wolumen, ryzykowana kwota)
+    sl_price = initial_stop(kierunek, entry_price, atr, m_sl)
+    if kierunek == "LONG":
+        risk_per_point = (entry_price - sl_price) * mult
+    else:
+        risk_per_point = (sl_price - entry_price) * mult
+    size, cash_risk = position_size(risk_per_point, kapital, ryzyko_proc)
+    return sl_price, size, cash_risk
+
+# --------------------------------------------------
+# 4. LOGIKA DECYZYJNA (ostatnia świeca)
+# --------------------------------------------------
+
+def evaluate_trend(df, in_p, m_sl, k_tsl, mult, kapital, ryzyko_proc):
+    last_bar = df.iloc[-1]
+
+    current_price = last_bar['close']
+    atr_value = last_bar['atr']
+    ema_value = last_bar['ema']
+    upper_band = last_bar['highest_in']
+    lower_band = last_bar['lowest_in']
+
+    trend_up = current_price > ema_value
+    trend_down = current_price < ema_value
+
+    sl_price = np.nan
+    size, cash_risk = 0, kapital * ryzyko_proc
+
+    # Logika LONG / SHORT
+    signal = trend_entry(current_price, ema_value, upper_band, lower_band)
+    if signal:
+        sl_price, size, cash_risk = trade_plan(signal, current_price, atr_value, m_sl, mult, kapital, ryzyko_proc)
+
+    # Zarządzanie otwartą pozycją (Trailing Stop i kanał OUT)
+    # (tylko ostatnia świeca - bez rolling po całej historii, stops.py)
+    highest_recent, lowest_recent = recent_extremes(df['high'].to_numpy(), df['low'].to_numpy(), in_p)
+
+    return {
+        'date': df.index[-1],
+        'current_price': current_price,
+        'atr_value': atr_value,
+        'ema_value': ema_value,
+        'upper_band': upper_band,
+        'lower_band': lower_band,
+        'trend_up': trend_up,
+        'trend_down': trend_down,
+        'signal': signal,
+        'entry_price': current_price,
+        'sl_price': sl_price,
+        'position_size': size,
+        'cash_risk': cash_risk,
+        'highest_recent': highest_recent,
+        'lowest_recent': lowest_recent,
+        'tsl_long': trailing_stop("LONG", highest_recent, lowest_recent, atr_value, k_tsl),
+        'tsl_short': trailing_stop("SHORT", highest_recent, lowest_recent, atr_value, k_tsl),
+        'lowest_out': last_bar['lowest_out'],
+        'highest_out': last_bar['highest_out'],
+        'exit_long': trend_exit("LONG", current_price, last_bar['lowest_out'], last_bar['highest_out']),
+        'exit_short': trend_exit("SHORT", current_price, last_bar['lowest_out'], last_bar['highest_out']),
+    }
+
+
+def evaluate_meanrev(df, m_sl, rsi_l_ent, rsi_l_ex, rsi_s_ent, rsi_s_ex, mult, kapital, ryzyko_proc):
+    last_bar = df.iloc[-1]
+    prev_bar = df.iloc[-2]
+
+    current_price = last_bar['close']
+    rsi_val = last_bar['rsi']
+    atr_val = last_bar['atr']
+
+    sl_price = np.nan
+    vol, risk_cash = 0, kapital * ryzyko_proc
+
+    signal = meanrev_entry(rsi_val, rsi_l_ent, rsi_s_ent)
+    if signal:
+        sl_price, vol, risk_cash = trade_plan(signal, current_price, atr_val, m_sl, mult, kapital, ryzyko_proc)
+
+    return {
+        'date': df.index[-1],
+        'current_price': current_price,
+        'rsi_val': rsi_val,
+        'rsi_prev': prev_bar['rsi'],
+        'atr_val': atr_val,
+        'signal': signal,
+        'entry_price': current_price,
+        'sl_price': sl_price,
+        'vol': vol,
+        'risk_cash': risk_cash,
+        'exit_long': meanrev_exit("LONG", rsi_val, rsi_l_ex, rsi_s_ex),
+        'exit_short': meanrev_exit("SHORT", rsi_val, rsi_l_ex, rsi_s_ex),
+    }
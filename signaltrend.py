@@ -1,278 +1,236 @@
-import streamlit as st
-import yfinance as yf
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-
-# === KONFIGURACJA STRONY ===
-st.set_page_config(page_title="Sygnały wybicia z kanału Donchiana", layout="wide")
-st.title("Generator wybić z kanału Donchiana ")
-st.write("Wybierz system. Parametry zostaną załadowane automatycznie.")
-
-# ==================================================
-#  Baza Danych "ZŁOTYCH PRZEPISÓW"
-# ==================================================
-# Format:
-# "Nazwa Wyświetlana": [SYMBOL, MULT, DŹWIGNIA, IN, OUT, EMA, M, K]
-# --------------------------------------------------
-
-ZŁOTE_PRZEPISY = {
-    # Domyślny pusty
-    "--- Wybierz system z portfela ---": 
-        ["", 0.0, 0.0, 0, 0, 0, 0.0, 0.0],
-    
-    # --- MISTRZOWIE KRYPTO ---
-    "Bitcoin": 
-        ["BTC-USD", 1.0, 2.0, 60, 30, 100, 5.0, 4.0],
-        
-    "Ethereum": 
-        ["ETH-USD", 1.0, 2.0, 60, 10, 50, 3.0, 4.5],
-        
-    "Solana": 
-        ["SOL-USD", 1.0, 2.0, 5, 20, 30, 4.5, 4.5],
-        
-    "Polkadot": 
-        ["DOT-USD", 1.0, 2.0, 5, 30, 30, 3.0, 4.0],
-
-    "Kusama": 
-        ["KSM-USD", 1.0, 2.0, 10, 30, 30, 4.5, 4.5],
-        
-    "Dogecoin": 
-        ["DOGE-USD", 1.0, 2.0, 5, 10, 100, 5.0, 5.0],
-        
-    "Gala":
-        ["GALA-USD", 1.0, 2.0, 10, 20, 50, 5.0, 5.0],
-
-    # --- MISTRZOWIE SUROWCÓW ---
-    "Bydło": 
-        ["LE=F", 400.0, 10.0, 40, 25, 30, 2.5, 5.0],
-        
-    # --- SYSTEMY ZAPASOWE / ZAWIESZONE ---
-    "Nasdaq 100": 
-        ["^NDX", 20.0, 20.0, 40, 50, 50, 4.5, 5.0],
-        
-    "Ropa WTI": 
-        ["CL=F", 1000.0, 10.0, 20, 10, 30, 2.5, 3.5]
-}
-ATR_PERIOD = 14 # Utrzymujemy stały ATR (nie optymalizowaliśmy go)
-
-# ==================================================
-# 1. PANEL BOCZNY - WYBÓR SYSTEMU I KAPITAŁU
-# ==================================================
+import time
 
-st.sidebar.header("1. Wybierz System")
-wybrany_system_nazwa = st.sidebar.selectbox(
-    "Wybierz system z portfela:", 
-    list(ZŁOTE_PRZEPISY.keys())
-)
-
-# Jeśli nic nie wybrano, zatrzymaj aplikację
-if wybrany_system_nazwa == "--- Wybierz system z portfela ---":
-    st.info("Wybierz system z panelu bocznego, aby sprawdzić sygnał.")
-    st.stop()
-
-# --- Automatyczne pobranie parametrów ---
-try:
-    przepis = ZŁOTE_PRZEPISY[wybrany_system_nazwa]
-    SYMBOL = przepis[0]
-    MULT = przepis[1]
-    LEVERAGE = przepis[2]
-    IN_PERIOD = przepis[3]
-    OUT_PERIOD = przepis[4]
-    EMA_PERIOD = przepis[5]
-    M_SL = przepis[6]
-    K_TSL = przepis[7]
-except Exception as e:
-    st.error(f"Wystąpił błąd przy ładowaniu przepisu: {e}")
-    st.stop()
-
-# --- Pozostałe ustawienia w panelu bocznym ---
-st.sidebar.header("2. Wprowadź kapitał")
-KAPITAL = st.sidebar.number_input("Twój kapitał (Wartość konta)", value=10000.0, step=100.0)
-RYZYKO_PROC = st.sidebar.number_input("Ryzyko na transakcję (%)", value=4.0, step=0.5) / 100.0
-
-# --- Wyświetlanie załadowanych parametrów ---
-st.sidebar.header("3. Aktywne parametry")
-st.sidebar.success(f"Załadowano: {wybrany_system_nazwa}")
-st.sidebar.markdown(f"""
-* **Symbol:** `{SYMBOL}`
-* **Mult:** `{MULT}`
-* **Dźwignia:** `{LEVERAGE}`
-* **IN:** `{IN_PERIOD}`, **OUT:** `{OUT_PERIOD}`, **EMA:** `{EMA_PERIOD}`
-* **M:** `{M_SL}`, **K:** `{K_TSL}`
-""")
+import streamlit as st
 
+from przepisy import ZŁOTE_PRZEPISY_TREND
+import barcache
+import charts
+import journal
+import kalendarz
+import profiling
+from barstore import INTERWALY
+from fetcher import FetchError
+from signallogic import evaluate_trend
 
 # ==================================================
-# 2. POBIERANIE I OBLICZANIE DANYCH (Bez zmian)
+#  Baza Danych "ZŁOTYCH PRZEPISÓW" (przepisy.py)
 # ==================================================
-@st.cache_data
-def get_data_and_indicators(symbol, in_p, out_p, ema_p, atr_p):
-    df = yf.download(symbol, period="2y", interval="1d", progress=False)
-    if df.empty:
-        return None
-    if isinstance(df.columns, pd.MultiIndex):
-        df.columns = [col[0].lower() for col in df.columns]
-    else:
-        df.columns = [col.lower() for col in df.columns]
-
-    df['ema'] = df['close'].ewm(span=ema_p, adjust=False).mean()
-    df['highest_in'] = df['high'].rolling(window=in_p).max().shift(1)
-    df['lowest_in'] = df['low'].rolling(window=in_p).min().shift(1)
-    df['lowest_out'] = df['low'].rolling(window=out_p).min().shift(1)
-    df['highest_out'] = df['high'].rolling(window=out_p).max().shift(1)
-    df['tr0'] = abs(df['high'] - df['low'])
-    df['tr1'] = abs(df['high'] - df['close'].shift())
-    df['tr2'] = abs(df['low'] - df['close'].shift())
-    df['tr'] = df[['tr0', 'tr1', 'tr2']].max(axis=1)
-    df['atr'] = df['tr'].ewm(alpha=1/atr_p, adjust=False).mean()
-    return df
-
-df = get_data_and_indicators(SYMBOL, IN_PERIOD, OUT_PERIOD, EMA_PERIOD, ATR_PERIOD)
-
-if df is None:
-    st.error(f"Nie udało się pobrać danych dla {SYMBOL}. Sprawdź symbol.")
-    st.stop()
-
-last_bar = df.iloc[-1]
-prev_bar = df.iloc[-2]
-last_date = df.index[-1].strftime('%Y-%m-%d')
+ZŁOTE_PRZEPISY = ZŁOTE_PRZEPISY_TREND
+BRAK_WYBORU = "--- Wybierz system z portfela ---"
 
 # ==================================================
-# 3. LOGIKA DECYZYJNA (Bez zmian)
-# ==================================================
-
-current_price = last_bar['close']
-atr_value = last_bar['atr']
-ema_value = last_bar['ema']
-upper_band = last_bar['highest_in']
-lower_band = last_bar['lowest_in']
-
-trend_up = current_price > ema_value
-trend_down = current_price < ema_value
-breakout_up = current_price > upper_band
-breakout_down = current_price < lower_band
-
+#  POBIERANIE I OBLICZANIE DANYCH (wspólny cache świec i wskaźników - barcache.py)
 # ==================================================
-# 4. WYŚWIETLANIE WYNIKÓW
-# ==================================================
-
-st.info(f"Analiza dla dnia: **{last_date}** (Cena zamknięcia: {current_price:.4f})")
-
-col1, col2, col3, col4 = st.columns(4)
-col1.metric("Aktualna cena", f"{current_price:.4f}")
-col2.metric("Wartość ATR", f"{atr_value:.4f}")
-col3.metric("Filtr trendu (EMA)", f"{ema_value:.4f}", delta="Wzrostowy" if trend_up else "Spadkowy")
-col4.metric(f"Szczyt/Dołek ({IN_PERIOD}-dni)", f"{upper_band:.2f} / {lower_band:.2f}")
-
-st.divider()
-
-st.header("Sygnały wejścia")
-
-signal_found = False
-
-# Logika LONG
-if breakout_up and trend_up:
-    st.success(f"**SYGNAŁ KUPNA (LONG)!** Cena przebiła szczyt {IN_PERIOD}-dniowy i jest nad EMA.")
-    signal_found = True
-    entry_price = current_price
-    sl_price = entry_price - (M_SL * atr_value)
-    risk_per_point = (entry_price - sl_price) * MULT
-    
-    cash_risk = KAPITAL * RYZYKO_PROC
-    if risk_per_point > 0:
-        position_size = cash_risk / risk_per_point
-    else:
-        position_size = 0
-    
-    st.markdown(f"""
-    ### Plan Transakcji:
-    * **Kierunek:** KUPNO (Long)
-    * **Cena wejścia:** {entry_price:.4f} (Cena Market)
-    * **Stop Loss:** {sl_price:.4f} (Odległość: {M_SL} x ATR)
-    * **Sugerowany wolumen:** **{position_size:.4f} lota**
-    * *Ryzykowana kwota:* {cash_risk:.2f} (ok. {RYZYKO_PROC*100:.1f}%)
+def get_data_and_indicators(symbol, in_p, out_p, ema_p, atr_p, interval="1d"):
+    # Dla interwałów intraday okres przycinany do dostępnej historii (barstore.limit_period)
+    return barcache.trend_frame(symbol, in_p, out_p, ema_p, atr_p, period="2y", interval=interval)
+
+
+def render():
+    st.title("Generator wybić z kanału Donchiana ")
+    st.write("Wybierz system. Parametry zostaną załadowane automatycznie.")
+
+    # ==================================================
+    # 1. PANEL BOCZNY - WYBÓR SYSTEMU I KAPITAŁU
+    # ==================================================
+
+    st.sidebar.header("1. Wybierz System")
+    wybrany_system_nazwa = st.sidebar.selectbox(
+        "Wybierz system z portfela:", 
+        [BRAK_WYBORU] + list(ZŁOTE_PRZEPISY.keys())
+    )
+
+    # Jeśli nic nie wybrano, zatrzymaj aplikację
+    if wybrany_system_nazwa == BRAK_WYBORU:
+        st.info("Wybierz system z panelu bocznego, aby sprawdzić sygnał.")
+        return
+
+    # --- Automatyczne pobranie parametrów ---
+    try:
+        przepis = ZŁOTE_PRZEPISY[wybrany_system_nazwa]
+        SYMBOL = przepis.symbol
+        MULT = przepis.mult
+        LEVERAGE = przepis.dzwignia
+        IN_PERIOD = przepis.in_p
+        OUT_PERIOD = przepis.out_p
+        EMA_PERIOD = przepis.ema_p
+        ATR_PERIOD = przepis.atr_p
+        M_SL = przepis.m_sl
+        K_TSL = przepis.k_tsl
+    except Exception as e:
+        st.error(f"Wystąpił błąd przy ładowaniu przepisu: {e}")
+        return
+
+    INTERWAL = st.sidebar.selectbox("Interwał świec", INTERWALY)
+    # Okresy IN / OUT / EMA liczone są w świecach wybranego interwału
+    SWIECE = "dni" if INTERWAL == "1d" else f"świec {INTERWAL}"
+
+    # --- Pozostałe ustawienia w panelu bocznym ---
+    st.sidebar.header("2. Wprowadź kapitał")
+    KAPITAL = st.sidebar.number_input("Twój kapitał (Wartość konta)", value=10000.0, step=100.0)
+    RYZYKO_PROC = st.sidebar.number_input("Ryzyko na transakcję (%)", value=4.0, step=0.5) / 100.0
+
+    # --- Wyświetlanie załadowanych parametrów ---
+    st.sidebar.header("3. Aktywne parametry")
+    st.sidebar.success(f"Załadowano: {wybrany_system_nazwa}")
+    st.sidebar.markdown(f"""
+    * **Symbol:** `{SYMBOL}` (`{INTERWAL}`)
+    * **Mult:** `{MULT}`
+    * **Dźwignia:** `{LEVERAGE}`
+    * **IN:** `{IN_PERIOD}`, **OUT:** `{OUT_PERIOD}`, **EMA:** `{EMA_PERIOD}`
+    * **M:** `{M_SL}`, **K:** `{K_TSL}`
     """)
 
-# Logika SHORT
-elif breakout_down and trend_down:
-    st.error(f"**SYGNAŁ SPRZEDAŻY (SHORT)!** Cena przebiła dołek {IN_PERIOD}-dniowy i jest pod EMA.")
-    signal_found = True
-    entry_price = current_price
-    sl_price = entry_price + (M_SL * atr_value)
-    risk_per_point = (sl_price - entry_price) * MULT
-    
-    cash_risk = KAPITAL * RYZYKO_PROC
-    if risk_per_point > 0:
-        position_size = cash_risk / risk_per_point
-    else:
-        position_size = 0
-        
-    st.markdown(f"""
-    ### Plan Transakcji:
-    * **Kierunek:** SPRZEDAŻ (Short)
-    * **Cena wejścia:** {entry_price:.4f} (Cena Market)
-    * **Stop Loss:** {sl_price:.4f} (Odległość: {M_SL} x ATR)
-    * **Sugerowany wolumen:** **{position_size:.4f} lota**
-    * *Ryzykowana kwota:* {cash_risk:.2f} (ok. {RYZYKO_PROC*100:.1f}%)
-    """)
 
-else:
-    st.warning("**BRAK NOWYCH SYGNAŁÓW WEJŚCIA.** Czekaj cierpliwie.")
-    if trend_up:
-        dist = (upper_band - current_price)
-        st.caption(f"Jesteśmy w trendzie wzrostowym, ale brakuje wybicia. Do szczytu brakuje: {dist:.4f}")
-    elif trend_down:
-        dist = (current_price - lower_band)
-        st.caption(f"Jesteśmy w trendzie spadkowym, ale brakuje wybicia. Do dołka brakuje: {dist:.4f}")
+    # ==================================================
+    # 2. POBIERANIE I OBLICZANIE DANYCH (Bez zmian)
+    # ==================================================
+    start = time.perf_counter()
+    try:
+        df = get_data_and_indicators(SYMBOL, IN_PERIOD, OUT_PERIOD, EMA_PERIOD, ATR_PERIOD, INTERWAL)
+    except FetchError as e:
+        st.error(f"Nie udało się pobrać danych dla {SYMBOL}: {e.komunikat} (prób: {e.proby})")
+        return
+    # Nowy rynek albo krótkie okno intraday - jak w skanerze, poniżej 2 świec brak sygnału
+    if len(df) < 2:
+        st.warning(f"Za mało danych dla {SYMBOL} ({INTERWAL}): {len(df)} świec.")
+        return
+
+    # Świece po kontroli jakości (validation.py) - informacja, co poprawiono lub brakuje
+    raport = barcache.get_report(SYMBOL, "2y", INTERWAL)
+    if raport is not None and not raport.ok:
+        st.caption(f"Kontrola danych {SYMBOL}: {raport.opis()}")
+
+    last_date = df.index[-1].strftime('%Y-%m-%d' if INTERWAL == "1d" else '%Y-%m-%d %H:%M')
+
+    # ==================================================
+    # 3. LOGIKA DECYZYJNA (signallogic.py)
+    # ==================================================
+
+    with profiling.stage("logika"):
+        wynik = evaluate_trend(df, IN_PERIOD, M_SL, K_TSL, MULT, KAPITAL, RYZYKO_PROC)
+
+    # Sygnał wejścia do dziennika (journal.py) - raz na świecę, kolejne odświeżenia nic nie dopisują.
+    # Tylko ostatnia zamknięta świeca: sygnał tworzącej się świecy może jeszcze zniknąć
+    zamkniete = kalendarz.closed_bars(df, SYMBOL, INTERWAL)
+    if len(zamkniete) == len(df) or len(zamkniete) >= 2:
+        do_dziennika = wynik if len(zamkniete) == len(df) else \
+            evaluate_trend(zamkniete, IN_PERIOD, M_SL, K_TSL, MULT, KAPITAL, RYZYKO_PROC)
+        journal.record([{"Strategia": "Trend", "System": wybrany_system_nazwa, "Symbol": SYMBOL,
+                         "Data": do_dziennika['date'], "Sygnał": do_dziennika['signal'],
+                         "Cena": do_dziennika['entry_price'], "Stop Loss": do_dziennika['sl_price'],
+                         "Wolumen": do_dziennika['position_size'], "Ryzyko": do_dziennika['cash_risk']}],
+                       INTERWAL, "strona", czas_ms=(time.perf_counter() - start) * 1000)
+
+    current_price = wynik['current_price']
+    atr_value = wynik['atr_value']
+    ema_value = wynik['ema_value']
+    upper_band = wynik['upper_band']
+    lower_band = wynik['lower_band']
+
+    trend_up = wynik['trend_up']
+    trend_down = wynik['trend_down']
+
+    # ==================================================
+    # 4. WYŚWIETLANIE WYNIKÓW
+    # ==================================================
+
+    st.info(f"Analiza dla dnia: **{last_date}** (Cena zamknięcia: {current_price:.4f})")
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Aktualna cena", f"{current_price:.4f}")
+    col2.metric("Wartość ATR", f"{atr_value:.4f}")
+    col3.metric("Filtr trendu (EMA)", f"{ema_value:.4f}", delta="Wzrostowy" if trend_up else "Spadkowy")
+    col4.metric(f"Szczyt/Dołek ({IN_PERIOD} {SWIECE})", f"{upper_band:.2f} / {lower_band:.2f}")
+
+    st.divider()
+
+    st.header("Sygnały wejścia")
+
+    # Logika LONG
+    if wynik['signal'] == "LONG":
+        st.success(f"**SYGNAŁ KUPNA (LONG)!** Cena przebiła szczyt z {IN_PERIOD} {SWIECE} i jest nad EMA.")
+        entry_price = wynik['entry_price']
+        sl_price = wynik['sl_price']
+        position_size = wynik['position_size']
+        cash_risk = wynik['cash_risk']
+
+        st.markdown(f"""
+        ### Plan Transakcji:
+        * **Kierunek:** KUPNO (Long)
+        * **Cena wejścia:** {entry_price:.4f} (Cena Market)
+        * **Stop Loss:** {sl_price:.4f} (Odległość: {M_SL} x ATR)
+        * **Sugerowany wolumen:** **{position_size:.4f} lota**
+        * *Ryzykowana kwota:* {cash_risk:.2f} (ok. {RYZYKO_PROC*100:.1f}%)
+        """)
+
+    # Logika SHORT
+    elif wynik['signal'] == "SHORT":
+        st.error(f"**SYGNAŁ SPRZEDAŻY (SHORT)!** Cena przebiła dołek z {IN_PERIOD} {SWIECE} i jest pod EMA.")
+        entry_price = wynik['entry_price']
+        sl_price = wynik['sl_price']
+        position_size = wynik['position_size']
+        cash_risk = wynik['cash_risk']
+
+        st.markdown(f"""
+        ### Plan Transakcji:
+        * **Kierunek:** SPRZEDAŻ (Short)
+        * **Cena wejścia:** {entry_price:.4f} (Cena Market)
+        * **Stop Loss:** {sl_price:.4f} (Odległość: {M_SL} x ATR)
+        * **Sugerowany wolumen:** **{position_size:.4f} lota**
+        * *Ryzykowana kwota:* {cash_risk:.2f} (ok. {RYZYKO_PROC*100:.1f}%)
+        """)
 
-st.divider()
+    else:
+        st.warning("**BRAK NOWYCH SYGNAŁÓW WEJŚCIA.** Czekaj cierpliwie.")
+        if trend_up:
+            dist = (upper_band - current_price)
+            st.caption(f"Jesteśmy w trendzie wzrostowym, ale brakuje wybicia. Do szczytu brakuje: {dist:.4f}")
+        elif trend_down:
+            dist = (current_price - lower_band)
+            st.caption(f"Jesteśmy w trendzie spadkowym, ale brakuje wybicia. Do dołka brakuje: {dist:.4f}")
 
-# --- SEKCJA C: ZARZĄDZANIE OTWARTĄ POZYCJĄ (Trailing Stop) ---
-st.header("Zarządzanie otwartą pozycją")
-st.write("Jeśli **JUŻ MASZ** otwartą pozycję, oto gdzie powinien znajdować się Twój Stop Loss na dziś:")
+    st.divider()
 
-highest_recent = df['high'].rolling(window=IN_PERIOD).max().iloc[-1]
-lowest_recent = df['low'].rolling(window=IN_PERIOD).min().iloc[-1]
+    # --- SEKCJA C: ZARZĄDZANIE OTWARTĄ POZYCJĄ (Trailing Stop) ---
+    st.header("Zarządzanie otwartą pozycją")
+    st.write("Jeśli **JUŻ MASZ** otwartą pozycję, oto gdzie powinien znajdować się Twój Stop Loss na dziś:")
 
-tsl_long = highest_recent - (K_TSL * atr_value)
-tsl_short = lowest_recent + (K_TSL * atr_value)
+    highest_recent = wynik['highest_recent']
+    lowest_recent = wynik['lowest_recent']
 
-col_sl1, col_sl2 = st.columns(2)
+    tsl_long = wynik['tsl_long']
+    tsl_short = wynik['tsl_short']
 
-with col_sl1:
-    st.markdown("### Dla pozycji długiej (Long)")
-    st.markdown(f"Teoretyczny trailing SL powinien być na: **{tsl_long:.4f}**")
-    st.caption(f"(Najwyższy szczyt {highest_recent:.4f} - {K_TSL}xATR)")
-    
-    if current_price < df.iloc[-1]['lowest_out']:
-        st.error(f"**SYGNAŁ WYJŚCIA (Kanał OUT)!** Cena spadła poniżej minimum z {OUT_PERIOD} dni ({df.iloc[-1]['lowest_out']:.4f}). Zamknij Longa.")
+    col_sl1, col_sl2 = st.columns(2)
 
-with col_sl2:
-    st.markdown("### Dla pozycji krótkiej (Short)")
-    st.markdown(f"Teoretyczny trailing SL powinien być na: **{tsl_short:.4f}**")
-    st.caption(f"(Najniższy dołek {lowest_recent:.4f} + {K_TSL}xATR)")
+    with col_sl1:
+        st.markdown("### Dla pozycji długiej (Long)")
+        st.markdown(f"Teoretyczny trailing SL powinien być na: **{tsl_long:.4f}**")
+        st.caption(f"(Najwyższy szczyt {highest_recent:.4f} - {K_TSL}xATR)")
 
-    if current_price > df.iloc[-1]['highest_out']:
-        st.error(f"**SYGNAŁ WYJŚCIA (Kanał OUT)!** Cena wzrosła powyżej maksimum z {OUT_PERIOD} dni ({df.iloc[-1]['highest_out']:.4f}). Zamknij Shorta.")
+        if wynik['exit_long']:
+            st.error(f"**SYGNAŁ WYJŚCIA (Kanał OUT)!** Cena spadła poniżej minimum z {OUT_PERIOD} {SWIECE} ({wynik['lowest_out']:.4f}). Zamknij Longa.")
 
-# ==================================================
-# 5. WYKRES (Bez zmian)
-# ==================================================
-st.divider()
-st.subheader("Wizualizacja Rynku (Ostatnie 100 dni)")
+    with col_sl2:
+        st.markdown("### Dla pozycji krótkiej (Short)")
+        st.markdown(f"Teoretyczny trailing SL powinien być na: **{tsl_short:.4f}**")
+        st.caption(f"(Najniższy dołek {lowest_recent:.4f} + {K_TSL}xATR)")
 
-df_plot = df.tail(100)
-fig, ax = plt.subplots(figsize=(12, 6))
+        if wynik['exit_short']:
+            st.error(f"**SYGNAŁ WYJŚCIA (Kanał OUT)!** Cena wzrosła powyżej maksimum z {OUT_PERIOD} {SWIECE} ({wynik['highest_out']:.4f}). Zamknij Shorta.")
 
-ax.plot(df_plot.index, df_plot['close'], label='Cena', color='black', linewidth=1.5)
-ax.plot(df_plot.index, df_plot['ema'], label=f'EMA ({EMA_PERIOD})', color='blue', linestyle='--', alpha=0.7)
-ax.plot(df_plot.index, df_plot['highest_in'], label=f'Max ({IN_PERIOD})', color='green', alpha=0.5)
-ax.plot(df_plot.index, df_plot['lowest_in'], label=f'Min ({IN_PERIOD})', color='red', alpha=0.5)
+    # ==================================================
+    # 5. WYKRES (Bez zmian)
+    # ==================================================
+    st.divider()
+    st.subheader(f"Wizualizacja Rynku (Ostatnie {charts.PUNKTY} {SWIECE})")
 
-ax.set_title(f"{SYMBOL} - Analiza Techniczna")
-ax.legend()
-ax.grid(True, alpha=0.3)
+    with profiling.stage("wykres"):
+        st.vega_lite_chart(charts.trend_chart(df, SYMBOL, IN_PERIOD, EMA_PERIOD), use_container_width=True)
 
 
-st.pyplot(fig)
+if __name__ == "__main__":
+    # === KONFIGURACJA STRONY ===
+    st.set_page_config(page_title="Sygnały wybicia z kanału Donchiana", layout="wide")
+    render()
@@ -0,0 +1,280 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import indicators
+
+# ==================================================
+#  KERNELE STOPÓW I WYJŚĆ (cała historia, wiele symboli naraz)
+# ==================================================
+# Trailing stop K x ATR zależy od ścieżki (zaciskany tylko w stronę zysku, od wejścia
+# do wyjścia), więc nie da się go zapisać jednym wyrażeniem pandas. Tutaj:
+#
+# * recent_extremes - szczyt/dołek ostatnich IN świec (tylko ostatnia świeca, O(IN));
+# * ratchet         - stop obowiązujący na każdej świecy po wejściu (jedna pozycja);
+# * trend_paths     - cały automat pozycji systemu trendowego na historii:
+#                     stop początkowy M x ATR, trailing stop, wyjście z kanału OUT,
+#                     nowe wejścia - kolumny to niezależne systemy / symbole.
+#
+# Reguły i kolejność na świecy jak w backtest.py i optimizer.py: stop (po open,
+# jeśli luka) -> wyjście OUT na zamknięciu -> zaciśnięcie trailing stopu -> wejście
+# (nie na świecy wyjścia, wymagany ATR > 0).
+#
+# trend_paths ma dwa wykonania z tym samym wynikiem:
+#   "numba" - pętla po świecach i kolumnach skompilowana JIT (gdy numba jest zainstalowana),
+#   "numpy" - pętla po świecach, operacje NumPy na wektorze kolumn.
+# Domyślnie numba, jeśli jest; SIGNALS_JIT=0 wymusza NumPy.
+#
+# Uruchomienie:
+#   python stops.py                 (aktualna pozycja i stop każdego systemu trendowego)
+#   python stops.py --interwal 4h --historia 720d
+
+WYJSCIE_STOP = 1   # stop początkowy albo trailing stop
+WYJSCIE_OUT = 2    # zamknięcie poza kanałem OUT
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+BACKEND = "numba" if numba is not None and os.environ.get("SIGNALS_JIT", "1") != "0" else "numpy"
+
+# --------------------------------------------------
+# 1. OSTATNIA ŚWIECA I JEDNA POZYCJA
+# --------------------------------------------------
+
+def recent_extremes(high, low, n):
+    # (max high, min low) z ostatnich n świec łącznie z bieżącą - ostatnia wartość
+    # rolling(n).max() / min() bez liczenia okna dla całej historii (NaN, gdy świec < n)
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    if n < 1 or len(high) < n:
+        return np.nan, np.nan
+    return float(high[-n:].max()), float(low[-n:].min())
+
+
+def ratchet(stop0, tsl, kierunek):
+    # Stop obowiązujący na kolejnych świecach pozycji: na pierwszej stop0, potem zaciśnięty
+    # do najlepszego tsl z poprzednich świec (LONG - w górę, SHORT - w dół; NaN pomijane)
+    tsl = np.asarray(tsl, dtype=float)
+    akumuluj = np.fmax if kierunek in ("LONG", 1) else np.fmin
+    return akumuluj(stop0, np.concatenate([[stop0], akumuluj.accumulate(tsl)[:-1]]))
+
+# --------------------------------------------------
+# 2. AUTOMAT POZYCJI SYSTEMU TRENDOWEGO
+# --------------------------------------------------
+# Wejścia: tablice (świece x kolumny); m_sl, k_tsl - wektory (kolumny).
+# Wynik: słownik tablic (świece x kolumny), stan po zamknięciu świecy:
+#   pozycja      1 / -1 / 0
+#   stop         stop obowiązujący na następnej świecy (NaN bez pozycji)
+#   wejscie      cena wejścia otwartej pozycji
+#   wyjscie      WYJSCIE_STOP / WYJSCIE_OUT na świecy wyjścia, inaczej 0
+#   cena_wyjscia cena wyjścia na świecy wyjścia
+
+POLA = ("open", "high", "low", "close", "atr", "ema", "hi_in", "lo_in", "hi_out", "lo_out", "hi_now", "lo_now")
+
+
+def _trend_loop(open_, high, low, close, atr, ema, hi_in, lo_in, hi_out, lo_out, hi_now, lo_now,
+                m_sl, k_tsl, pozycja, stop, wejscie, wyjscie, cena_wyjscia):
+    # Pojedyncze wartości - wersja do kompilacji JIT (i wzorzec dla _trend_numpy)
+    n, s = close.shape
+    for j in range(s):
+        poz = 0
+        st = np.nan
+        we = np.nan
+        for t in range(n):
+            kod = 0
+            if poz != 0:
+                if poz == 1 and low[t, j] <= st:
+                    kod = WYJSCIE_STOP
+                    cena_wyjscia[t, j] = min(open_[t, j], st)
+                elif poz == -1 and high[t, j] >= st:
+                    kod = WYJSCIE_STOP
+                    cena_wyjscia[t, j] = max(open_[t, j], st)
+                elif (poz == 1 and close[t, j] < lo_out[t, j]) or (poz == -1 and close[t, j] > hi_out[t, j]):
+                    kod = WYJSCIE_OUT
+                    cena_wyjscia[t, j] = close[t, j]
+                if kod != 0:
+                    poz = 0
+                    wyjscie[t, j] = kod
+                elif poz == 1:
+                    tsl = hi_now[t, j] - k_tsl[j] * atr[t, j]
+                    if tsl > st:
+                        st = tsl
+                else:
+                    tsl = lo_now[t, j] + k_tsl[j] * atr[t, j]
+                    if tsl < st:
+                        st = tsl
+            elif atr[t, j] > 0:
+                c = close[t, j]
+                if c > hi_in[t, j] and c > ema[t, j]:
+                    poz = 1
+                    we = c
+                    st = c - m_sl[j] * atr[t, j]
+                elif c < lo_in[t, j] and c < ema[t, j]:
+                    poz = -1
+                    we = c
+                    st = c + m_sl[j] * atr[t, j]
+            pozycja[t, j] = poz
+            stop[t, j] = st if poz != 0 else np.nan
+            wejscie[t, j] = we if poz != 0 else np.nan
+
+
+def _trend_numpy(open_, high, low, close, atr, ema, hi_in, lo_in, hi_out, lo_out, hi_now, lo_now,
+                 m_sl, k_tsl, pozycja, stop, wejscie, wyjscie, cena_wyjscia):
+    # Te same reguły co _trend_loop, ale pętla po transakcjach, nie po świecach: sygnały wejścia
+    # liczone raz dla całej historii, a każda pozycja (ratchet stopu i pierwsze wyjście) jednym
+    # przebiegiem NumPy od świecy wejścia - jak journal.outcome
+    n, s = close.shape
+    with np.errstate(invalid="ignore"):
+        for j in range(s):
+            c, a = close[:, j], atr[:, j]
+            long_sig = (a > 0) & (c > hi_in[:, j]) & (c > ema[:, j])
+            short_sig = ~long_sig & (a > 0) & (c < lo_in[:, j]) & (c < ema[:, j])
+            sygnaly = np.flatnonzero(long_sig | short_sig)
+            t = 0
+            while True:
+                i = np.searchsorted(sygnaly, t)
+                if i == len(sygnaly):
+                    break
+                e = sygnaly[i]
+                if long_sig[e]:
+                    d, akumuluj, stop0 = 1, np.fmax, c[e] - m_sl[j] * a[e]
+                    tsl = hi_now[e + 1:, j] - k_tsl[j] * a[e + 1:]
+                else:
+                    d, akumuluj, stop0 = -1, np.fmin, c[e] + m_sl[j] * a[e]
+                    tsl = lo_now[e + 1:, j] + k_tsl[j] * a[e + 1:]
+                # Stop po zamknięciu świec e, e+1, ... (zaciśnięty tsl tych świec) i stop na świecach e+1, ...
+                po_swiecy = akumuluj(stop0, np.concatenate([[stop0], akumuluj.accumulate(tsl)]))
+                obowiazuje = po_swiecy[:-1]
+                if d == 1:
+                    trafiony = low[e + 1:, j] <= obowiazuje
+                    out = c[e + 1:] < lo_out[e + 1:, j]
+                else:
+                    trafiony = high[e + 1:, j] >= obowiazuje
+                    out = c[e + 1:] > hi_out[e + 1:, j]
+                koniec = np.flatnonzero(trafiony | out)
+                x = e + 1 + koniec[0] if len(koniec) else n
+                pozycja[e:x, j] = d
+                stop[e:x, j] = po_swiecy[:x - e]
+                wejscie[e:x, j] = c[e]
+                if x == n:
+                    break
+                k = x - e - 1
+                if trafiony[k]:
+                    wyjscie[x, j] = WYJSCIE_STOP
+                    cena_wyjscia[x, j] = min(open_[x, j], obowiazuje[k]) if d == 1 else max(open_[x, j], obowiazuje[k])
+                else:
+                    wyjscie[x, j] = WYJSCIE_OUT
+                    cena_wyjscia[x, j] = c[x]
+                t = x + 1  # bez wejścia na świecy wyjścia
+
+
+_trend_jit = numba.njit(cache=True, nogil=True)(_trend_loop) if numba is not None else None
+
+
+def trend_paths(tablice, m_sl, k_tsl, backend=None):
+    # tablice - słownik POLA -> (świece x kolumny) albo 1-D (jedna kolumna)
+    backend = backend or BACKEND
+    jedna = np.ndim(tablice["close"]) == 1
+    wejscia = [np.ascontiguousarray(np.asarray(tablice[p], dtype=float).reshape(len(tablice["close"]), -1))
+               for p in POLA]
+    n, s = wejscia[0].shape
+    m_sl = np.broadcast_to(np.asarray(m_sl, dtype=float), (s,)).copy()
+    k_tsl = np.broadcast_to(np.asarray(k_tsl, dtype=float), (s,)).copy()
+    wynik = {
+        "pozycja": np.zeros((n, s), dtype=np.int8),
+        "stop": np.full((n, s), np.nan),
+        "wejscie": np.full((n, s), np.nan),
+        "wyjscie": np.zeros((n, s), dtype=np.int8),
+        "cena_wyjscia": np.full((n, s), np.nan),
+    }
+    if backend == "numba":
+        if _trend_jit is None:
+            raise ValueError("Backend numba niedostępny - brak pakietu numba")
+        kernel = _trend_jit
+    elif backend == "numpy":
+        kernel = _trend_numpy
+    elif backend == "python":
+        kernel = _trend_loop  # wzorzec do porównań (wolny)
+    else:
+        raise ValueError(f"Nieznany backend: {backend}")
+    kernel(*wejscia, m_sl, k_tsl, *wynik.values())
+    return {k: v[:, 0] for k, v in wynik.items()} if jedna else wynik
+
+# --------------------------------------------------
+# 3. PORTFEL - WSZYSTKIE SYSTEMY TRENDOWE
+# --------------------------------------------------
+
+def trend_arrays(df, przepis):
+    # df z signallogic.add_trend_indicators (np. barcache.trend_frame) -> słownik POLA
+    high = df["high"].to_numpy(dtype=float)
+    low = df["low"].to_numpy(dtype=float)
+    return {
+        "open": df["open"].to_numpy(dtype=float), "high": high, "low": low,
+        "close": df["close"].to_numpy(dtype=float), "atr": df["atr"].to_numpy(dtype=float),
+        "ema": df["ema"].to_numpy(dtype=float),
+        "hi_in": df["highest_in"].to_numpy(dtype=float), "lo_in": df["lowest_in"].to_numpy(dtype=float),
+        "hi_out": df["highest_out"].to_numpy(dtype=float), "lo_out": df["lowest_out"].to_numpy(dtype=float),
+        # Szczyt/dołek z IN świec łącznie z bieżącą (podstawa trailing stopu)
+        "hi_now": indicators.rolling_max(high, przepis.in_p), "lo_now": indicators.rolling_min(low, przepis.in_p),
+    }
+
+
+def portfolio_paths(ramki, przepisy, backend=None):
+    # ramki - {nazwa: df ze wskaźnikami}, przepisy - {nazwa: TrendRecipe}
+    # Wszystkie systemy jednym wywołaniem kernela: panel wyrównany do ostatniej świecy
+    # (krótsze historie dopełnione z przodu NaN - bez sygnałów). -> {nazwa: DataFrame}
+    nazwy = [n for n in przepisy if ramki.get(n) is not None and len(ramki[n])]
+    if not nazwy:
+        return {}
+    dl = max(len(ramki[n]) for n in nazwy)
+    panel = {p: np.full((dl, len(nazwy)), np.nan) for p in POLA}
+    for j, n in enumerate(nazwy):
+        for p, x in trend_arrays(ramki[n], przepisy[n]).items():
+            panel[p][dl - len(x):, j] = x
+    wynik = trend_paths(panel, [przepisy[n].m_sl for n in nazwy], [przepisy[n].k_tsl for n in nazwy], backend)
+    return {n: pd.DataFrame({k: v[dl - len(ramki[n]):, j] for k, v in wynik.items()}, index=ramki[n].index)
+            for j, n in enumerate(nazwy)}
+
+
+def main(argv=None):
+    import barcache
+    from przepisy import ZŁOTE_PRZEPISY_TREND
+
+    parser = argparse.ArgumentParser(description="Pozycja i stop systemów trendowych z symulacji całej historii")
+    parser.add_argument("--interwal", default="1d", help="Interwał świec, np. 1d, 4h, 1h")
+    parser.add_argument("--historia", default="2y", help="Historia do symulacji")
+    parser.add_argument("--backend", choices=["numba", "numpy"], default=BACKEND)
+    args = parser.parse_args(argv)
+
+    przepisy = ZŁOTE_PRZEPISY_TREND
+    bledy = {}
+    # Błąd dociągnięcia ogona nie wyklucza symbolu - barstore oddaje wtedy zapisaną historię;
+    # pomijane są tylko symbole bez świec
+    swiece = barcache.get_bars_many([p.symbol for p in przepisy.values()], args.historia, args.interwal, bledy)
+    ramki = {n: barcache.trend_frame(p.symbol, p.in_p, p.out_p, p.ema_p, p.atr_p, args.historia, args.interwal)
+             for n, p in przepisy.items() if swiece.get(p.symbol) is not None}
+    for s, e in bledy.items():
+        print(f"{s}: {e.komunikat}" + (" (zapisana historia)" if swiece.get(s) is not None else " - pominięty"))
+    portfolio_paths(ramki, przepisy, args.backend)  # rozgrzewka (kompilacja JIT)
+    start = time.perf_counter()
+    sciezki = portfolio_paths(ramki, przepisy, args.backend)
+    czas = (time.perf_counter() - start) * 1000
+
+    wiersze = []
+    for n, df in sciezki.items():
+        ost = df.iloc[-1]
+        wiersze.append({"System": n, "Symbol": przepisy[n].symbol, "Pozycja": {1: "LONG", -1: "SHORT"}.get(
+            int(ost["pozycja"]), ""), "Wejście": ost["wejscie"], "Stop": ost["stop"],
+            "Transakcje": int((df["wyjscie"] > 0).sum())})
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(pd.DataFrame(wiersze).to_string(index=False))
+    print(f"\n{len(sciezki)} systemów, {max(map(len, sciezki.values()), default=0)} świec: {czas:.1f} ms ({args.backend})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+import argparse
+import math
+import time
+from collections import deque
+
+import pandas as pd
+
+from barstore import get_bars_many, merge, resample, RESAMPLE
+from fetcher import default_fetcher
+from przepisy import ZŁOTE_PRZEPISY_TREND, ZŁOTE_PRZEPISY_MEANREV, ATR_PERIOD, SYMBOLE
+from signallogic import trend_entry, trend_exit, meanrev_entry, meanrev_exit
+from validation import validate
+
+# ==================================================
+#  WSKAŹNIKI STRUMIENIOWE (stały koszt na świecę)
+# ==================================================
+# Te same wskaźniki co w indicators.py, ale liczone przyrostowo: stan budowany
+# raz z historii, potem każda nowa świeca kosztuje O(1) zamiast przeliczania
+# całych 2 lat. Wyniki zgodne z indicators.py (do błędu zaokrągleń sum).
+#
+# update(x, nowa=True) - nowa świeca; poprzednia zostaje zatwierdzona.
+# update(x, nowa=False) - poprawka bieżącej (jeszcze tworzącej się) świecy:
+# stan z zatwierdzonych świec się nie zmienia, przeliczana jest tylko wartość bieżąca.
+#
+# Monitor portfela (odpytywanie świec intraday bez przeliczania historii):
+#   python streaming.py --interwal 1h --historia 60d --co 300
+# Odpytane świece przechodzą tę samą kontrolę jakości co na stronach (validation.py) -
+# razem z ogonem historii (KONTEKST), bo skok kursu rozpoznaje się dopiero po następnej
+# świecy. Gdy kontrola usunie bieżącą świecę stanu, stan budowany jest od nowa z historii.
+
+NAN = float("nan")
+KONTEKST = 200  # świece historii walidowane razem z nowymi (mediany, skoki)
+
+# --------------------------------------------------
+# 1. WSKAŹNIKI
+# --------------------------------------------------
+
+class StreamEMA:
+    # ewm(alpha, adjust=False) - jak indicators.ewma
+    __slots__ = ("alpha", "prev", "value")
+
+    def __init__(self, alpha):
+        self.alpha = alpha
+        self.prev = None   # wartość na ostatniej zatwierdzonej świecy
+        self.value = None  # wartość na bieżącej świecy
+
+    @classmethod
+    def span(cls, span):
+        return cls(2.0 / (span + 1.0))
+
+    @classmethod
+    def wilder(cls, period):
+        return cls(1.0 / period)
+
+    def update(self, x, nowa=True):
+        if nowa and self.value is not None:
+            self.prev = self.value
+        if self.prev is None:
+            self.value = x
+        else:
+            self.value = self.alpha * x + (1.0 - self.alpha) * self.prev
+        return self.value
+
+
+class StreamMax:
+    # Maksimum kroczące z `window` świec (monotoniczna kolejka). biezaca=False
+    # liczy okno z poprzednich świec - górna linia kanału Donchiana (shift(1))
+    __slots__ = ("window", "biezaca", "znak", "kolejka", "n", "cur", "value")
+
+    def __init__(self, window, biezaca=True, znak=1.0):
+        self.window = window
+        self.biezaca = biezaca
+        self.znak = znak     # -1.0 zamienia maksimum w minimum
+        self.kolejka = deque()  # (numer świecy, wartość) zatwierdzonych świec, wartości malejące
+        self.n = 0           # liczba zatwierdzonych świec
+        self.cur = None
+        self.value = NAN
+
+    def _commit(self, x):
+        kolejka = self.kolejka
+        while kolejka and kolejka[-1][1] <= x:
+            kolejka.pop()
+        kolejka.append((self.n, x))
+        self.n += 1
+        # W kolejce zostaje tyle zatwierdzonych świec, ile obejmuje okno
+        najstarsza = self.n - (self.window - 1 if self.biezaca else self.window)
+        while kolejka and kolejka[0][0] < najstarsza:
+            kolejka.popleft()
+
+    def update(self, x, nowa=True):
+        x = self.znak * x
+        if nowa and self.cur is not None:
+            self._commit(self.cur)
+        self.cur = x
+        if self.biezaca:
+            if self.n + 1 < self.window:
+                self.value = NAN
+            else:
+                self.value = self.znak * (max(self.kolejka[0][1], x) if self.kolejka else x)
+        else:
+            self.value = self.znak * self.kolejka[0][1] if self.n >= self.window else NAN
+        return self.value
+
+
+def StreamMin(window, biezaca=True):
+    return StreamMax(window, biezaca, znak=-1.0)
+
+
+class StreamMean:
+    # Średnia krocząca z `window` świec (łącznie z bieżącą) przez bieżącą sumę
+    __slots__ = ("window", "okno", "suma", "do_przeliczenia", "cur", "value")
+
+    def __init__(self, window):
+        self.window = window
+        self.okno = deque(maxlen=window - 1)  # zatwierdzone świece w oknie
+        self.suma = 0.0
+        self.do_przeliczenia = window
+        self.cur = None
+        self.value = NAN
+
+    def _commit(self, x):
+        if self.okno.maxlen == 0:
+            return
+        if len(self.okno) == self.okno.maxlen:
+            self.suma -= self.okno[0]
+        self.okno.append(x)
+        self.suma += x
+        # Co `window` świec suma liczona od nowa, żeby błąd zaokrągleń się nie kumulował
+        self.do_przeliczenia -= 1
+        if self.do_przeliczenia == 0:
+            self.suma = math.fsum(self.okno)
+            self.do_przeliczenia = self.window
+
+    def update(self, x, nowa=True):
+        if nowa and self.cur is not None:
+            self._commit(self.cur)
+        self.cur = x
+        if len(self.okno) < self.window - 1:
+            self.value = NAN
+        else:
+            self.value = (self.suma + x) / self.window
+        return self.value
+
+
+class StreamTrueRange:
+    __slots__ = ("prev_close", "cur_close", "value")
+
+    def __init__(self):
+        self.prev_close = None
+        self.cur_close = None
+        self.value = NAN
+
+    def update(self, high, low, close, nowa=True):
+        if nowa and self.cur_close is not None:
+            self.prev_close = self.cur_close
+        self.cur_close = close
+        pc = self.prev_close
+        if pc is None:
+            self.value = abs(high - low)
+        else:
+            self.value = max(abs(high - low), abs(high - pc), abs(low - pc))
+        return self.value
+
+
+class StreamRSI:
+    # Surowe RSI (SMA zysków i strat) - jak indicators.rsi_sma
+    __slots__ = ("prev_close", "cur_close", "gain", "loss", "value")
+
+    def __init__(self, period):
+        self.prev_close = None
+        self.cur_close = None
+        self.gain = StreamMean(period)
+        self.loss = StreamMean(period)
+        self.value = NAN
+
+    def update(self, close, nowa=True):
+        if nowa and self.cur_close is not None:
+            self.prev_close = self.cur_close
+        self.cur_close = close
+        delta = 0.0 if self.prev_close is None else close - self.prev_close
+        g = self.gain.update(max(delta, 0.0), nowa)
+        l = self.loss.update(max(-delta, 0.0), nowa)
+        if l > 0:
+            self.value = 100.0 - 100.0 / (1.0 + g / l)
+        elif g > 0:
+            self.value = 100.0
+        else:
+            self.value = NAN  # brak ruchu w oknie (albo za mało świec)
+        return self.value
+
+# --------------------------------------------------
+# 2. STAN WSKAŹNIKÓW DLA SYSTEMU (kolumny jak w signallogic.add_*_indicators)
+# --------------------------------------------------
+
+class _BarState:
+    __slots__ = ("czas",)
+
+    def _nowa(self, czas):
+        # True - nowa świeca, False - poprawka bieżącej, None - świeca starsza niż bieżąca
+        if self.czas is None or czas > self.czas:
+            self.czas = czas
+            return True
+        if czas == self.czas:
+            return False
+        return None
+
+    @classmethod
+    def from_history(cls, df, *args):
+        stan = cls(*args)
+        for czas, h, l, c in zip(df.index, df['high'].tolist(), df['low'].tolist(), df['close'].tolist()):
+            stan.update(czas, h, l, c)
+        return stan
+
+
+class TrendState(_BarState):
+    __slots__ = ("ema", "hi_in", "lo_in", "hi_out", "lo_out", "hi_now", "lo_now", "tr", "atr", "wartosci")
+
+    def __init__(self, in_p, out_p, ema_p, atr_p=ATR_PERIOD):
+        self.czas = None
+        self.ema = StreamEMA.span(ema_p)
+        self.hi_in, self.lo_in = StreamMax(in_p, biezaca=False), StreamMin(in_p, biezaca=False)
+        self.hi_out, self.lo_out = StreamMax(out_p, biezaca=False), StreamMin(out_p, biezaca=False)
+        # Szczyt/dołek z IN świec łącznie z bieżącą (podstawa trailing stopu)
+        self.hi_now, self.lo_now = StreamMax(in_p), StreamMin(in_p)
+        self.tr = StreamTrueRange()
+        self.atr = StreamEMA.wilder(atr_p)
+        self.wartosci = None
+
+    def update(self, czas, high, low, close):
+        nowa = self._nowa(czas)
+        if nowa is None:
+            return self.wartosci
+        self.wartosci = {
+            'close': close,
+            'ema': self.ema.update(close, nowa),
+            'highest_in': self.hi_in.update(high, nowa),
+            'lowest_in': self.lo_in.update(low, nowa),
+            'highest_out': self.hi_out.update(high, nowa),
+            'lowest_out': self.lo_out.update(low, nowa),
+            'highest_recent': self.hi_now.update(high, nowa),
+            'lowest_recent': self.lo_now.update(low, nowa),
+            'atr': self.atr.update(self.tr.update(high, low, close, nowa), nowa),
+        }
+        return self.wartosci
+
+
+class MeanRevState(_BarState):
+    __slots__ = ("rsi", "tr", "atr", "wartosci")
+
+    def __init__(self, rsi_p, atr_p):
+        self.czas = None
+        self.rsi = StreamRSI(rsi_p)
+        self.tr = StreamTrueRange()
+        self.atr = StreamMean(atr_p)
+        self.wartosci = None
+
+    def update(self, czas, high, low, close):
+        nowa = self._nowa(czas)
+        if nowa is None:
+            return self.wartosci
+        self.wartosci = {
+            'close': close,
+            'rsi': self.rsi.update(close, nowa),
+            'atr': self.atr.update(self.tr.update(high, low, close, nowa), nowa),
+        }
+        return self.wartosci
+
+# --------------------------------------------------
+# 3. MONITOR PORTFELA
+# --------------------------------------------------
+
+def _trend_signal(przepis, w):
+    if trend_exit("LONG", w['close'], w['lowest_out'], w['highest_out']):
+        wyjscie = "wyjście LONG"
+    elif trend_exit("SHORT", w['close'], w['lowest_out'], w['highest_out']):
+        wyjscie = "wyjście SHORT"
+    else:
+        wyjscie = ""
+    return trend_entry(w['close'], w['ema'], w['highest_in'], w['lowest_in']) or wyjscie
+
+
+def _meanrev_signal(przepis, w):
+    p = przepis
+    if meanrev_exit("LONG", w['rsi'], p.l_ex, p.s_ex):
+        wyjscie = "wyjście LONG"
+    elif meanrev_exit("SHORT", w['rsi'], p.l_ex, p.s_ex):
+        wyjscie = "wyjście SHORT"
+    else:
+        wyjscie = ""
+    return meanrev_entry(w['rsi'], p.l_ent, p.s_ent) or wyjscie
+
+
+def _state(przepis, df):
+    p = przepis
+    if p.strategia == "Trend":
+        return TrendState.from_history(df, p.in_p, p.out_p, p.ema_p, p.atr_p)
+    return MeanRevState.from_history(df, p.rsi_p, p.atr_p)
+
+
+def _swiece(df, interval):
+    return resample(df, interval) if interval in RESAMPLE else df
+
+
+def build_states(historia, interval):
+    # historia - {symbol: świece interwału bazowego (RESAMPLE) po kontroli jakości}
+    # -> [(nazwa, symbol, przepis, stan, funkcja sygnału)] dla systemów z danymi
+    systemy = []
+    for tabela, sygnal in [(ZŁOTE_PRZEPISY_TREND, _trend_signal), (ZŁOTE_PRZEPISY_MEANREV, _meanrev_signal)]:
+        for nazwa, p in tabela.items():
+            if historia.get(p.symbol) is not None:
+                systemy.append((nazwa, p.symbol, p, _state(p, _swiece(historia[p.symbol], interval)), sygnal))
+    return systemy
+
+
+def poll(systemy, historia, interval, fetcher=None):
+    # Dociąga świece od bieżącej świecy każdego symbolu i przepuszcza je przez stany.
+    # Interwały składane (4h) - pobierany jest interwał bazowy od początku bieżącej
+    # świecy, więc złożona świeca jest kompletna i tylko poprawia stan.
+    # historia (jak w build_states) uzupełniana jest o nowe świece po kontroli jakości.
+    # Zwraca {symbol: FetchError} dla symboli, których nie udało się odpytać.
+    fetcher = fetcher or default_fetcher()
+    bazowy = RESAMPLE.get(interval, interval)
+    od = {}
+    for _, symbol, _, stan, _ in systemy:
+        od[symbol] = stan.czas if symbol not in od else min(od[symbol], stan.czas)
+    dane, bledy = fetcher.fetch_many(list(od), interval=bazowy, start=od)
+    swiece = {}
+    for s, nowe in dane.items():
+        stare = historia[s]
+        ogon, _ = validate(merge(stare.iloc[-KONTEKST:], nowe), bazowy, s)
+        historia[s] = pd.concat([stare.iloc[:-KONTEKST], ogon])
+        swiece[s] = _swiece(ogon, interval)
+    for i, (nazwa, symbol, p, stan, sygnal) in enumerate(systemy):
+        df = swiece.get(symbol)
+        if df is None:
+            continue
+        if stan.czas not in df.index:
+            # Bieżąca świeca stanu usunięta (np. skok odwrócony na następnej świecy) - stan
+            # zdążył ją zatwierdzić, więc liczony jest od nowa z historii
+            systemy[i] = (nazwa, symbol, p, _state(p, _swiece(historia[symbol], interval)), sygnal)
+            continue
+        df = df[df.index >= stan.czas]
+        for czas, h, l, c in zip(df.index, df['high'].tolist(), df['low'].tolist(), df['close'].tolist()):
+            stan.update(czas, h, l, c)
+    return bledy
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Monitor sygnałów portfela na wskaźnikach strumieniowych")
+    parser.add_argument("--interwal", default="1h", help="Interwał świec, np. 1d, 4h, 1h, 15m")
+    parser.add_argument("--historia", default="60d", help="Historia do zbudowania stanu wskaźników")
+    parser.add_argument("--co", type=float, default=300.0, help="Odstęp między odpytaniami (s)")
+    parser.add_argument("--raz", action="store_true", help="Jedno odpytanie i koniec")
+    args = parser.parse_args(argv)
+
+    historia = get_bars_many(SYMBOLE, period=args.historia, interval=RESAMPLE.get(args.interwal, args.interwal))
+    historia = {s: df for s, df in historia.items() if df is not None and len(df)}
+    systemy = build_states(historia, args.interwal)
+    print(f"{len(systemy)} systemów, interwał {args.interwal}")
+
+    ostatnie = {}
+    while True:
+        start = time.perf_counter()
+        for symbol, e in poll(systemy, historia, args.interwal).items():
+            print(f"  ! {e}")
+        for nazwa, symbol, przepis, stan, sygnal in systemy:
+            teraz = sygnal(przepis, stan.wartosci)
+            if ostatnie.get(nazwa) != teraz:
+                ostatnie[nazwa] = teraz
+                if teraz:
+                    print(f"{pd.Timestamp(stan.czas)}  {nazwa:<32} {symbol:<10} "
+                          f"{stan.wartosci['close']:<12.6g} {teraz}")
+        if args.raz:
+            break
+        time.sleep(max(0.0, args.co - (time.perf_counter() - start)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Moduły projektu leżą w katalogu głównym (bez pakietu) - testy uruchamiane z dowolnego miejsca
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_bars(n=400, seed=0, start="2024-01-01", freq="B", cena=100.0):
+    # Syntetyczne świece OHLCV: błądzenie losowe z trendami, spójne high/low, obrót > 0
+    rng = np.random.default_rng(seed)
+    dryf = np.repeat(rng.normal(0.0, 0.004, n // 50 + 1), 50)[:n]
+    close = cena * np.exp(np.cumsum(dryf + rng.normal(0.0, 0.012, n)))
+    open_ = np.concatenate([[cena], close[:-1]]) * np.exp(rng.normal(0.0, 0.003, n))
+    high = np.maximum(open_, close) * np.exp(np.abs(rng.normal(0.0, 0.006, n)))
+    low = np.minimum(open_, close) * np.exp(-np.abs(rng.normal(0.0, 0.006, n)))
+    volume = rng.integers(1_000, 10_000, n).astype(float)
+    return pd.DataFrame({"open": open_, "high": high, "low": low, "close": close, "volume": volume},
+                        index=pd.date_range(start, periods=n, freq=freq))
+
+
+@pytest.fixture
+def swiece():
+    return make_bars()
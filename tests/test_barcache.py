@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+import barcache
+import barstore
+import fetcher
+from conftest import make_bars
+from fetcher import Fetcher, FileSource
+
+# Limit pamięci cache świec obejmuje memo wskaźników przy każdym wpisie.
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    # Pusty cache świec z limitem ustawianym w teście: cache(max_bajtow)
+    def nowy(max_bajtow=barcache.MAX_BAJTOW):
+        monkeypatch.setattr(barcache, "_SWIECE", barcache.LRUCache(barcache.MAX_WPISOW, max_bajtow))
+        return barcache._SWIECE
+    return nowy
+
+
+def test_memo_arrays_count_towards_entry_size(cache):
+    swiece = cache()
+    df = make_bars(300)
+    wpis = barcache._store("A", "2y", "1d", df)
+    assert swiece.bajty == wpis.bajty_df > 0
+    wpis.wskazniki.memo(("ema", 20), lambda: np.ones(300))
+    wpis.wskazniki.put(("donchian", 20), (np.ones(300), np.ones(300)))
+    assert wpis.wskazniki.bajty == 3 * 300 * 8
+    assert swiece.bajty == wpis.size() == wpis.bajty_df + 3 * 300 * 8
+
+
+def test_memo_growth_evicts_least_recently_used(cache):
+    df = make_bars(300)
+    rozmiar = int(df.memory_usage(index=True).sum())
+    swiece = cache(2 * rozmiar + 4 * 300 * 8)
+    a = barcache._store("A", "2y", "1d", df)
+    barcache._store("B", "2y", "1d", df)
+    assert swiece.get(("A", "1d", "2y")) is a  # B najdawniej używany
+    for okres in range(5):
+        a.wskazniki.put(("ema", okres), np.ones(300))
+    assert ("B", "1d", "2y") not in swiece.wpisy and ("A", "1d", "2y") in swiece.wpisy
+    assert swiece.bajty == a.size() <= swiece.max_bajtow
+
+
+def test_replaced_entry_does_not_resize_new_one(cache):
+    swiece = cache()
+    stary = barcache._store("A", "2y", "1d", make_bars(300))
+    nowy = barcache._store("A", "2y", "1d", make_bars(300, seed=1))
+    stary.wskazniki.put(("ema", 20), np.ones(300))
+    assert swiece.bajty == nowy.size() == nowy.bajty_df
+
+
+def test_indicator_frames_bounded_through_barstore(cache, monkeypatch, tmp_path):
+    # Pełna ścieżka: FileSource -> barstore -> barcache -> memo wskaźników stron
+    zrodla = tmp_path / "zrodla"
+    zrodla.mkdir()
+    make_bars(500, start="2025-01-01").to_csv(zrodla / "A.csv")
+    monkeypatch.setattr(barstore, "STORE_DIR", str(tmp_path / "magazyn"))
+    monkeypatch.setattr(fetcher, "_DOMYSLNY", Fetcher(FileSource(str(zrodla)), backoff=0.0))
+    swiece = cache()
+    barcache.trend_frame("A", 20, 10, 50, 14, period="max")
+    barcache.meanrev_frame("A", 5, 14, period="max")
+    wpis = swiece.get(("A", "1d", "max"))
+    n = len(wpis.df)
+    # ema, donchian 20 i 10 (po dwie tablice), atr_wilder, rsi_sma, atr_sma
+    assert wpis.wskazniki.bajty == 8 * n * 8
+    assert swiece.bajty == wpis.bajty_df + 8 * n * 8
@@ -0,0 +1,142 @@
+import pandas as pd
+import pytest
+
+import barstore
+from conftest import make_bars
+from fetcher import Fetcher, FileSource
+
+# Magazyn Parquet: pierwsze pobranie zapisuje historię, kolejne dociągają tylko ogon
+# od ostatniego zapisanego baru; nieudane pobranie oddaje zapisaną historię.
+
+# Historia kończąca się dziś (pokrycie okresu liczone jest od bieżącej daty) - ponad 2 lata
+PELNE = make_bars(620, start=pd.bdate_range(end=pd.Timestamp.now().normalize(), periods=620)[0])
+
+
+class _Zrodlo(FileSource):
+    # Pliki z katalogu + zapis zapytań (period / start) do sprawdzenia, co było pobierane
+    def __init__(self, katalog):
+        super().__init__(katalog)
+        self.zapytania = []
+
+    def fetch(self, symbol, period="2y", interval="1d", start=None, timeout=None):
+        self.zapytania.append((symbol, None if start is not None else period, start))
+        return super().fetch(symbol, period, interval, start, timeout)
+
+
+@pytest.fixture
+def magazyn(monkeypatch, tmp_path):
+    # (zrodlo, fetcher, zapisz(df, symbol="A")) - źródło z plików i pusty magazyn w tmp_path
+    zrodla = tmp_path / "zrodla"
+    zrodla.mkdir()
+    monkeypatch.setattr(barstore, "STORE_DIR", str(tmp_path / "magazyn"))
+    zrodlo = _Zrodlo(str(zrodla))
+
+    def zapisz(df, symbol="A"):
+        df.to_parquet(zrodla / f"{FileSource.file_name(symbol)}.parquet")
+    return zrodlo, Fetcher(zrodlo, backoff=0.0, retries=1), zapisz
+
+
+def test_incremental_tail_fetch(magazyn):
+    zrodlo, fetcher, zapisz = magazyn
+    zapisz(PELNE.iloc[:600])
+    pierwsze = barstore.get_bars("A", period="2y", fetcher=fetcher)
+    assert zrodlo.zapytania == [("A", "2y", None)]
+    zapisane = barstore.load("A")
+    assert zapisane.index[-1] == PELNE.index[599] and zapisane.index.equals(pierwsze.index)
+
+    # Ostatni zapisany bar był niezamknięty - nowsza wersja wygrywa, dochodzą nowe świece
+    nowe = PELNE.copy()
+    nowe.iloc[599, nowe.columns.get_loc("close")] *= 1.001
+    zapisz(nowe)
+    drugie = barstore.get_bars("A", period="2y", fetcher=fetcher)
+    assert zrodlo.zapytania[1] == ("A", None, PELNE.index[599])
+    pd.testing.assert_frame_equal(barstore.load("A"), nowe.loc[zapisane.index[0]:], check_freq=False)
+    assert drugie.index[-1] == PELNE.index[-1]
+    assert drugie["close"].iloc[-21] == nowe["close"].iloc[599]
+
+
+def test_merge():
+    stare, nowe = PELNE.iloc[:100], PELNE.iloc[98:120]
+    wynik = barstore.merge(stare, nowe)
+    assert wynik.index.equals(PELNE.index[:120]) and wynik.index.is_unique
+    # Bez nowych ani zmienionych świec - ta sama ramka (bez ponownego zapisu pliku)
+    assert barstore.merge(stare, PELNE.iloc[95:100]) is stare
+    assert barstore.merge(stare, None) is stare and barstore.merge(None, nowe) is nowe
+
+
+def test_failed_fetch_serves_stored_bars(magazyn, tmp_path):
+    zrodlo, fetcher, zapisz = magazyn
+    zapisz(PELNE)
+    zapisz(PELNE, "B")
+    barstore.get_bars_many(["A", "B"], period="2y", fetcher=fetcher)
+    for plik in (tmp_path / "zrodla").iterdir():
+        plik.unlink()
+
+    assert barstore.get_bars("A", period="2y", fetcher=fetcher).index[-1] == PELNE.index[-1]
+    bledy = {}
+    # B: ogon nie przyszedł; C: ani danych, ani historii; A z "5y" - pełne pobranie nieudane
+    wynik = barstore.get_bars_many(["B", "C"], period="2y", fetcher=fetcher, bledy=bledy)
+    assert wynik["B"].index[-1] == PELNE.index[-1] and wynik["C"] is None
+    assert set(bledy) == {"B", "C"}
+    bledy = {}
+    wynik = barstore.get_bars_many(["A"], period="5y", fetcher=fetcher, bledy=bledy)
+    assert wynik["A"].index.equals(barstore.load("A").index) and bledy["A"].rodzaj == "brak_danych"
+
+
+def test_shorter_history_refetched_in_full(magazyn):
+    zrodlo, fetcher, zapisz = magazyn
+    zapisz(PELNE)
+    barstore.get_bars("A", period="6mo", fetcher=fetcher)
+    barstore.get_bars("A", period="2y", fetcher=fetcher)
+    assert [z[1] for z in zrodlo.zapytania] == ["6mo", "2y"]
+    barstore.get_bars("A", period="1y", fetcher=fetcher)
+    assert zrodlo.zapytania[-1][1] is None  # "1y" mieści się w zapisanych 2 latach - tylko ogon
+
+
+def test_trim_to_period(magazyn):
+    zrodlo, fetcher, zapisz = magazyn
+    zapisz(PELNE)
+    barstore.get_bars("A", period="2y", fetcher=fetcher)
+    df = barstore.get_bars("A", period="6mo", fetcher=fetcher)
+    assert df.index[0] >= PELNE.index[-1] - pd.DateOffset(months=6)
+    assert df.index[-1] == PELNE.index[-1]
+
+
+# --------------------------------------------------
+# Interwały składane lokalnie (4h z 1h)
+# --------------------------------------------------
+
+def _godzinowe(dni=70):
+    # Świece 1h (UTC) kończące się w bieżącej godzinie, bez weekendów
+    koniec = pd.Timestamp.now(tz="UTC").floor("h")
+    df = make_bars(24 * dni, start=koniec - pd.Timedelta(hours=24 * dni - 1), freq="h")
+    return df[df.index.dayofweek < 5]
+
+
+def test_resample_aggregates_and_skips_empty_windows():
+    df = _godzinowe(10)
+    wynik = barstore.resample(df, "4h")
+    okno = df[(df.index >= wynik.index[1]) & (df.index < wynik.index[1] + pd.Timedelta(hours=4))]
+    assert wynik.iloc[1].to_dict() == pytest.approx({
+        "open": okno["open"].iloc[0], "high": okno["high"].max(), "low": okno["low"].min(),
+        "close": okno["close"].iloc[-1], "volume": okno["volume"].sum()})
+    assert (wynik.index.hour % 4 == 0).all() and (wynik.index.dayofweek < 5).all()  # weekend pominięty
+    assert wynik.index.tz == df.index.tz and wynik["volume"].sum() == df["volume"].sum()
+
+
+def test_composite_interval_uses_stored_base(magazyn, tmp_path):
+    zrodlo, fetcher, zapisz = magazyn
+    zapisz(_godzinowe())
+    godzinowe = barstore.get_bars("A", period="60d", interval="1h", fetcher=fetcher)
+    czterogodzinne = barstore.get_bars("A", period="60d", interval="4h", fetcher=fetcher)
+    # Jedno pełne pobranie 1h, potem tylko ogon; 4h nie ma własnego pliku w magazynie
+    assert [z[1:] for z in zrodlo.zapytania] == [("60d", None), (None, godzinowe.index[-1])]
+    assert sorted(p.name for p in (tmp_path / "magazyn").iterdir()) == ["1h"]
+    pd.testing.assert_frame_equal(czterogodzinne, barstore.resample(godzinowe, "4h"))
+    wiele = barstore.get_bars_many(["A"], period="60d", interval="4h", fetcher=fetcher)
+    pd.testing.assert_frame_equal(wiele["A"], czterogodzinne)
+
+
+def test_intraday_period_limited():
+    assert barstore.limit_period("2y", "1h") == "720d" and barstore.limit_period("max", "1h") == "720d"
+    assert barstore.limit_period("60d", "1h") == "60d" and barstore.limit_period("2y", "1d") == "2y"
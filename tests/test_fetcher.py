@@ -0,0 +1,127 @@
+import pandas as pd
+import pytest
+
+import fetcher
+import marketdata
+from conftest import make_bars
+from fetcher import FetchError, Fetcher, FileSource
+
+# Ponawianie (tylko błędy i timeouty), klasyfikacja błędów, częściowe porażki fetch_many
+# i mapowanie wyjątków Yahoo w marketdata.download - bez sieci.
+
+
+class _Zrodlo:
+    # Źródło na niby: kolejne odpowiedzi z listy (wyjątek albo DataFrame / None), licznik zapytań
+    na_sekunde = None
+
+    def __init__(self, *odpowiedzi):
+        self.odpowiedzi = list(odpowiedzi)
+        self.zapytania = []
+
+    def fetch(self, symbol, period="2y", interval="1d", start=None, timeout=None):
+        self.zapytania.append((symbol, timeout))
+        odpowiedz = self.odpowiedzi.pop(0) if len(self.odpowiedzi) > 1 else self.odpowiedzi[0]
+        if isinstance(odpowiedz, Exception):
+            raise odpowiedz
+        return odpowiedz
+
+
+class ReadTimeout(Exception):
+    # Nazwa jak w requests / curl_cffi - rozpoznawana bez importu tych pakietów
+    pass
+
+
+def _fetcher(zrodlo, retries=3):
+    return Fetcher(zrodlo, timeout=5.0, retries=retries, backoff=0.0)
+
+
+def test_retries_until_success():
+    df = make_bars(50)
+    zrodlo = _Zrodlo(TimeoutError("timed out"), ConnectionError("reset"), df)
+    assert _fetcher(zrodlo).fetch("A") is df
+    assert zrodlo.zapytania == [("A", 5.0)] * 3  # timeout przekazany do źródła
+
+
+@pytest.mark.parametrize("wyjatek, rodzaj", [(TimeoutError("timed out"), "timeout"),
+                                             (ReadTimeout("read timed out"), "timeout"),
+                                             (ConnectionError("reset"), "blad")])
+def test_errors_exhaust_retries(wyjatek, rodzaj):
+    zrodlo = _Zrodlo(wyjatek)
+    with pytest.raises(FetchError) as e:
+        _fetcher(zrodlo).fetch("A")
+    assert e.value.rodzaj == rodzaj and e.value.proby == 3
+    assert len(zrodlo.zapytania) == 3
+
+
+@pytest.mark.parametrize("pusty", [None, make_bars(5).iloc[:0]])
+def test_no_rows_is_not_retried(pusty):
+    zrodlo = _Zrodlo(pusty)
+    with pytest.raises(FetchError) as e:
+        _fetcher(zrodlo).fetch("A")
+    assert e.value.rodzaj == "brak_danych" and e.value.proby == 1
+    assert len(zrodlo.zapytania) == 1
+
+
+def test_fetch_many_partial_failure(tmp_path):
+    make_bars(100).to_csv(tmp_path / "A.csv")
+    make_bars(80, seed=1).to_parquet(tmp_path / "_NDX.parquet")
+    dane, bledy = _fetcher(FileSource(str(tmp_path))).fetch_many(["A", "^NDX", "BRAK", "A", ""], period="max")
+    assert sorted(dane) == ["A", "^NDX"] and len(dane["A"]) == 100 and len(dane["^NDX"]) == 80
+    assert list(bledy) == ["BRAK"] and bledy["BRAK"].rodzaj == "brak_danych"
+
+
+def test_file_source_period_and_start(tmp_path):
+    make_bars(400).to_csv(tmp_path / "A.csv")
+    zrodlo = FileSource(str(tmp_path))
+    df = zrodlo.fetch("A", period="6mo")
+    assert df.index[0] >= df.index[-1] - pd.DateOffset(months=6)
+    ogon = zrodlo.fetch("A", start=df.index[-3])
+    assert list(ogon.index) == list(df.index[-3:])
+
+
+class _Ticker:
+    # yf.Ticker na niby - history zwraca ramkę albo zgłasza wyjątek, zapytania w `wywolania`
+    odpowiedz = None
+    wywolania = []
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    def history(self, **kwargs):
+        self.wywolania.append(kwargs)
+        if isinstance(self.odpowiedz, Exception):
+            raise self.odpowiedz
+        return self.odpowiedz
+
+
+@pytest.fixture
+def yahoo(monkeypatch):
+    monkeypatch.setattr(marketdata.yf, "Ticker", _Ticker)
+    monkeypatch.setattr(_Ticker, "wywolania", [])
+    return lambda odpowiedz: monkeypatch.setattr(_Ticker, "odpowiedz", odpowiedz)
+
+
+def test_yahoo_network_error_is_retried(yahoo):
+    yahoo(ReadTimeout("read timed out"))
+    with pytest.raises(FetchError) as e:
+        _fetcher(fetcher.YahooSource(), retries=2).fetch("A")
+    assert e.value.rodzaj == "timeout" and e.value.proby == 2
+    assert [w["timeout"] for w in _Ticker.wywolania] == [5.0, 5.0]
+
+
+def test_yahoo_missing_prices_are_no_data(yahoo):
+    from yfinance.exceptions import YFPricesMissingError
+    yahoo(YFPricesMissingError("ZLY", ""))
+    with pytest.raises(FetchError) as e:
+        _fetcher(fetcher.YahooSource()).fetch("ZLY")
+    assert e.value.rodzaj == "brak_danych" and len(_Ticker.wywolania) == 1
+
+
+def test_yahoo_daily_bars_normalized(yahoo):
+    # Świece dzienne bez strefy i tylko kolumny OHLCV (bez dywidend), jak z yf.download
+    df = make_bars(10).rename(columns=str.title)
+    df.index = df.index.tz_localize("America/New_York")
+    yahoo(df.assign(Dividends=0.0))
+    wynik = marketdata.download("A", start=df.index[0])
+    assert list(wynik.columns) == marketdata.KOLUMNY and wynik.index.tz is None
+    assert _Ticker.wywolania[0]["start"] == df.index[0] and "period" not in _Ticker.wywolania[0]
@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import indicators
+
+# Silnik NumPy kontra pierwotne wzory pandas ze stron (signaltrend.py / signalmeanrev.py
+# sprzed indicators.py) - te same wartości, te same NaN na rozgrzewce.
+
+
+def _tr_pandas(df):
+    tr0 = abs(df['high'] - df['low'])
+    tr1 = abs(df['high'] - df['close'].shift())
+    tr2 = abs(df['low'] - df['close'].shift())
+    return pd.concat([tr0, tr1, tr2], axis=1).max(axis=1)
+
+
+def _rsi_pandas(close, rsi_p):
+    delta = close.diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=rsi_p).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=rsi_p).mean()
+    rs = gain / loss
+    return 100 - (100 / (1 + rs))
+
+
+def _z_lukami(x, seed=1, ile=15):
+    x = x.copy()
+    x[np.random.default_rng(seed).choice(np.arange(1, len(x)), ile, replace=False)] = np.nan
+    return x
+
+
+@pytest.mark.parametrize("span", [1, 5, 50])
+def test_ema_matches_pandas(swiece, span):
+    oczekiwane = swiece['close'].ewm(span=span, adjust=False).mean()
+    np.testing.assert_allclose(indicators.ema(swiece['close'].to_numpy(), span), oczekiwane, rtol=1e-12)
+
+
+def test_ema_with_gaps_matches_pandas(swiece):
+    # Luki w środku i NaN na początku serii (ignore_na=False)
+    close = _z_lukami(swiece['close'].to_numpy())
+    close[:3] = np.nan
+    oczekiwane = pd.Series(close).ewm(span=20, adjust=False).mean()
+    np.testing.assert_allclose(indicators.ema(close, 20), oczekiwane, rtol=1e-12)
+
+
+@pytest.mark.parametrize("okno", [1, 2, 20, 55])
+def test_rolling_extremes_match_pandas(swiece, okno):
+    wynik_max = indicators.rolling_max(swiece['high'].to_numpy(), okno)
+    wynik_min = indicators.rolling_min(swiece['low'].to_numpy(), okno)
+    np.testing.assert_array_equal(wynik_max, swiece['high'].rolling(window=okno).max())
+    np.testing.assert_array_equal(wynik_min, swiece['low'].rolling(window=okno).min())
+    assert np.isnan(wynik_max[:okno - 1]).all() and not np.isnan(wynik_max[okno - 1:]).any()
+
+
+def test_rolling_window_longer_than_series():
+    x = np.arange(5.0)
+    assert np.isnan(indicators.rolling_max(x, 10)).all()
+    assert np.isnan(indicators.rolling_mean(x, 10)).all()
+
+
+def test_rolling_mean_with_gaps_matches_pandas(swiece):
+    x = _z_lukami(swiece['close'].to_numpy())
+    np.testing.assert_allclose(indicators.rolling_mean(x, 14), pd.Series(x).rolling(window=14).mean(), rtol=1e-9)
+
+
+def test_donchian_matches_pandas(swiece):
+    gorna, dolna = indicators.donchian(swiece['high'].to_numpy(), swiece['low'].to_numpy(), 20)
+    np.testing.assert_array_equal(gorna, swiece['high'].rolling(window=20).max().shift(1))
+    np.testing.assert_array_equal(dolna, swiece['low'].rolling(window=20).min().shift(1))
+    assert np.isnan(gorna[:20]).all() and not np.isnan(gorna[20:]).any()
+
+
+def test_true_range_matches_pandas(swiece):
+    # Pierwsza świeca bez poprzedniego zamknięcia: TR = high - low (max pomija NaN)
+    wynik = indicators.true_range(swiece['high'], swiece['low'], swiece['close'])
+    np.testing.assert_allclose(wynik, _tr_pandas(swiece), rtol=1e-12)
+    assert wynik[0] == swiece['high'].iloc[0] - swiece['low'].iloc[0]
+
+
+def test_atr_wilder_matches_pandas(swiece):
+    oczekiwane = _tr_pandas(swiece).ewm(alpha=1 / 14, adjust=False).mean()
+    wynik = indicators.atr_wilder(swiece['high'], swiece['low'], swiece['close'], 14)
+    np.testing.assert_allclose(wynik, oczekiwane, rtol=1e-12)
+
+
+def test_atr_sma_matches_pandas(swiece):
+    oczekiwane = _tr_pandas(swiece).rolling(window=14).mean()
+    wynik = indicators.atr_sma(swiece['high'], swiece['low'], swiece['close'], 14)
+    np.testing.assert_allclose(wynik, oczekiwane, rtol=1e-9)
+    assert np.isnan(wynik[:13]).all() and not np.isnan(wynik[13:]).any()
+
+
+@pytest.mark.parametrize("rsi_p", [2, 5, 14])
+def test_rsi_sma_matches_pandas(swiece, rsi_p):
+    wynik = indicators.rsi_sma(swiece['close'].to_numpy(), rsi_p)
+    np.testing.assert_allclose(wynik, _rsi_pandas(swiece['close'], rsi_p), rtol=1e-9)
+    assert np.isnan(wynik[:rsi_p - 1]).all()
+
+
+def test_rsi_sma_flat_and_rising_windows():
+    # Okno bez strat: 100 (pandas przez rs = inf), okno bez ruchu: NaN (pandas 0 / 0)
+    close = np.array([10.0, 10.0, 10.0, 10.0, 11.0, 12.0, 13.0, 12.0])
+    wynik = indicators.rsi_sma(close, 3)
+    np.testing.assert_allclose(wynik, _rsi_pandas(pd.Series(close), 3), rtol=1e-12)
+    assert np.isnan(wynik[3]) and wynik[5] == 100.0 and wynik[6] == 100.0
+
+
+def test_period_list_matches_single_periods(swiece):
+    # Lista okresów - pierwsza oś wyniku, wartości jak przy osobnych wywołaniach
+    close, high, low = (swiece[k].to_numpy() for k in ("close", "high", "low"))
+    for funkcja, args in [(indicators.ema, (close,)), (indicators.rolling_max, (high,)),
+                          (indicators.rolling_mean, (close,)), (indicators.rsi_sma, (close,)),
+                          (indicators.atr_wilder, (high, low, close))]:
+        razem = funkcja(*args, [3, 14, 30])
+        for i, p in enumerate([3, 14, 30]):
+            np.testing.assert_allclose(razem[i], funkcja(*args, p), rtol=1e-12)
+
+
+def test_panel_matches_columns(swiece):
+    # 2-D (świece x symbole) - każda kolumna jak osobny szereg, NaN z przodu krótszej historii
+    druga = swiece['close'].to_numpy() * 1.5
+    druga[:40] = np.nan
+    panel = np.column_stack([swiece['close'].to_numpy(), druga])
+    for funkcja in (lambda x: indicators.ema(x, 10), lambda x: indicators.rolling_max(x, 10),
+                    lambda x: indicators.rsi_sma(x, 14)):
+        wynik = funkcja(panel)
+        for j in range(panel.shape[1]):
+            np.testing.assert_allclose(wynik[:, j], funkcja(panel[:, j]), rtol=1e-12)
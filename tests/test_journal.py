@@ -0,0 +1,70 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import journal
+from conftest import make_bars
+
+# Dziennik sygnałów: tylko dopisywanie (wyzwalacze), jeden wiersz na sygnał świecy
+# i tylko świece zamknięte; wynik sygnału ze świec po sygnale.
+
+
+@pytest.fixture
+def plik(monkeypatch, tmp_path):
+    # Osobny plik bazy i pusta pamięć zapisanych kluczy na test
+    monkeypatch.setattr(journal, "_ZAPISANE", set())
+    return str(tmp_path / journal.PLIK)
+
+
+def _wiersz(data, sygnal="LONG", system="A_trend", cena=100.0, stop=95.0):
+    return {"Strategia": "Trend", "System": system, "Symbol": "A", "Data": data, "Sygnał": sygnal,
+            "Cena": cena, "Stop Loss": stop, "Wolumen": 1000.0, "Ryzyko": 0.01}
+
+
+def test_record_dedupes_signals(plik, monkeypatch):
+    wiersze = [_wiersz("2024-03-04"), _wiersz("2024-03-05", "SHORT"), _wiersz("2024-03-05", "BRAK")]
+    assert journal.record(wiersze, plik=plik) == 2
+    assert journal.record(wiersze, plik=plik) == 0
+    # Nowy proces (pusta pamięć kluczy) - duplikaty odrzuca baza (UNIQUE + INSERT OR IGNORE)
+    monkeypatch.setattr(journal, "_ZAPISANE", set())
+    assert journal.record(wiersze + [_wiersz("2024-03-06")], zrodlo="serwis", plik=plik) == 1
+    df = journal.query(plik=plik)
+    assert list(df["sygnal"]) == ["LONG", "SHORT", "LONG"] and list(df["zrodlo"]) == ["serwis", "skaner", "skaner"]
+    # Inny interwał tej samej świecy to osobny sygnał
+    assert journal.record([_wiersz("2024-03-04")], interval="1wk", plik=plik) == 1
+
+
+def test_open_bar_not_recorded(plik):
+    teraz = pd.Timestamp.now(tz="UTC").floor("h")
+    assert journal.record([_wiersz(teraz)], interval="1h", plik=plik) == 0
+    assert journal.record([_wiersz(teraz - pd.Timedelta(hours=1))], interval="1h", plik=plik) == 1
+    assert journal.query(plik=plik)["data"].iloc[0] == (teraz - pd.Timedelta(hours=1)).tz_localize(None)
+
+
+@pytest.mark.parametrize("sql", ["UPDATE sygnaly SET cena = 1.0", "DELETE FROM sygnaly",
+                                 "UPDATE wyniki SET r = 0.0", "DELETE FROM wyniki"])
+def test_rows_cannot_be_changed(plik, sql):
+    journal.record([_wiersz("2024-03-04")], plik=plik)
+    with journal._connect(plik) as con:
+        con.execute("INSERT INTO wyniki VALUES (1, '2024-03-08 00:00:00', 94.0, 'SL', -1.2, 4)")
+    with pytest.raises(sqlite3.DatabaseError, match="tylko do dopisywania"), journal._connect(plik) as con:
+        con.execute(sql)
+    df = journal.query(plik=plik)
+    assert len(df) == 1 and df["cena"].iloc[0] == 100.0 and df["r"].iloc[0] == -1.2
+
+
+def test_outcome_stop_and_open_position():
+    df = make_bars(30, start="2024-03-01")
+    sygnal = {"sygnal": "LONG", "cena": 100.0, "stop": 95.0}
+    df.iloc[:, :4] = 100.0
+    df.iloc[12, :4] = [97.0, 98.0, 94.0, 96.0]  # stop trafiony w trakcie świecy
+    zamknieta, czas, cena, powod, r, swiece = journal.outcome(sygnal, df, 5)
+    assert (zamknieta, czas, cena, powod, swiece) == (True, df.index[12], 95.0, "SL", 8)
+    assert r == pytest.approx(-1.0)
+    # Luka pod stop - wyjście po otwarciu; bez trafienia pozycja otwarta, wyceniona na ostatnim close
+    df.iloc[12, :4] = [90.0, 92.0, 89.0, 91.0]
+    assert journal.outcome(sygnal, df, 5)[2:5] == (90.0, "SL", pytest.approx(-2.0))
+    zamknieta, czas, cena, _, r, _ = journal.outcome(sygnal, df, 13)
+    assert not zamknieta and czas == df.index[-1] and r == 0.0
+    assert journal.outcome({**sygnal, "stop": 100.0}, df, 5) is None  # bez ryzyka - bez wyniku
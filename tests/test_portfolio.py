@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import portfolio
+from conftest import make_bars
+
+# Wielkość pozycji na poziomie portfela: klastry skorelowanych symboli i limity
+# (ryzyko klastra, ryzyko portfela, depozyt, dźwignia brutto) - tylko zmniejszanie.
+
+KAPITAL = 10000.0
+BEZ_LIMITU = dict(max_ryzyko=1e9, max_klaster=1e9, max_depozyt=1e9, max_dzwignia=1e9)
+
+
+def _dane():
+    # BTC i ETH prawie identyczne (jeden klaster), złoto niezależne
+    btc = make_bars(200, seed=1)
+    szum = np.exp(np.random.default_rng(2).normal(0.0, 0.001, 200))[:, None]
+    eth = btc.assign(**{k: btc[k] * szum[:, 0] for k in ["open", "high", "low", "close"]})
+    return {"BTC-USD": btc, "ETH-USD": eth, "GC=F": make_bars(200, seed=3)}
+
+
+def _skan(*pozycje):
+    # pozycje - (system, symbol, sygnał, ryzyko, wolumen); strategia Trend poza złotem
+    return pd.DataFrame([{"Strategia": "Mean Reversion" if s == "GC=F" else "Trend", "System": n, "Symbol": s,
+                          "Sygnał": sygnal, "Cena": 100.0, "Wolumen": wolumen, "Ryzyko": ryzyko}
+                         for n, s, sygnal, ryzyko, wolumen in pozycje])
+
+
+BTC = ("Bitcoin", "BTC-USD")
+ETH = ("Ethereum", "ETH-USD")
+GC = ("Złoto (GC=F)", "GC=F")
+
+
+def test_clusters_from_correlation():
+    dane = _dane()
+    rho = portfolio.correlation(portfolio.returns_matrix(dane, list(dane)))
+    assert rho[0, 1] > 0.99 and abs(rho[0, 2]) < portfolio.PROG_KLASTRA
+    assert list(portfolio.clusters(rho)) == [0, 0, 2]
+    # Łańcuch a-b, b-c łączy a i c mimo słabej korelacji a-c
+    lancuch = np.array([[1.0, 0.7, 0.1], [0.7, 1.0, -0.8], [0.1, -0.8, 1.0]])
+    assert list(portfolio.clusters(lancuch)) == [0, 0, 0]
+
+
+def test_cluster_cap_scales_only_its_members():
+    skan = _skan((*BTC, "LONG", 400.0, 1.0), (*ETH, "LONG", 400.0, 1.0), (*GC, "LONG", 400.0, 1.0),
+                 (*BTC, "BRAK", 0.0, 0.0))
+    wynik, p = portfolio.size_portfolio(skan, KAPITAL, dane=_dane(), **{**BEZ_LIMITU, "max_klaster": 0.06})
+    skala = wynik["Skala"].to_numpy()
+    # Dwa LONG-i na skorelowanych rynkach to prawie 800 ryzyka - klaster ścięty do 600
+    assert skala[0] == skala[1] == pytest.approx(600.0 / p["klastry"]["BTC-USD"]["ryzyko"])
+    assert 0.75 <= skala[0] < 0.76 and skala[2] == 1.0 and np.isnan(skala[3])
+    assert list(wynik["Klaster"]) == ["BTC-USD", "BTC-USD", "GC=F", ""]
+    assert wynik["Ryzyko portf."].iloc[0] == pytest.approx(400.0 * skala[0])
+    assert p["pozycje"] == 3 and p["ryzyko_suma"] == 1200.0
+    assert p["klastry"]["BTC-USD"]["symbole"] == ["BTC-USD", "ETH-USD"]
+
+
+def test_opposite_positions_offset():
+    skan = _skan((*BTC, "LONG", 400.0, 1.0), (*ETH, "SHORT", 400.0, 1.0))
+    wynik, p = portfolio.size_portfolio(skan, KAPITAL, dane=_dane(), **{**BEZ_LIMITU, "max_klaster": 0.06})
+    assert (wynik["Skala"] == 1.0).all() and p["ryzyko_skorelowane"] < 50.0
+
+
+def test_portfolio_risk_cap():
+    skan = _skan((*BTC, "LONG", 800.0, 1.0), (*GC, "LONG", 800.0, 1.0))
+    wynik, p = portfolio.size_portfolio(skan, KAPITAL, dane=_dane(), **{**BEZ_LIMITU, "max_ryzyko": 0.08})
+    assert p["ryzyko_po"] == pytest.approx(800.0) and p["ryzyko_skorelowane"] > 800.0
+    assert wynik["Skala"].iloc[0] == wynik["Skala"].iloc[1] < 1.0
+
+
+def test_margin_and_gross_leverage_caps():
+    # BTC: nominał 20000 przy dźwigni 2 -> depozyt 10000; złoto (mult 100): nominał 20000, depozyt 1000
+    skan = _skan((*BTC, "LONG", 100.0, 200.0), (*GC, "SHORT", 100.0, 2.0))
+    wynik, p = portfolio.size_portfolio(skan, KAPITAL, dane=_dane(), **{**BEZ_LIMITU, "max_depozyt": 0.5})
+    assert p["depozyt"] == pytest.approx(5000.0) and wynik["Skala"].iloc[0] == pytest.approx(5000.0 / 11000.0)
+    wynik, p = portfolio.size_portfolio(skan, KAPITAL, dane=_dane(), **{**BEZ_LIMITU, "max_dzwignia": 3.0})
+    assert p["dzwignia"] == pytest.approx(3.0)
+    assert wynik["Nominał"].sum() == pytest.approx(3.0 * KAPITAL)
+    assert wynik["Wolumen portf."].iloc[1] == pytest.approx(2.0 * 0.75)
+
+
+def test_no_active_signals():
+    skan = _skan((*BTC, "BRAK", 0.0, 0.0), (*GC, "LONG", 100.0, 0.0))
+    wynik, p = portfolio.size_portfolio(skan, KAPITAL, dane={})
+    assert p["pozycje"] == 0 and wynik["Skala"].isna().all() and list(wynik["Klaster"]) == ["", ""]
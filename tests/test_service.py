@@ -0,0 +1,94 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+import barcache
+import barstore
+import fetcher
+import journal
+import service
+from conftest import make_bars
+from fetcher import FetchError, Fetcher, FileSource
+
+# Serwis HTTP na świecach z plików: odpowiedzi JSON i mapowanie błędów
+# (400 - złe parametry, 503 - brak danych rynkowych, 500 - inny błąd, 202 - zlecenie odświeżenia).
+
+
+@pytest.fixture
+def serwer(monkeypatch, tmp_path):
+    # (serwis, zapytaj(metoda, sciezka) -> (kod, JSON)) - BTC-USD z pliku, pusty magazyn i cache
+    zrodla = tmp_path / "zrodla"
+    zrodla.mkdir()
+    make_bars(620, start=pd.bdate_range(end=pd.Timestamp.now().normalize(), periods=620)[0],
+              cena=30000.0).to_csv(zrodla / "BTC-USD.csv")
+    monkeypatch.setattr(barstore, "STORE_DIR", str(tmp_path / "magazyn"))
+    monkeypatch.setattr(fetcher, "_DOMYSLNY", Fetcher(FileSource(str(zrodla)), backoff=0.0))
+    monkeypatch.setattr(barcache, "_SWIECE", barcache.LRUCache(barcache.MAX_WPISOW, barcache.MAX_BAJTOW))
+    serwis = service.SignalService()
+    http = ThreadingHTTPServer(("127.0.0.1", 0), service.make_handler(serwis))
+    threading.Thread(target=http.serve_forever, args=(0.05,), daemon=True).start()
+
+    def zapytaj(metoda, sciezka):
+        url = f"http://127.0.0.1:{http.server_address[1]}{sciezka}"
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, method=metoda)) as odp:
+                return odp.status, json.loads(odp.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+    yield serwis, zapytaj
+    http.shutdown()
+    http.server_close()
+
+
+def test_signals_from_snapshot(serwer):
+    serwis, zapytaj = serwer
+    assert zapytaj("GET", "/signals") == (200, [])
+    serwis.refresh(["BTC-USD"])
+    kod, wiersze = zapytaj("GET", "/signals?symbol=BTC-USD&system=Bitcoin")
+    assert kod == 200 and [w["System"] for w in wiersze] == ["Bitcoin"]
+    assert "Klaster" in wiersze[0] and not wiersze[0].get("Błąd")
+    kod, status = zapytaj("GET", "/status")
+    assert status["systemy"] == 1 and list(status["odswiezone"]) == ["BTC-USD"]
+
+
+@pytest.mark.parametrize("sciezka", ["/signals?kapital=0", "/signals?ryzyko=abc", "/signals?kapital=nan",
+                                     "/journal?statystyki=zle", "/journal?dni=xyz"])
+def test_bad_parameters_are_400(serwer, sciezka):
+    _, zapytaj = serwer
+    kod, tresc = zapytaj("GET", sciezka)
+    assert kod == 400 and tresc["blad"]
+
+
+def test_unknown_path_is_404(serwer):
+    _, zapytaj = serwer
+    assert zapytaj("GET", "/sygnaly") == (404, {"blad": "nieznana sciezka"})
+    assert zapytaj("POST", "/signals")[0] == 404
+
+
+def test_refresh_is_queued(serwer):
+    serwis, zapytaj = serwer
+    kod, status = zapytaj("POST", "/refresh?symbol=BTC-USD,GC=F")
+    # Bez wątku harmonogramu zlecenie tylko czeka - odpowiedź nie czeka na skan
+    assert kod == 202 and status["zlecone"] == ["BTC-USD", "GC=F"] and status["systemy"] == 0
+    assert serwis.budzik.is_set()
+    kod, tresc = zapytaj("POST", "/refresh?symbol=NIEMA")
+    assert kod == 400 and "NIEMA" in tresc["blad"] and serwis.zlecone == {"BTC-USD", "GC=F"}
+
+
+@pytest.mark.parametrize("wyjatek, kod, komunikat", [
+    (FetchError("BTC-USD", "timeout", "przekroczony czas"), 503, "brak danych BTC-USD: przekroczony czas"),
+    (RuntimeError("baza zablokowana"), 500, "RuntimeError: baza zablokowana"),
+])
+def test_errors_mapped_to_json(serwer, monkeypatch, wyjatek, kod, komunikat):
+    _, zapytaj = serwer
+
+    def query(**kwargs):
+        raise wyjatek
+    monkeypatch.setattr(journal, "query", query)
+    assert zapytaj("GET", "/journal?dni=30") == (kod, {"blad": komunikat})
+    assert zapytaj("GET", "/status")[0] == 200  # serwer obsługuje dalej
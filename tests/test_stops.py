@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import stops
+from backtest import TrendSystem, run
+from conftest import make_bars
+from przepisy import TrendRecipe
+from signallogic import add_trend_indicators
+
+# Kernele trend_paths (numba / numpy / pętla Pythona) kontra backtest zdarzeniowy:
+# te same wejścia, stopy, wyjścia i ceny wyjścia na całej historii.
+
+PRZEPISY = [
+    TrendRecipe(symbol="A", mult=1.0, dzwignia=1.0, in_p=20, out_p=10, ema_p=50, m_sl=2.0, k_tsl=3.0),
+    TrendRecipe(symbol="B", mult=1.0, dzwignia=1.0, in_p=10, out_p=5, ema_p=20, m_sl=1.0, k_tsl=1.5),
+    TrendRecipe(symbol="C", mult=1.0, dzwignia=1.0, in_p=40, out_p=20, ema_p=100, m_sl=4.0, k_tsl=2.0),
+]
+
+
+def _ramki():
+    # Różne długości historii - panel portfolio_paths dopełniany z przodu NaN
+    return {p.symbol: add_trend_indicators(make_bars(n, seed=i), p.in_p, p.out_p, p.ema_p, p.atr_p)
+            for i, (p, n) in enumerate(zip(PRZEPISY, [500, 350, 600]))}
+
+
+def _przepisy():
+    return {p.symbol: p for p in PRZEPISY}
+
+
+def _porownaj(a, b):
+    for k in a:
+        np.testing.assert_array_equal(a[k], b[k], err_msg=k)
+
+
+def test_numpy_kernel_matches_loop():
+    ramki, przepisy = _ramki(), _przepisy()
+    wzorzec = stops.portfolio_paths(ramki, przepisy, "python")
+    wynik = stops.portfolio_paths(ramki, przepisy, "numpy")
+    assert sum(int((df["wyjscie"] > 0).sum()) for df in wzorzec.values()) > 10
+    for n in wzorzec:
+        pd.testing.assert_frame_equal(wynik[n], wzorzec[n])
+
+
+@pytest.mark.skipif(stops.numba is None, reason="brak pakietu numba")
+def test_numba_kernel_matches_loop():
+    ramki, przepisy = _ramki(), _przepisy()
+    wzorzec = stops.portfolio_paths(ramki, przepisy, "python")
+    wynik = stops.portfolio_paths(ramki, przepisy, "numba")
+    for n in wzorzec:
+        pd.testing.assert_frame_equal(wynik[n], wzorzec[n])
+
+
+def test_single_column_matches_panel():
+    ramki, przepisy = _ramki(), _przepisy()
+    panel = stops.portfolio_paths(ramki, przepisy, "numpy")
+    for n, df in ramki.items():
+        jedna = stops.trend_paths(stops.trend_arrays(df, przepisy[n]), przepisy[n].m_sl, przepisy[n].k_tsl, "numpy")
+        _porownaj(jedna, {k: panel[n][k].to_numpy() for k in jedna})
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        stops.portfolio_paths(_ramki(), _przepisy(), "fortran")
+
+
+@pytest.mark.parametrize("backend", ["python", "numpy"])
+def test_kernels_match_backtest(backend):
+    # Każdy system osobno w backteście (wolumen nie wpływa na ścieżkę pozycji)
+    ramki, przepisy = _ramki(), _przepisy()
+    sciezki = stops.portfolio_paths(ramki, przepisy, backend)
+    for n, p in przepisy.items():
+        transakcje, _ = run([TrendSystem(n, p, ramki[n][["open", "high", "low", "close", "volume"]])], 1e6, 0.01)
+        df = sciezki[n]
+        wyjscia = df[df["wyjscie"] > 0]
+        zamkniete = transakcje[transakcje["powod"] != "KONIEC"]
+        assert list(zamkniete["exit_date"]) == list(wyjscia.index)
+        np.testing.assert_allclose(zamkniete["exit_price"], wyjscia["cena_wyjscia"], rtol=1e-12)
+        kody = np.where(zamkniete["powod"] == "OUT", stops.WYJSCIE_OUT, stops.WYJSCIE_STOP)
+        np.testing.assert_array_equal(kody, wyjscia["wyjscie"])
+        # Wejścia: świeca, w której kernel zmienia pozycję z 0 (albo po wyjściu) na +/-1
+        poz = df["pozycja"].to_numpy()
+        poprzednia = np.concatenate([[0], np.where(df["wyjscie"].to_numpy()[:-1] > 0, 0, poz[:-1])])
+        wejscia = df.index[(poz != 0) & (poprzednia == 0)]
+        assert list(transakcje["entry_date"]) == list(wejscia)
+        kierunki = np.where(transakcje["kierunek"] == "LONG", 1, -1)
+        np.testing.assert_array_equal(kierunki, poz[(poz != 0) & (poprzednia == 0)])
+        # Pozycja otwarta na końcu historii: backtest rozlicza ją jako KONIEC
+        assert (transakcje["powod"] == "KONIEC").sum() == (poz[-1] != 0)
+
+
+def test_ratchet_matches_loop():
+    tsl = np.array([np.nan, 99.0, 101.0, 100.5, np.nan, 103.0, 102.0])
+    wynik = stops.ratchet(100.0, tsl, "LONG")
+    st, oczekiwane = 100.0, []
+    for x in tsl:
+        oczekiwane.append(st)
+        if x > st:
+            st = x
+    np.testing.assert_array_equal(wynik, oczekiwane)
+    np.testing.assert_array_equal(stops.ratchet(-100.0, -tsl, "SHORT"), -wynik)
+
+
+def test_recent_extremes_match_rolling(swiece):
+    for n in (1, 20):
+        gora, dol = stops.recent_extremes(swiece["high"], swiece["low"], n)
+        assert gora == swiece["high"].rolling(n).max().iloc[-1]
+        assert dol == swiece["low"].rolling(n).min().iloc[-1]
+    assert np.isnan(stops.recent_extremes(swiece["high"][:5], swiece["low"][:5], 20)).all()
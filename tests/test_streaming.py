@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import indicators
+from conftest import make_bars
+from fetcher import Fetcher, FileSource
+from przepisy import MeanRevRecipe, TrendRecipe
+from signallogic import add_meanrev_indicators, add_trend_indicators
+from streaming import MeanRevState, StreamEMA, StreamMax, StreamMean, StreamMin, StreamRSI, TrendState, poll
+from validation import validate
+
+# Stan strumieniowy świeca po świecy kontra indicators.py na całej serii:
+# każda wartość pośrednia, nie tylko ostatnia.
+
+
+def _przebieg(stan, df):
+    # Wartości stanu po każdej świecy -> DataFrame z indeksem świec
+    wiersze = [dict(stan.update(czas, h, l, c)) for czas, h, l, c in
+               zip(df.index, df['high'].tolist(), df['low'].tolist(), df['close'].tolist())]
+    return pd.DataFrame(wiersze, index=df.index)
+
+
+def test_stream_ema_and_wilder(swiece):
+    close = swiece['close'].to_numpy()
+    for stan, oczekiwane in [(StreamEMA.span(20), indicators.ema(close, 20)),
+                             (StreamEMA.wilder(14), indicators.wilder(close, 14))]:
+        np.testing.assert_allclose([stan.update(x) for x in close], oczekiwane, rtol=1e-12)
+
+
+@pytest.mark.parametrize("okno", [1, 3, 20])
+def test_stream_extremes(swiece, okno):
+    high, low = swiece['high'].to_numpy(), swiece['low'].to_numpy()
+    gorna, dolna = indicators.donchian(high, low, okno)
+    for stan, x, oczekiwane in [(StreamMax(okno), high, indicators.rolling_max(high, okno)),
+                                (StreamMin(okno), low, indicators.rolling_min(low, okno)),
+                                (StreamMax(okno, biezaca=False), high, gorna),
+                                (StreamMin(okno, biezaca=False), low, dolna)]:
+        np.testing.assert_array_equal([stan.update(v) for v in x], oczekiwane)
+
+
+@pytest.mark.parametrize("okno", [1, 14])
+def test_stream_mean(swiece, okno):
+    close = swiece['close'].to_numpy()
+    stan = StreamMean(okno)
+    np.testing.assert_allclose([stan.update(x) for x in close], indicators.rolling_mean(close, okno), rtol=1e-9)
+
+
+def test_stream_rsi_with_flat_window():
+    # Płaski odcinek: RSI NaN jak w indicators.rsi_sma, potem 100 bez strat w oknie
+    close = np.concatenate([[10.0] * 6, np.arange(11.0, 16.0), [14.0, 14.5, 13.0]])
+    stan = StreamRSI(3)
+    np.testing.assert_allclose([stan.update(x) for x in close], indicators.rsi_sma(close, 3), rtol=1e-12)
+
+
+def test_trend_state_matches_indicators(swiece):
+    in_p, out_p, ema_p, atr_p = 20, 10, 50, 14
+    oczekiwane = add_trend_indicators(swiece.copy(), in_p, out_p, ema_p, atr_p)
+    oczekiwane['highest_recent'] = indicators.rolling_max(swiece['high'].to_numpy(), in_p)
+    oczekiwane['lowest_recent'] = indicators.rolling_min(swiece['low'].to_numpy(), in_p)
+    wynik = _przebieg(TrendState(in_p, out_p, ema_p, atr_p), swiece)
+    for kolumna in wynik.columns:
+        np.testing.assert_allclose(wynik[kolumna], oczekiwane[kolumna], rtol=1e-9, err_msg=kolumna)
+
+
+def test_meanrev_state_matches_indicators(swiece):
+    oczekiwane = add_meanrev_indicators(swiece.copy(), 5, 14)
+    wynik = _przebieg(MeanRevState(5, 14), swiece)
+    for kolumna in wynik.columns:
+        np.testing.assert_allclose(wynik[kolumna], oczekiwane[kolumna], rtol=1e-9, err_msg=kolumna)
+
+
+def test_from_history_equals_full_series(swiece):
+    # Stan zbudowany z historii i dalej aktualizowany = stan z całej serii od początku
+    stan = TrendState.from_history(swiece.iloc[:300], 20, 10, 50)
+    ostatnie = _przebieg(stan, swiece.iloc[300:]).iloc[-1]
+    assert ostatnie.to_dict() == pytest.approx(_przebieg(TrendState(20, 10, 50), swiece).iloc[-1].to_dict())
+
+
+@pytest.mark.parametrize("klasa, args", [(TrendState, (20, 10, 50)), (MeanRevState, (5, 14))])
+def test_forming_bar_corrections(swiece, klasa, args):
+    # Poprawki bieżącej świecy (nowa=False) nie zmieniają stanu z zatwierdzonych świec:
+    # po kilku wersjach tworzącej się świecy wynik jak przy jednej, ostatecznej
+    stan = klasa.from_history(swiece.iloc[:-1], *args)
+    czas = swiece.index[-1]
+    ost = swiece.iloc[-1]
+    for h, l, c in [(ost['open'] * 1.05, ost['open'] * 0.9, ost['open'] * 1.02),
+                    (ost['open'] * 0.5, ost['open'] * 0.4, ost['open'] * 0.45)]:
+        stan.update(czas, h, l, c)
+    wynik = stan.update(czas, ost['high'], ost['low'], ost['close'])
+    assert wynik == pytest.approx(klasa.from_history(swiece, *args).wartosci, nan_ok=True)
+
+
+def test_older_bar_is_ignored(swiece):
+    stan = MeanRevState.from_history(swiece, 5, 14)
+    przed = dict(stan.wartosci)
+    assert stan.update(swiece.index[-5], 1.0, 1.0, 1.0) == przed
+    assert stan.czas == swiece.index[-1]
+
+
+def _monitor(tmp_path, surowe, n_historii):
+    # Historia po kontroli jak w main (do świecy n_historii), reszta świec w pliku źródła
+    surowe.to_parquet(tmp_path / "A.parquet")
+    historia = {"A": validate(surowe.iloc[:n_historii], symbol="A")[0]}
+    przepisy = [TrendRecipe(symbol="A", mult=1.0, dzwignia=1.0, in_p=20, out_p=10, ema_p=50, m_sl=2.0, k_tsl=3.0),
+                MeanRevRecipe(symbol="A", rsi_p=5)]
+    systemy = [(p.strategia, "A", p, TrendState.from_history(historia["A"], 20, 10, 50) if p.strategia == "Trend"
+                else MeanRevState.from_history(historia["A"], 5, 14), None) for p in przepisy]
+    return systemy, historia, Fetcher(FileSource(str(tmp_path)), backoff=0.0)
+
+
+def _oczekiwane(surowe):
+    czyste = validate(surowe, symbol="A")[0]
+    return czyste, [TrendState.from_history(czyste, 20, 10, 50).wartosci,
+                    MeanRevState.from_history(czyste, 5, 14).wartosci]
+
+
+def test_poll_validates_new_bars(tmp_path):
+    surowe = make_bars(260)
+    surowe.iloc[255, surowe.columns.get_loc("close")] = np.nan            # pusta świeca
+    surowe.iloc[257, surowe.columns.get_loc("high")] = surowe["low"].iloc[257] * 0.9  # niespójne OHLC
+    systemy, historia, zrodlo = _monitor(tmp_path, surowe, 250)
+    assert poll(systemy, historia, "1d", zrodlo) == {}
+    czyste, oczekiwane = _oczekiwane(surowe)
+    pd.testing.assert_frame_equal(historia["A"], czyste, check_freq=False)
+    for (_, _, _, stan, _), wartosci in zip(systemy, oczekiwane):
+        assert stan.czas == czyste.index[-1]
+        assert stan.wartosci == pytest.approx(wartosci, nan_ok=True)
+
+
+def test_poll_rebuilds_state_when_current_bar_is_a_spike(tmp_path):
+    # Skok na ostatniej świecy historii rozpoznawalny dopiero po następnej świecy
+    surowe = make_bars(260)
+    surowe.iloc[249, :4] = surowe.iloc[249, :4] * 1.5
+    systemy, historia, zrodlo = _monitor(tmp_path, surowe.iloc[:255], 250)
+    assert systemy[0][3].czas == surowe.index[249]
+    poll(systemy, historia, "1d", zrodlo)
+    czyste, oczekiwane = _oczekiwane(surowe.iloc[:255])
+    assert surowe.index[249] not in historia["A"].index
+    pd.testing.assert_frame_equal(historia["A"], czyste, check_freq=False)
+    for (_, _, _, stan, _), wartosci in zip(systemy, oczekiwane):
+        assert stan.wartosci == pytest.approx(wartosci, nan_ok=True)
@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+
+from conftest import make_bars
+from validation import validate, validate_many
+
+# Kontrola jakości na celowo zepsutych świecach: każda reguła osobno naprawia / usuwa
+# tylko to, co zepsute, i zgłasza to w Raporcie.
+
+
+def _swiece(n=120):
+    return make_bars(n, seed=7)
+
+
+def test_clean_bars_pass_untouched():
+    df = _swiece()
+    wynik, r = validate(df, symbol="A")
+    assert wynik is df
+    assert r.ok and r.opis() == "" and r.swiece == len(df)
+
+
+def test_none_and_empty_pass_through():
+    pusta = _swiece().iloc[:0]
+    wynik, raporty = validate_many({"A": None, "B": pusta})
+    assert wynik["A"] is None and wynik["B"] is pusta
+    assert raporty == {}
+
+
+def test_unsorted_and_duplicates():
+    df = _swiece()
+    poprawka = df.iloc[[50]].assign(close=df["close"].iloc[50] * 1.001)
+    zly = pd.concat([df.iloc[60:], df.iloc[:60], poprawka])
+    wynik, r = validate(zly, symbol="A")
+    assert r.nieposortowane and r.duplikaty == 1
+    assert wynik.index.equals(df.index)
+    assert wynik["close"].iloc[50] == poprawka["close"].iloc[0]  # ostatni wiersz wygrywa
+
+
+def test_empty_close_removed_and_missing_ohl_filled():
+    df = _swiece()
+    zly = df.copy()
+    zly.iloc[30, zly.columns.get_loc("close")] = 0.0
+    zly.iloc[31, zly.columns.get_loc("close")] = np.nan
+    zly.iloc[40, zly.columns.get_loc("open")] = np.nan
+    zly.iloc[41, zly.columns.get_loc("low")] = 0.0
+    wynik, r = validate(zly, symbol="A")
+    assert r.puste == 2 and r.uzupelnione == 2
+    assert wynik.index.equals(df.index.delete([30, 31]))
+    assert wynik.loc[df.index[40], "open"] == df["close"].iloc[40]
+    # Low uzupełnione close, potem dopasowane do korpusu (open może być niżej)
+    assert wynik.loc[df.index[41], "low"] == min(df["open"].iloc[41], df["close"].iloc[41])
+    assert not wynik[["open", "high", "low", "close"]].isna().any().any()
+    assert zly["close"].iloc[30] == 0.0  # wejście bez zmian
+
+
+def test_negative_prices_are_kept():
+    # Ujemne notowanie to nie błąd danych (CL=F 2020-04-20: close -37.63)
+    df = make_bars(120, seed=7, cena=20.0)
+    df.iloc[60, :4] = [17.73, 17.85, -40.32, -37.63]
+    df.iloc[61, :4] = [-14.00, 12.00, -16.74, 10.01]
+    wynik, r = validate(df, symbol="CL=F")
+    assert wynik is df and r.ok
+
+
+def test_phantom_bar_removed_only_on_markets_with_volume():
+    df = _swiece()
+    zly = df.copy()
+    poprzednie = df["close"].iloc[59]
+    zly.iloc[60] = [poprzednie, poprzednie, poprzednie, poprzednie, 0.0]
+    zly.iloc[70, zly.columns.get_loc("volume")] = 0.0  # zwykła świeca bez obrotu - tylko zgłoszona
+    wynik, r = validate(zly, symbol="A")
+    assert r.fantomy == 1 and r.zerowy_wolumen == 1
+    assert wynik.index.equals(df.index.delete(60))
+
+    # Forex bez obrotu: płaska świeca na poprzednim zamknięciu to zwykły brak ruchu
+    forex = zly.assign(volume=0.0)
+    wynik, r = validate(forex, symbol="EURUSD=X")
+    assert r.fantomy == 0 and r.zerowy_wolumen == 0 and len(wynik) == len(df)
+
+
+def test_inconsistent_high_low_fixed():
+    df = _swiece()
+    zly = df.copy()
+    o, c = df["open"].iloc[20], df["close"].iloc[20]
+    zly.iloc[20, zly.columns.get_loc("high")] = min(o, c) * 0.99
+    zly.iloc[21, zly.columns.get_loc("low")] = df["high"].iloc[21] * 1.01
+    wynik, r = validate(zly, symbol="A")
+    assert r.niespojne == 2 and len(wynik) == len(df)
+    assert wynik["high"].iloc[20] == max(o, c)
+    assert wynik["low"].iloc[21] == min(df["open"].iloc[21], df["close"].iloc[21])
+    assert (wynik["high"] >= wynik[["open", "close", "low"]].max(axis=1)).all()
+    assert (wynik["low"] <= wynik[["open", "close", "high"]].min(axis=1)).all()
+
+
+def test_reversed_spike_removed_but_real_gap_kept():
+    df = _swiece()
+    zly = df.copy()
+    zly.iloc[80, :4] = df.iloc[80, :4] * 1.5            # błędny kurs, następna świeca wraca
+    zly.iloc[100:, :4] = df.iloc[100:, :4].to_numpy() * 1.5  # luka cenowa, która zostaje
+    wynik, r = validate(zly, symbol="A")
+    assert r.skoki == 1
+    assert wynik.index.equals(df.index.delete(80))
+    assert wynik["close"].iloc[-1] == zly["close"].iloc[-1]
+
+
+def test_far_wick_trimmed():
+    df = _swiece()
+    zly = df.copy()
+    zakres = (df["high"] - df["low"]).median()
+    korpus = max(df["open"].iloc[90], df["close"].iloc[90])
+    zly.iloc[90, zly.columns.get_loc("high")] = korpus + 30 * zakres
+    wynik, r = validate(zly, symbol="A")
+    assert r.knoty == 1 and len(wynik) == len(df)
+    assert korpus < wynik["high"].iloc[90] < korpus + 2 * zakres
+    assert wynik.drop(index=df.index[90]).equals(df.drop(index=df.index[90]))
+
+
+def test_session_gaps_reported():
+    df = _swiece()
+    zly = df.drop(index=df.index[50:56])  # 6 brakujących sesji
+    wynik, r = validate(zly, symbol="A")
+    assert wynik is zly
+    assert r.luki == [(df.index[49], df.index[56], 6)]
+    # Krótka luka (święto) i interwał intraday - bez zgłoszenia
+    assert validate(df.drop(index=df.index[50:52]), symbol="A")[1].ok
+    assert validate(zly, "1h", symbol="A")[1].ok
+
+
+def test_panel_rules_are_per_symbol():
+    # Symbole walidowane razem, ale naprawy jednego nie dotykają drugiego (różne długości)
+    czysty = make_bars(150, seed=3)
+    zly = _swiece().copy()
+    zly.iloc[30, zly.columns.get_loc("close")] = 0.0
+    wynik, raporty = validate_many({"A": czysty, "B": zly})
+    assert wynik["A"] is czysty and raporty["A"].ok
+    assert raporty["B"].puste == 1 and len(wynik["B"]) == len(zly) - 1
+    assert raporty["B"].opis() == "1 puste"
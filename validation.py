@@ -0,0 +1,207 @@
+import warnings
+
+import numpy as np
+
+# ==================================================
+#  KONTROLA JAKOŚCI ŚWIEC (przed wskaźnikami)
+# ==================================================
+# Yahoo nie zawsze zwraca czyste, ciągłe świece - futures (LE=F, ZW=F, CC=F) mają
+# rolowania, święta, wiersze z NaN albo bez obrotu. Takie świece psują max/min
+# z okna, ATR i RSI (płaskie okno bez strat), więc przed wskaźnikami:
+#
+#   naprawiane / usuwane              tylko zgłaszane
+#   - nieposortowany indeks           - świece bez obrotu (rynek z obrotem)
+#   - duplikaty czasu (ostatni wygrywa) - luki dłuższe niż MAX_LUKA sesji (1d)
+#   - brak / zerowa / nieskończona cena zamknięcia (usunięta świeca)
+#   - brak / zerowe open/high/low (uzupełniane close)
+#   - "fantom": świeca bez obrotu i ruchu na poprzednim zamknięciu (święto) - usunięta
+#   - high/low niespójne z open/close (poprawiane)
+#   - skok zamknięcia odwrócony na następnej świecy (błędny kurs) - usunięta
+#   - knot dalej niż MAX_KNOT typowych zakresów od korpusu (przycinany)
+#
+# Ujemne ceny to prawdziwe notowania (CL=F 2020-04-20), nie błąd danych - zostają. Założenie
+# ceny > 0 należy do kodu, który przez cenę dzieli (ATR %, zwroty); skoki (log-zwroty) sprawdzane
+# są tylko między dodatnimi zamknięciami.
+#
+# Wszystkie symbole sprawdzane są razem: świece układane w panel (symbole x świece)
+# i każda reguła to jedna operacja NumPy na całym panelu.
+# Wywoływane w barstore.get_bars / get_bars_many; wynik (świece i Raport) trzyma
+# barcache razem ze świecami, więc kontrola nie powtarza się przy każdym odświeżeniu strony.
+
+MAX_SKOK = 8.0    # |zwrot| > MAX_SKOK x typowy zwrot symbolu (mediana |zwrotu| x 1.4826)
+MAX_KNOT = 10.0   # knot > MAX_KNOT x mediana zakresu świecy (high - low)
+MAX_LUKA = 3      # dzienne: więcej brakujących sesji pod rząd to luka w danych
+
+KOLUMNY = ["open", "high", "low", "close", "volume"]
+
+
+class Raport:
+    __slots__ = ("symbol", "swiece", "nieposortowane", "duplikaty", "puste", "uzupelnione", "fantomy",
+                 "niespojne", "skoki", "knoty", "zerowy_wolumen", "luki")
+
+    def __init__(self, symbol, swiece):
+        self.symbol = symbol
+        self.swiece = swiece
+        self.nieposortowane = False
+        self.duplikaty = self.puste = self.uzupelnione = self.fantomy = 0
+        self.niespojne = self.skoki = self.knoty = self.zerowy_wolumen = 0
+        self.luki = []  # (ostatnia świeca przed luką, pierwsza po, brakujące sesje)
+
+    @property
+    def ok(self):
+        return not (self.nieposortowane or self.duplikaty or self.puste or self.uzupelnione or self.fantomy
+                    or self.niespojne or self.skoki or self.knoty or self.zerowy_wolumen or self.luki)
+
+    def opis(self):
+        # Krótki opis do tabeli skanera / strony; pusty, gdy dane są czyste
+        czesci = [f"{n} {nazwa}" for n, nazwa in [
+            (self.duplikaty, "duplikaty"), (self.puste, "puste"), (self.uzupelnione, "uzupełnione OHLC"),
+            (self.fantomy, "fantomy"), (self.niespojne, "niespójne OHLC"), (self.skoki, "skoki"),
+            (self.knoty, "knoty"), (self.zerowy_wolumen, "bez obrotu"), (len(self.luki), "luki")] if n]
+        if self.nieposortowane:
+            czesci.insert(0, "nieposortowane")
+        return ", ".join(czesci)
+
+    def as_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+
+def _poprzednia(x, maska):
+    # Wartość z ostatniej wcześniejszej (ściśle) pozycji z maską, w każdym wierszu panelu
+    n = x.shape[1]
+    idx = np.maximum.accumulate(np.where(maska, np.arange(n), -1), axis=1)
+    idx = np.concatenate([np.full((x.shape[0], 1), -1), idx[:, :-1]], axis=1)
+    out = np.take_along_axis(x, np.maximum(idx, 0), axis=1)
+    out[idx < 0] = np.nan
+    return out
+
+
+def _nastepna(x, maska):
+    return _poprzednia(x[:, ::-1], maska[:, ::-1])[:, ::-1]
+
+
+def _mediana(x, maska):
+    # Mediana w wierszu po pozycjach z maską; wiersz bez wartości -> NaN (bez ostrzeżenia)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nanmedian(np.where(maska, x, np.nan), axis=1)
+
+
+def _cena(x):
+    # Poprawna cena: skończona i niezerowa (ujemna dopuszczalna)
+    return np.isfinite(x) & (x != 0)
+
+
+def _prog(x):
+    # Zerowa lub nieznana skala (same płaskie świece) - reguła wyłączona
+    return np.where(x > 0, x, np.inf)[:, None]
+
+
+def _luki(index, interval):
+    # Brakujące sesje między kolejnymi świecami dziennymi (dni robocze; krypto - wszystkie dni)
+    if interval != "1d" or len(index) < 2:
+        return []
+    dni = (index.tz_localize(None) if index.tz is not None else index).to_numpy(dtype="datetime64[D]")
+    # Świece w weekend = rynek notowany codziennie (1970-01-01 to czwartek)
+    krypto = ((dni.astype(np.int64) + 3) % 7 >= 5).any()
+    if krypto:
+        brak = np.diff(dni).astype(int) - 1
+    else:
+        brak = np.busday_count(dni[:-1], dni[1:]) - 1
+    gdzie = np.flatnonzero(brak > MAX_LUKA)
+    return [(index[i], index[i + 1], int(brak[i])) for i in gdzie]
+
+
+def validate_many(dane, interval="1d"):
+    # dane - {symbol: df OHLCV}; zwraca ({symbol: df po naprawie}, {symbol: Raport}).
+    # Ramka bez żadnej poprawki zwracana jest bez kopiowania; None przechodzi bez zmian.
+    wynik = dict(dane)
+    raporty = {}
+    symbole = [s for s, df in dane.items() if df is not None and len(df) and "close" in df.columns]
+    if not symbole:
+        return wynik, raporty
+
+    # 1. Kolejność i duplikaty - operacje na indeksie (przy czystych danych tylko sprawdzenie flag)
+    ramki = {}
+    for s in symbole:
+        df = dane[s]
+        r = raporty[s] = Raport(s, len(df))
+        if not df.index.is_monotonic_increasing:
+            r.nieposortowane = True
+            df = df.sort_index(kind="stable")
+        if not df.index.is_unique:
+            dup = df.index.duplicated(keep="last")
+            r.duplikaty = int(dup.sum())
+            df = df[~dup]
+        ramki[s] = df
+
+    # 2. Panel symbole x świece (wyrównany do lewej, NaN za końcem krótszych serii)
+    dl = np.array([len(ramki[s]) for s in symbole])
+    jest = np.arange(dl.max())[None, :] < dl[:, None]
+    panel = np.full((len(KOLUMNY),) + jest.shape, np.nan)
+    for i, s in enumerate(symbole):
+        for j, kol in enumerate(KOLUMNY):
+            if kol in ramki[s].columns:
+                panel[j, i, :dl[i]] = ramki[s][kol].to_numpy(dtype=float)
+    o, h, l, c, v = panel
+
+    # 3. Puste świece i brakujące open/high/low
+    puste = jest & ~_cena(c)
+    zle_ohl = jest & ~puste & ~(_cena(o) & _cena(h) & _cena(l))
+    for x in (o, h, l):
+        brak = jest & ~puste & ~_cena(x)
+        x[brak] = c[brak]
+
+    # 4. Fantomy (święta na futures: zero obrotu, high == low == poprzednie zamknięcie)
+    ma_wolumen = _mediana(v, jest & ~puste) > 0  # forex i część indeksów nie ma obrotu wcale
+    bez_obrotu = jest & ~puste & (v == 0) & ma_wolumen[:, None]
+    fantomy = bez_obrotu & (h == l) & (c == _poprzednia(c, jest & ~puste))
+
+    # 5. Spójność high/low z korpusem świecy
+    dobre = jest & ~puste & ~fantomy
+    gora = np.fmax(np.fmax(o, c), np.fmax(h, l))
+    dol = np.fmin(np.fmin(o, c), np.fmin(h, l))
+    niespojne = dobre & ((h != gora) | (l != dol))
+    h, l = np.where(niespojne, gora, h), np.where(niespojne, dol, l)
+
+    # 6. Skoki zamknięcia odwrócone na następnej świecy (błędny kurs, nie luka cenowa)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        zwrot = np.where(dobre, np.log(c / _poprzednia(c, dobre)), np.nan)
+    nastepny = _nastepna(zwrot, dobre & ~np.isnan(zwrot))
+    prog = MAX_SKOK * _prog(1.4826 * _mediana(np.abs(zwrot), ~np.isnan(zwrot)))
+    skoki = (dobre & (np.abs(zwrot) > prog) & (np.abs(nastepny) > prog)
+             & (np.sign(zwrot) != np.sign(nastepny)) & (np.abs(zwrot + nastepny) < 0.5 * np.abs(zwrot)))
+    dobre &= ~skoki
+
+    # 7. Knoty daleko od korpusu - przycięte do korpusu + typowego zakresu
+    zakres = _prog(_mediana(h - l, dobre))
+    korpus_g, korpus_d = np.fmax(o, c), np.fmin(o, c)
+    knot_g = dobre & (h - korpus_g > MAX_KNOT * zakres)
+    knot_d = dobre & (korpus_d - l > MAX_KNOT * zakres)
+    h = np.where(knot_g, korpus_g + zakres, h)
+    l = np.where(knot_d, korpus_d - zakres, l)
+
+    # 8. Złożenie wyników dla każdego symbolu
+    usun = puste | fantomy | skoki
+    zmiana = zle_ohl | niespojne | knot_g | knot_d
+    for i, s in enumerate(symbole):
+        r, df, n = raporty[s], ramki[s], dl[i]
+        r.puste, r.uzupelnione, r.fantomy = int(puste[i].sum()), int(zle_ohl[i].sum()), int(fantomy[i].sum())
+        r.niespojne, r.skoki = int(niespojne[i].sum()), int(skoki[i].sum())
+        r.knoty = int((knot_g[i] | knot_d[i]).sum())
+        r.zerowy_wolumen = int((bez_obrotu[i] & ~fantomy[i]).sum())
+        if zmiana[i].any() or usun[i].any():
+            df = df.copy()
+            for k, x in [("open", o), ("high", h), ("low", l)]:
+                if k in df.columns:
+                    df[k] = x[i, :n]
+            df = df[~usun[i, :n]]
+        r.luki = _luki(df.index, interval)
+        wynik[s] = df
+    return wynik, raporty
+
+
+def validate(df, interval="1d", symbol=None):
+    # Jeden symbol - (df po naprawie, Raport albo None dla pustych danych)
+    wynik, raporty = validate_many({symbol: df}, interval)
+    return wynik[symbol], raporty.get(symbol)
@@ -0,0 +1,310 @@
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+import indicators
+from barstore import get_bars_many
+from optimizer import GridStats
+from przepisy import ZŁOTE_PRZEPISY_MEANREV, MeanRevRecipe, toml_line
+
+# ==================================================
+#  OPTYMALIZACJA WALK-FORWARD - MEAN REVERSION (RSI)
+# ==================================================
+# Historia dzielona jest na kroczące okna trening/test. W każdym oknie treningowym
+# przeszukujemy siatkę parametrów, a najlepszy zestaw sprawdzamy na następnym
+# (niewidzianym) oknie testowym. Zadania (symbol x okno) idą do puli procesów;
+# każdy proces liczy RSI/ATR dla danego symbolu raz i używa ich dla wszystkich okien.
+# Świece leżą raz w pamięci współdzielonej (jak w robustness.py) - zadanie niesie tylko
+# położenie symbolu w bloku i granice okna, bez przesyłania DataFrame.
+#
+# Wybór w oknie treningowym: Zwrot / max(Max DD, MIN_DD) - okno bez obsunięcia nie daje
+# nieskończoności; remis rozstrzyga wyższy zwrot.
+#
+# Zasady (jak w signalmeanrev.py, decyzje na zamknięciu świecy):
+# * LONG gdy RSI < L_ENT, SHORT gdy RSI > S_ENT,
+# * stop: wejście -/+ M x ATR (ATR z SMA),
+# * wyjście LONG gdy RSI > L_EX, SHORT gdy RSI < S_EX.
+#
+# Uruchomienie:
+#   python walkforward.py --okres 10y --trening 500 --test 125
+#   python walkforward.py --system "Kakao (CC=F)" --procesy 4
+
+SIATKA_DOMYSLNA = {
+    "rsi": [3, 5, 14],
+    "atr": [5, 14, 20],
+    "m": [2.0, 3.0],
+    "l_ent": [10, 20, 30],
+    "l_ex": [50, 60, 70],
+    "s_ent": [70, 80, 90],
+    "s_ex": [30, 40, 50],
+}
+
+PARAMETRY = ["RSI", "ATR", "M", "L_ENT", "L_EX", "S_ENT", "S_EX"]
+POLA_CEN = ("open", "high", "low", "close")
+MIN_DD = 0.01  # obsunięcie przyjmowane do oceny okna bez żadnego obsunięcia
+
+
+def price_array(df):
+    # Świece -> tablica (świece x 4: open, high, low, close); bez open - close
+    close = df['close'].to_numpy(dtype=np.float64)
+    return np.column_stack([df[p].to_numpy(dtype=np.float64) if p in df else close for p in POLA_CEN])
+
+
+def precompute(df, rsi_grid, atr_grid):
+    return precompute_arrays(price_array(df), rsi_grid, atr_grid)
+
+
+def precompute_arrays(ceny, rsi_grid, atr_grid):
+    open_, high, low, close = (ceny[:, i] for i in range(4))
+    return {
+        'open': open_, 'high': high, 'low': low, 'close': close,
+        # (świece x okresy) - w pętli po czasie czytamy jeden wiersz
+        'rsi': indicators.rsi_sma(close, rsi_grid).T,
+        'atr': indicators.atr_sma(high, low, close, atr_grid).T,
+    }
+
+
+def grid_combos(siatka):
+    combos = np.array(list(itertools.product(
+        range(len(siatka["rsi"])), range(len(siatka["atr"])), siatka["m"],
+        siatka["l_ent"], siatka["l_ex"], siatka["s_ent"], siatka["s_ex"])), dtype=float)
+    # Odrzucamy zestawy bez sensu (wyjście po złej stronie wejścia)
+    ok = (combos[:, 4] > combos[:, 3]) & (combos[:, 6] < combos[:, 5])
+    return combos[ok]
+
+
+def simulate_meanrev_grid(pre, combos, start, end, ryzyko_proc=0.04):
+    rsi_idx = combos[:, 0].astype(int)
+    atr_idx = combos[:, 1].astype(int)
+    m, l_ent, l_ex, s_ent, s_ex = (combos[:, i] for i in range(2, 7))
+    close, high, low, open_ = pre['close'], pre['high'], pre['low'], pre['open']
+    c = len(combos)
+
+    pos = np.zeros(c, dtype=np.int8)
+    entry = np.zeros(c)
+    risk = np.ones(c)
+    stop = np.full(c, np.nan)
+    stats = GridStats(c, ryzyko_proc)
+
+    def zamknij(maska, cena):
+        stats.record(maska, np.where(pos == 1, cena - entry, entry - cena) / risk)
+        pos[maska] = 0
+
+    with np.errstate(invalid="ignore"):
+        for t in range(start, end):
+            # 1. Stop M x ATR - luka otwarcia wypełniana po open
+            hit_l = (pos == 1) & (low[t] <= stop)
+            hit_s = (pos == -1) & (high[t] >= stop)
+            if hit_l.any() or hit_s.any():
+                cena = np.where(hit_l, np.minimum(open_[t], stop), np.maximum(open_[t], stop))
+                zamknij(hit_l | hit_s, cena)
+
+            # 2. Wyjście po RSI na zamknięciu
+            rsi_t = pre['rsi'][t][rsi_idx]
+            ex_l = (pos == 1) & (rsi_t > l_ex)
+            ex_s = (pos == -1) & (rsi_t < s_ex)
+            wyszlo = hit_l | hit_s | ex_l | ex_s
+            if ex_l.any() or ex_s.any():
+                zamknij(ex_l | ex_s, close[t])
+
+            # 3. Nowe wejścia (bez ATR nie da się policzyć stopu ani wolumenu)
+            atr_t = pre['atr'][t][atr_idx]
+            wolne = (pos == 0) & ~wyszlo & (atr_t > 0)
+            long_sig = wolne & (rsi_t < l_ent)
+            short_sig = wolne & ~long_sig & (rsi_t > s_ent)
+            if long_sig.any() or short_sig.any():
+                nowe = long_sig | short_sig
+                pos[long_sig] = 1
+                pos[short_sig] = -1
+                entry[nowe] = close[t]
+                risk[nowe] = (m * atr_t)[nowe]
+                stop[long_sig] = close[t] - risk[long_sig]
+                stop[short_sig] = close[t] + risk[short_sig]
+
+        otwarte = pos != 0
+        if otwarte.any():
+            zamknij(otwarte, close[end - 1])
+
+    return stats.summary()
+
+
+def windows(n, trening, test, rozgrzewka):
+    # (start treningu, koniec treningu = start testu, koniec testu) - ostatnie okno
+    # testowe może być krótsze, żeby sięgało ostatniej świecy
+    okna = []
+    start = rozgrzewka
+    while start + trening < n:
+        okna.append((start, start + trening, min(start + trening + test, n)))
+        start += test
+    return okna
+
+
+def best_combo(ins, min_transakcji):
+    # Indeks najlepszego zestawu w oknie treningowym (za mało transakcji - na końcu kolejki)
+    ocena = ins["Zwrot"] / np.maximum(ins["Max DD"], MIN_DD)
+    ocena = np.where(ins["Transakcje"] >= min_transakcji, ocena, -np.inf)
+    # lexsort: ostatni klucz główny - ocena, przy remisie zwrot
+    return int(np.lexsort((ins["Zwrot"], ocena))[-1])
+
+
+# --- Część wykonywana w procesach roboczych ---
+# Świece wszystkich symboli w jednym bloku (suma świec x 4); symbol -> (przesunięcie, długość).
+_CENY = None
+_BLOK_PAMIECI = None
+_PRE_CACHE = {}
+
+
+def _attach(nazwa, ksztalt):
+    # Inicjalizacja procesu roboczego - widok NumPy na blok pamięci współdzielonej (bez kopii)
+    global _CENY, _BLOK_PAMIECI
+    _BLOK_PAMIECI = shared_memory.SharedMemory(name=nazwa)
+    _CENY = np.ndarray(ksztalt, dtype=np.float64, buffer=_BLOK_PAMIECI.buf)
+    _PRE_CACHE.clear()
+
+
+def _wf_task(symbol, polozenie, siatka, okno, ryzyko_proc, min_transakcji):
+    if polozenie not in _PRE_CACHE:
+        od, n = polozenie
+        _PRE_CACHE[polozenie] = precompute_arrays(_CENY[od:od + n], siatka["rsi"], siatka["atr"])
+    pre = _PRE_CACHE[polozenie]
+    combos = grid_combos(siatka)
+
+    t0, t1, t2 = okno
+    ins = simulate_meanrev_grid(pre, combos, t0, t1, ryzyko_proc)
+    best = best_combo(ins, min_transakcji)
+    params = combos[best]
+
+    # Daty okna uzupełnia proces główny (ma indeks świec)
+    wiersz = {
+        "Symbol": symbol, "Finalne": t1 == t2, "okno": okno,
+        "RSI": siatka["rsi"][int(params[0])], "ATR": siatka["atr"][int(params[1])],
+        "M": params[2], "L_ENT": params[3], "L_EX": params[4], "S_ENT": params[5], "S_EX": params[6],
+        "IS Transakcje": int(ins["Transakcje"][best]), "IS Zwrot": ins["Zwrot"][best],
+    }
+    # Okno finalne (trening do ostatniej świecy) nie ma części testowej - daje nowy przepis
+    if t1 < t2:
+        oos = simulate_meanrev_grid(pre, params[None, :], t1, t2, ryzyko_proc)
+        wiersz.update({"OOS Transakcje": int(oos["Transakcje"][0]), "OOS Zwrot": oos["Zwrot"][0],
+                       "OOS Max DD": oos["Max DD"][0]})
+    return wiersz
+
+
+def walk_forward(dane, siatka=None, trening=500, test=125, ryzyko_proc=0.04,
+                 min_transakcji=3, procesy=None):
+    siatka = {**SIATKA_DOMYSLNA, **(siatka or {})}
+    rozgrzewka = max(max(siatka["rsi"]), max(siatka["atr"]))
+
+    dane = {s: df for s, df in dane.items() if df is not None and len(df)}
+    tablice = {s: price_array(df) for s, df in dane.items()}
+    polozenie, od = {}, 0
+    for s, x in tablice.items():
+        polozenie[s] = (od, len(x))
+        od += len(x)
+
+    zadania = []
+    for symbol, df in dane.items():
+        n = len(df)
+        okna = windows(n, trening, test, rozgrzewka)
+        if okna:
+            okna.append((max(rozgrzewka, n - trening), n, n))
+        for okno in okna:
+            zadania.append((symbol, polozenie[symbol], siatka, okno, ryzyko_proc, min_transakcji))
+    if not zadania:
+        return pd.DataFrame()
+
+    wiersze = []
+    pamiec = shared_memory.SharedMemory(create=True, size=max(od * 4 * 8, 1))
+    try:
+        ceny = np.ndarray((od, 4), dtype=np.float64, buffer=pamiec.buf)
+        for s, x in tablice.items():
+            ceny[polozenie[s][0]:polozenie[s][0] + len(x)] = x
+        with ProcessPoolExecutor(max_workers=procesy, initializer=_attach,
+                                 initargs=(pamiec.name, ceny.shape)) as pool:
+            futures = [pool.submit(_wf_task, *z) for z in zadania]
+            for f in as_completed(futures):
+                wiersz = f.result()
+                indeks = dane[wiersz["Symbol"]].index
+                t0, t1, t2 = wiersz.pop("okno")
+                wiersze.append({"Symbol": wiersz.pop("Symbol"), "Finalne": wiersz.pop("Finalne"),
+                                "Trening od": indeks[t0], "Test od": indeks[min(t1, t2 - 1)],
+                                "Test do": indeks[t2 - 1], **wiersz})
+        del ceny
+    finally:
+        pamiec.close()
+        pamiec.unlink()
+
+    return pd.DataFrame(wiersze).sort_values(["Symbol", "Finalne", "Test od"]).reset_index(drop=True)
+
+
+def summarize(okna):
+    # Zszyty wynik poza próbą i przepis z okna finalnego (najświeższe dopasowanie)
+    wiersze = []
+    for symbol, g in okna.groupby("Symbol", sort=False):
+        ostatnie = g[g["Finalne"]].iloc[-1]
+        g = g[~g["Finalne"]]
+        equity = np.prod(1.0 + g["OOS Zwrot"].to_numpy())
+        wiersze.append({
+            "Symbol": symbol, "Okna": len(g),
+            "OOS Zwrot": equity - 1.0,
+            "OOS Transakcje": int(g["OOS Transakcje"].sum()),
+            "Okna z zyskiem": float((g["OOS Zwrot"] > 0).mean()),
+            "Najgorszy DD okna": g["OOS Max DD"].max(),
+            **{p: ostatnie[p] for p in PARAMETRY},
+        })
+    return pd.DataFrame(wiersze)
+
+
+def jako_przepis(nazwa, symbol, mult, leverage, wiersz):
+    # Gotowa linia do wklejenia w tabelę [meanrev] pliku przepisy.toml
+    return toml_line(nazwa, MeanRevRecipe(symbol, float(mult), float(leverage), int(wiersz["RSI"]), int(wiersz["ATR"]),
+                                          float(wiersz["M"]), int(wiersz["L_ENT"]), int(wiersz["L_EX"]),
+                                          int(wiersz["S_ENT"]), int(wiersz["S_EX"])))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Walk-forward dla przepisów Mean Reversion (RSI)")
+    parser.add_argument("--system", action="append", help="Nazwa systemu z ZŁOTE_PRZEPISY_MEANREV (można powtórzyć)")
+    parser.add_argument("--okres", default="10y", help="Zakres historii, np. 5y, 10y, max")
+    parser.add_argument("--trening", type=int, default=500, help="Długość okna treningowego (świece)")
+    parser.add_argument("--test", type=int, default=125, help="Długość okna testowego (świece)")
+    parser.add_argument("--ryzyko", type=float, default=4.0, help="Ryzyko na transakcję (%%)")
+    parser.add_argument("--min-transakcji", type=int, default=3)
+    parser.add_argument("--procesy", type=int, default=os.cpu_count())
+    parser.add_argument("--csv", help="Zapisz wszystkie okna do pliku CSV")
+    args = parser.parse_args(argv)
+
+    przepisy = ZŁOTE_PRZEPISY_MEANREV
+    if args.system:
+        przepisy = {n: przepisy[n] for n in args.system}
+
+    start = time.perf_counter()
+    dane = get_bars_many([p.symbol for p in przepisy.values()], period=args.okres, interval="1d")
+    okna = walk_forward(dane, trening=args.trening, test=args.test, ryzyko_proc=args.ryzyko / 100.0,
+                        min_transakcji=args.min_transakcji, procesy=args.procesy)
+    czas = time.perf_counter() - start
+
+    if okna.empty:
+        parser.exit(1, "Za mało danych na choćby jedno okno walk-forward.\n")
+    if args.csv:
+        okna.to_csv(args.csv, index=False)
+
+    podsumowanie = summarize(okna)
+    print(f"{len(okna)} okien dla {podsumowanie.shape[0]} rynków w {czas:.1f} s\n")
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(podsumowanie.to_string(index=False))
+
+    print("\nPrzepisy dopasowane na ostatnich świecach:")
+    for nazwa, p in przepisy.items():
+        wiersz = podsumowanie[podsumowanie["Symbol"] == p.symbol]
+        if not wiersz.empty:
+            print(jako_przepis(nazwa, p.symbol, p.mult, p.dzwignia, wiersz.iloc[0]))
+
+
+if __name__ == "__main__":
+    main()